@@ -0,0 +1,220 @@
+from run import *
+from file_utils import read_report_summary
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+
+# Columns of a manifest, one row for each sample
+MANIFEST_COLUMNS = ["sample", "results_folder1", "results_folder2"]
+
+
+def define_batch_parser():
+    """
+    Purpose:    Define arguments for the parser of a cohort of results folder pairs
+    Modifies:   Nothing
+    Returns:    The parser
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "manifest",
+        help="TSV or YAML manifest of the samples to compare, with the columns sample, results_folder1 and results_folder2. Relative folders are found from the folder of the manifest",
+    )
+    parser.add_argument(
+        "--stop_on_error",
+        action="store_true",
+        help="Stop the cohort at the first comparison that fails, instead of recording the failure in the cohort index and going on",
+    )
+    add_comparison_arguments(parser)
+    return parser
+
+
+def load_manifest(manifest_path):
+    """
+    Purpose:    Read the samples of a TSV or YAML manifest
+    Modifies:   Nothing
+    Returns:    List of dictionaries of the sample name and its two results folders
+    """
+    with open(manifest_path) as f:
+        if manifest_path.endswith((".yml", ".yaml")):
+            import yaml
+
+            try:
+                rows = yaml.safe_load(f) or []
+            except yaml.YAMLError as e:
+                raise ValueError(e)
+        else:
+            rows = list(csv.DictReader(f, delimiter="\t"))
+    if not isinstance(rows, list):
+        raise ValueError(f"The manifest {manifest_path} is not a list of samples")
+
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    samples = []
+    names = set()
+    for number, row in enumerate(rows, 1):
+        if not isinstance(row, dict) or any(not row.get(c) for c in MANIFEST_COLUMNS):
+            raise ValueError(
+                f"Sample {number} of the manifest needs the columns {', '.join(MANIFEST_COLUMNS)}"
+            )
+        name = str(row["sample"])
+        if not re.fullmatch(r"[\w.-]+", name) or name in (".", ".."):
+            raise ValueError(
+                f"Invalid sample name '{name}', only letters, digits, '_', '.' and '-' are allowed"
+            )
+        if name in names:
+            raise ValueError(f"The sample '{name}' is listed more than once")
+        names.add(name)
+        samples.append(
+            {
+                "sample": name,
+                "results_folder1": os.path.join(
+                    manifest_dir, str(row["results_folder1"])
+                ),
+                "results_folder2": os.path.join(
+                    manifest_dir, str(row["results_folder2"])
+                ),
+            }
+        )
+    return samples
+
+
+def get_cohort_jobs(args, samples, cohort_dir, table_cache):
+    """
+    Purpose:    Create the output folder of each sample and locate its comparison jobs,
+                reusing the reports of earlier cohorts unless every comparison is rerun
+    Modifies:   Nothing
+    Returns:    List of the jobs of every sample, each starting with a sample header,
+                and a dictionary of the samples whose folders could not be compared
+    """
+    classes = [args.mhc_class] if args.mhc_class else ["1", "2"]
+    previous_cohorts = []
+    if not args.recompute_all:
+        previous_cohorts = find_previous_results_folders(
+            args.output_dir, cohort_dir, "cohort"
+        )
+
+    jobs = []
+    errors = {}
+    for number, sample in enumerate(samples, 1):
+        output_dir = os.path.join(cohort_dir, sample["sample"])
+        create_class_folders(output_dir, classes)
+        try:
+            sample_jobs = get_run_jobs(
+                args,
+                sample["results_folder1"],
+                sample["results_folder2"],
+                output_dir,
+                table_cache,
+            )
+        except FileNotFoundError as e:
+            logging.error("ERROR: Sample %s was not compared: %s", sample["sample"], e)
+            errors[sample["sample"]] = str(e)
+            continue
+        reuse_previous_results(
+            sample_jobs,
+            [
+                os.path.join(folder, sample["sample"])
+                for folder in previous_cohorts
+                if os.path.isdir(os.path.join(folder, sample["sample"]))
+            ],
+        )
+        header = {
+            "name": "sample",
+            "sample": sample["sample"],
+            "number": number,
+            "total": len(samples),
+        }
+        jobs += [header] + [dict(job, sample=sample["sample"]) for job in sample_jobs]
+    return jobs, errors
+
+
+def write_cohort_index(cohort_dir, samples, jobs, statuses, errors):
+    """
+    Purpose:    Write the cohort index, listing the status, report and summary of every
+                comparison of every sample
+    Modifies:   Nothing
+    Returns:    Dictionary of the number of comparisons with each status
+    """
+    comparisons = {sample["sample"]: [] for sample in samples}
+    counts = {}
+    for job, status in zip(jobs, statuses):
+        if status is None:
+            continue
+        counts[status] = counts.get(status, 0) + 1
+        report = os.path.join(job["output_path"], job["report"])
+        comparison = {
+            "mhc_class": job["class_type"],
+            "comparison": job["name"],
+            "status": status,
+            "report": None,
+            "summary": None,
+        }
+        if status in ("completed", "reused") and os.path.exists(report):
+            comparison["report"] = os.path.relpath(report, cohort_dir)
+            comparison["summary"] = read_report_summary(report)
+        comparisons[job["sample"]].append(comparison)
+
+    index = {
+        "samples": [
+            {
+                "sample": sample["sample"],
+                "results_folder1": sample["results_folder1"],
+                "results_folder2": sample["results_folder2"],
+                "output_dir": sample["sample"],
+                "error": errors.get(sample["sample"]),
+                "comparisons": comparisons[sample["sample"]],
+            }
+            for sample in samples
+        ],
+        "status_counts": counts,
+    }
+    with open(os.path.join(cohort_dir, "cohort_index.json"), "w") as f:
+        json.dump(index, f, indent=4)
+    return counts
+
+
+def main():
+    """
+    Purpose:    Control function for a cohort, runs the comparison jobs of every sample of
+                the manifest on one shared pool of processes
+    Modifies:   Nothing
+    Returns:    None
+    """
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    parser = define_batch_parser()
+    args = parser.parse_args()
+    validate_comparison_arguments(args, parser)
+    try:
+        samples = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(f"Could not read the manifest {args.manifest}: {e}")
+
+    cohort_dir = create_unique_folder(args.output_dir, "cohort")
+    jobs, errors = get_cohort_jobs(args, samples, cohort_dir, get_table_cache(args))
+    statuses = run_comparison_jobs(
+        jobs, args.jobs, not args.stop_on_error, args.prefetch_max_size * 1024**3
+    )
+    counts = write_cohort_index(cohort_dir, samples, jobs, statuses, errors)
+
+    logging.info("\n" + "\u2550" * 55)
+    logging.info(
+        "Compared %d samples into %s: %s",
+        len(samples) - len(errors),
+        cohort_dir,
+        ", ".join(f"{count} {status}" for status, count in sorted(counts.items())),
+    )
+    if errors:
+        logging.error(
+            "ERROR: %d samples could not be compared: %s",
+            len(errors),
+            ", ".join(errors),
+        )
+    logging.info("\u2550" * 55)
+
+
+if __name__ == "__main__":
+    main()
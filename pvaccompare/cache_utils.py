@@ -0,0 +1,113 @@
+from file_utils import get_file_digest
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+# Default total size in GB of the tables kept in a table cache
+TABLE_CACHE_MAX_SIZE = 10
+
+
+# Parsed TSV tables and their ID columns kept on disk between runs, as pickles of the
+# column arrays. Entries are keyed by the contents of their input file and how it was
+# parsed, and the least recently used entries are evicted once the cache is too large.
+# Loading a pickle can run any code it holds, so the directory must not be writable by
+# other users
+class TableCache:
+    def __init__(self, directory, max_size=TABLE_CACHE_MAX_SIZE * 1024**3):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_key(self, input_file, *parts):
+        """
+        Purpose:    Key an entry by the digest, size and modification time of its input file
+                    and the parts describing how the file was read
+        Modifies:   Nothing
+        Returns:    String of the key
+        """
+        stat = os.stat(input_file)
+        return self.get_derived_key(
+            get_file_digest(input_file), stat.st_size, stat.st_mtime_ns, *parts
+        )
+
+    def get_derived_key(self, *parts):
+        """
+        Purpose:    Key an entry by parts, such as the key of the table it is derived from
+        Modifies:   Nothing
+        Returns:    String of the key
+        """
+        return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def load(self, key):
+        """
+        Purpose:    Read an entry, marking it as the most recently used
+        Modifies:   The modification time of the entry
+        Returns:    The cached value, or None when the key is not cached
+        """
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Truncated entries, and entries pickled by versions of pandas or numpy whose
+            # classes moved or changed
+            logging.warning("Discarding unreadable table cache entry %s: %s", path, e)
+            self.remove(path)
+            return None
+        return value
+
+    def store(self, key, value):
+        """
+        Purpose:    Write an entry, replacing the file in one step so concurrent runs never
+                    read it half written, then evict the least recently used entries
+        Modifies:   The cache directory
+        Returns:    None
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.get_path(key))
+        except BaseException:
+            self.remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Purpose:    Remove the least recently used entries until the cache fits its size
+        Modifies:   The cache directory
+        Returns:    None
+        """
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".pkl"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            logging.debug("Evicting table cache entry %s", path)
+            self.remove(path)
+            total_size -= size
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -1,2 +1,8 @@
-from .comparison_router import run_comparison
+from .comparison_router import (
+    run_comparison,
+    get_comparison_jobs,
+    index_results_folder,
+    run_comparison_jobs,
+    reuse_previous_results,
+)
 from .validators import *
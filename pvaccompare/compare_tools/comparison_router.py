@@ -1,33 +1,165 @@
-import glob
+from concurrent.futures import ProcessPoolExecutor
+import fnmatch
+import functools
+import hashlib
+import importlib
+import json
 import os
 import logging
-from runners import *
+import shutil
+import time
+from file_utils import DIFFERENCE_TOLERANCE, get_compression, get_file_digest
+from file_utils import inputs_are_identical, STREAMING_MIN_SIZE
+from prefetch_utils import InputPrefetcher, PREFETCH_MAX_SIZE
 
+# Comparisons in the order they are reported: name, results subfolder, file pattern
+COMPARISON_FILES = [
+    ("input YML", "/log", "inputs.yml"),
+    ("metrics JSON", "/", "*all_epitopes.aggregated.metrics.json"),
+    ("aggregated TSV", "/", "*all_epitopes.aggregated.tsv"),
+    ("unaggregated TSV", "/", "*all_epitopes.tsv"),
+    ("reference match TSV", "/", "*.reference_matches"),
+]
 
-def find_file(results_folder, subfolder, pattern):
+
+# Runner module of each comparison, imported by name when the comparison runs so that
+# finding the files never waits for the imports of the comparisons
+RUNNERS = {
+    "input YML": "run_compare_yml",
+    "metrics JSON": "run_compare_json",
+    "aggregated TSV": "run_compare_aggregated_tsv",
+    "unaggregated TSV": "run_compare_unaggregated_tsv",
+    "reference match TSV": "run_compare_reference_matches_tsv",
+}
+
+
+# Class folders of each layout of a results folder, the first layout found is used
+RESULTS_LAYOUTS = [
+    {"1": "MHC_Class_I", "2": "MHC_Class_II"},
+    {"1": "pVACseq/mhc_i", "2": "pVACseq/mhc_ii"},
+]
+
+
+# Report file written by each comparison
+REPORT_FILES = {
+    "input YML": "yml_input_data.json",
+    "metrics JSON": "json_input_data.json",
+    "aggregated TSV": "aggregated_data.json",
+    "unaggregated TSV": "unaggregated_data.json",
+    "reference match TSV": "reference_matches_data.json",
+}
+
+
+def index_results_folder(results_folder):
     """
-    Purpose:    Attempts to locate the files needed for each comparison
+    Purpose:    Scan a results folder once, listing the files of each comparison of each
+                MHC class, so finding the files of every comparison needs a single pass
+                over the folder however slow its file system is
     Modifies:   Nothing
-    Returns:    A string of the file path
+    Returns:    Dictionary of the MHC class types to dictionaries of the comparison names
+                to the paths of their matching files, in the order match_files gives
     """
-    search_path = os.path.join(results_folder, subfolder, pattern)
-    files = glob.glob(search_path, recursive=True)
-    return files[0] if files else None
+    layout = find_results_layout(results_folder)
+    subfolders = {subfolder for _, subfolder, _ in COMPARISON_FILES}
+    index = {}
+    for class_type, prefix in layout.items():
+        names = {
+            subfolder: list_files(os.path.join(results_folder, prefix + subfolder))
+            for subfolder in subfolders
+        }
+        index[class_type] = {
+            name: [
+                os.path.join(results_folder, prefix + subfolder, file_name)
+                for file_name in match_files(names[subfolder], pattern)
+            ]
+            for name, subfolder, pattern in COMPARISON_FILES
+        }
+    return index
 
 
-def get_prefix(class_type, results_folder):
-    if os.path.exists(os.path.join(results_folder, "MHC_Class_I")) or os.path.exists(
-        os.path.join(results_folder, "MHC_Class_II")
-    ):
-        return "MHC_Class_I" if class_type == "1" else "MHC_Class_II"
-    elif os.path.exists(
-        os.path.join(results_folder, "pVACseq/mhc_i")
-    ) or os.path.exists(os.path.join(results_folder, "pVACseq/mhc_ii")):
-        return "pVACseq/mhc_i" if class_type == "1" else "pVACseq/mhc_ii"
-    else:
-        raise FileNotFoundError(
-            f"Could not locate result files for folder: {results_folder}"
+def find_results_layout(results_folder):
+    """
+    Purpose:    Find how the class folders of a results folder are laid out
+    Modifies:   Nothing
+    Returns:    Dictionary of the MHC class types to their folder in the results folder
+    """
+    folders = {"": set(list_files(results_folder, folders=True))}
+    for layout in RESULTS_LAYOUTS:
+        for folder in layout.values():
+            parent, name = os.path.split(folder)
+            if parent not in folders:
+                folders[parent] = set(
+                    list_files(os.path.join(results_folder, parent), folders=True)
+                )
+            if name in folders[parent]:
+                return layout
+    raise FileNotFoundError(
+        f"Could not locate result files for folder: {results_folder}"
+    )
+
+
+def list_files(folder, folders=False):
+    """
+    Purpose:    List the files, or the subfolders, of a folder, leaving out hidden ones
+                like glob does
+    Modifies:   Nothing
+    Returns:    Sorted list of the names, empty when the folder does not exist
+    """
+    try:
+        with os.scandir(folder) as it:
+            return sorted(
+                entry.name
+                for entry in it
+                if not entry.name.startswith(".")
+                and (entry.is_dir() if folders else entry.is_file())
+            )
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def match_files(names, pattern):
+    """
+    Purpose:    Find the file names matching the pattern of a comparison, uncompressed or
+                ending in the extension of a compression
+    Modifies:   Nothing
+    Returns:    List of the names, uncompressed files first and then by name
+    """
+    matches = [
+        name
+        for name in names
+        if fnmatch.fnmatch(
+            os.path.splitext(name)[0] if get_compression(name) else name, pattern
         )
+    ]
+    return sorted(matches, key=lambda name: (get_compression(name) is not None, name))
+
+
+def find_file(folder_index, class_type, name):
+    """
+    Purpose:    Choose the file of a comparison from the index of its results folder, the
+                first in the order of match_files when several files match
+    Modifies:   Nothing
+    Returns:    A string of the file path, or None when no file matches
+    """
+    files = folder_index[class_type][name]
+    if len(files) > 1:
+        logging.warning(
+            "WARNING: Found %d %s files for MHC Class %s, using %s",
+            len(files),
+            name,
+            "I" if class_type == "1" else "II",
+            files[0],
+        )
+    return files[0] if files else None
+
+
+class BufferedLogHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append((record.levelno, record.getMessage()))
 
 
 def run_comparison(
@@ -38,171 +170,490 @@ def run_comparison(
     aggregated_columns,
     unaggregated_columns,
     reference_match_columns,
+    hashed_ids=False,
+    streaming=False,
+    workers=1,
+    jobs=1,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
+    summary_only=False,
+    max_differences=None,
+    table_cache=None,
+    streaming_min_size=STREAMING_MIN_SIZE,
 ):
     """
     Purpose:    Runs all of the different comparisons
     Modifies:   Nothing
     Returns:    None
     """
-    folder1_prefix = get_prefix(class_type, results_folder1)
-    folder2_prefix = get_prefix(class_type, results_folder2)
+    run_comparison_jobs(
+        get_comparison_jobs(
+            class_type,
+            results_folder1,
+            results_folder2,
+            output_dir,
+            aggregated_columns,
+            unaggregated_columns,
+            reference_match_columns,
+            hashed_ids,
+            streaming,
+            workers,
+            compact_json,
+            shard_differences,
+            columnar_differences,
+            summary_only,
+            max_differences,
+            table_cache,
+            streaming_min_size=streaming_min_size,
+        ),
+        jobs,
+    )
+
+
+def get_comparison_jobs(
+    class_type,
+    results_folder1,
+    results_folder2,
+    output_dir,
+    aggregated_columns,
+    unaggregated_columns,
+    reference_match_columns,
+    hashed_ids=False,
+    streaming=False,
+    workers=1,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
+    summary_only=False,
+    max_differences=None,
+    table_cache=None,
+    folder_indexes=None,
+    streaming_min_size=STREAMING_MIN_SIZE,
+):
+    """
+    Purpose:    Locates the files of each comparison of an MHC class, in the indexes of
+                the two results folders when they were already scanned
+    Modifies:   Nothing
+    Returns:    List of the comparison jobs in the order they are reported, ending with the
+                report summary of the class
+    """
+    if folder_indexes is None:
+        folder_indexes = [
+            index_results_folder(results_folder1),
+            index_results_folder(results_folder2),
+        ]
     output_path = (
         f'{output_dir}/{"mhc_class_i" if class_type == "1" else "mhc_class_ii"}'
     )
+    comparison_columns = {
+        "aggregated TSV": (aggregated_columns,),
+        "unaggregated TSV": (unaggregated_columns,),
+        "reference match TSV": (reference_match_columns,),
+    }
 
-    yml1_path = find_file(results_folder1, folder1_prefix + "/log", "inputs.yml")
-    yml2_path = find_file(results_folder2, folder2_prefix + "/log", "inputs.yml")
-    if yml1_path and yml2_path:
-        logging.info("Running the input YML comparison tool...")
-        run_compare_yml(yml1_path, yml2_path, output_path, class_type)
-        logging.info("\u2713 Comparison completed successfully.")
-    else:
-        if yml1_path:
-            logging.error(
-                "ERROR: Could not locate the input YML file in results folder 2 for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        elif yml2_path:
-            logging.error(
-                "ERROR: Could not locate the input YML file in results folder 1 for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        else:
-            logging.error(
-                "ERROR: Could not locate the input YML file in either results folder for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
+    jobs = []
+    for name, _, _ in COMPARISON_FILES:
+        columns = comparison_columns.get(name, ())
+        path1 = find_file(folder_indexes[0], class_type, name)
+        path2 = find_file(folder_indexes[1], class_type, name)
+        args = (path1, path2) + columns + (output_path, class_type)
+        kwargs = {"compact_json": compact_json}
+        if columns:
+            args += (hashed_ids, streaming, workers)
+            kwargs["shard_differences"] = shard_differences
+            kwargs["columnar_differences"] = columnar_differences
+            kwargs["summary_only"] = summary_only
+            kwargs["max_differences"] = max_differences
+            kwargs["table_cache"] = table_cache
+            kwargs["streaming_min_size"] = streaming_min_size
+        # The options that change the report, the engine options give the same report
+        options = {
+            key: value
+            for key, value in kwargs.items()
+            if key not in ["table_cache", "streaming_min_size"]
+        }
+        options["columns"] = list(columns[0]) if columns else None
+        jobs.append(
+            {
+                "name": name,
+                "class_type": class_type,
+                "first": not jobs,
+                "paths": [path1, path2],
+                "runner": RUNNERS[name],
+                "args": args,
+                "kwargs": kwargs,
+                "output_path": output_path,
+                "report": REPORT_FILES[name],
+                "options": options,
+            }
+        )
+    jobs.append({"name": "summary", "class_type": class_type})
+    return jobs
 
-        logging.info("\u2716 Comparison skipped.")
 
-    json1_path = find_file(
-        results_folder1, folder1_prefix + "/", "*all_epitopes.aggregated.metrics.json"
-    )
-    json2_path = find_file(
-        results_folder2, folder2_prefix + "/", "*all_epitopes.aggregated.metrics.json"
-    )
-    if json1_path and json2_path:
-        logging.info("\nRunning the metrics JSON comparison tool...")
-        run_compare_json(json1_path, json2_path, output_path, class_type)
-        logging.info("\u2713 Comparison completed successfully.")
-    else:
-        if json1_path:
-            logging.error(
-                "ERROR: Could not locate the metrics JSON file in results folder 2 for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        elif json2_path:
-            logging.error(
-                "ERROR: Could not locate the metrics JSON file in results folder 1 for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        else:
-            logging.error(
-                "ERROR: Could not locate the metrics JSON file in either results folder for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        logging.info("\u2716 Comparison skipped.")
+def run_comparison_jobs(
+    jobs, num_jobs=1, keep_going=False, prefetch_max_size=PREFETCH_MAX_SIZE * 1024**3
+):
+    """
+    Purpose:    Runs comparison jobs, at most num_jobs at a time on a process pool with the
+                largest inputs started first. The log lines of each job are buffered and
+                written in the order of the jobs, so they read as if run one by one. Jobs
+                run one at a time read the TSV inputs of the next jobs ahead, holding at
+                most prefetch_max_size bytes. A failed job stops the run, unless keep_going
+                is set
+    Modifies:   Nothing
+    Returns:    List of the status of each job: "completed", "reused", "skipped",
+                "failed", or None for the jobs that only log
+    """
+    statuses = []
+    if num_jobs == 1:
+        prefetcher = InputPrefetcher(get_prefetch_paths(jobs), prefetch_max_size)
+        try:
+            for job in jobs:
+                try:
+                    statuses.append(run_comparison_job(job, prefetcher))
+                except Exception as e:
+                    if not keep_going:
+                        raise
+                    statuses.append(log_failed_job(job, e))
+                finally:
+                    prefetcher.release(job.get("paths", []))
+        finally:
+            prefetcher.close()
+        return statuses
 
-    agg_tsv1_path = find_file(
-        results_folder1, folder1_prefix + "/", "*all_epitopes.aggregated.tsv"
-    )
-    agg_tsv2_path = find_file(
-        results_folder2, folder2_prefix + "/", "*all_epitopes.aggregated.tsv"
-    )
-    if agg_tsv1_path and agg_tsv2_path:
-        logging.info("\nRunning the aggregated TSV comparison tool...")
-        run_compare_aggregated_tsv(
-            agg_tsv1_path, agg_tsv2_path, aggregated_columns, output_path, class_type
+    order = sorted(range(len(jobs)), key=lambda i: -get_job_size(jobs[i]))
+    level = logging.getLogger().getEffectiveLevel()
+    with ProcessPoolExecutor(max_workers=num_jobs) as executor:
+        futures = {i: executor.submit(run_buffered_job, jobs[i], level) for i in order}
+        for i in range(len(jobs)):
+            try:
+                messages, status = futures[i].result()
+            except Exception as e:
+                if keep_going:
+                    write_log_messages(getattr(e, "log_messages", []))
+                    statuses.append(log_failed_job(jobs[i], e))
+                    continue
+                executor.shutdown(cancel_futures=True)
+                write_log_messages(getattr(e, "log_messages", []))
+                raise
+            write_log_messages(messages)
+            statuses.append(status)
+    return statuses
+
+
+def get_prefetch_paths(jobs):
+    """
+    Purpose:    List the TSV inputs that will be parsed whole in this process, in the order
+                the jobs parse them
+    Modifies:   Nothing
+    Returns:    List of file paths
+    """
+    paths = []
+    for job in jobs:
+        if job["name"] not in REPORT_FILES or job["options"]["columns"] is None:
+            continue
+        streaming, workers = job["args"][-2:]
+        if all(job["paths"]) and not job.get("reused_from") and not streaming:
+            paths += job["paths"] if workers == 1 else []
+    return paths
+
+
+def log_failed_job(job, error):
+    """
+    Purpose:    Logs a comparison job that raised an error, for runs that keep going
+    Modifies:   Nothing
+    Returns:    String of the job status
+    """
+    logging.error("ERROR: The %s comparison failed: %s", job["name"], error)
+    logging.info("\u2716 Comparison failed.")
+    return "failed"
+
+
+def get_job_size(job):
+    """
+    Purpose:    Measures the inputs of a job to schedule the largest jobs first
+    Modifies:   Nothing
+    Returns:    Integer number of bytes
+    """
+    return sum(os.path.getsize(path) for path in job.get("paths", []) if path)
+
+
+def run_buffered_job(job, level):
+    """
+    Purpose:    Runs a comparison job in a worker process, keeping its log lines
+    Modifies:   Nothing
+    Returns:    List of the (level, message) pairs logged by the job and its status
+    """
+    root = logging.getLogger()
+    handlers = root.handlers
+    handler = BufferedLogHandler()
+    root.handlers = [handler]
+    root.setLevel(level)
+    try:
+        status = run_comparison_job(job)
+    except Exception as e:
+        e.log_messages = handler.messages
+        raise
+    finally:
+        root.handlers = handlers
+    return handler.messages, status
+
+
+def write_log_messages(messages):
+    for level, message in messages:
+        logging.log(level, "%s", message)
+
+
+def run_comparison_job(job, prefetcher=None):
+    """
+    Purpose:    Runs one comparison job, or logs why it is skipped. TSV comparisons take the
+                inputs the prefetcher read ahead
+    Modifies:   Nothing
+    Returns:    String of the job status, or None for the jobs that only log
+    """
+    if job["name"] == "sample":
+        logging.info("\n" + "\u2550" * 55)
+        logging.info(
+            "Comparing sample %s (%d of %d)", job["sample"], job["number"], job["total"]
         )
-        logging.info("\u2713 Comparison completed successfully.")
-    else:
-        if agg_tsv1_path:
-            logging.error(
-                "ERROR: Could not locate the aggregated TSV file in results folder 2 for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        elif agg_tsv2_path:
-            logging.error(
-                "ERROR: Could not locate the aggregated TSV file in results folder 1 for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        else:
-            logging.error(
-                "ERROR: Could not locate the aggregated TSV file in either results folder for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        logging.info("\u2716 Comparison skipped.")
+        logging.info("\u2550" * 55)
+        return None
 
-    unagg_tsv1_path = find_file(
-        results_folder1, folder1_prefix + "/", "*all_epitopes.tsv"
-    )
-    unagg_tsv2_path = find_file(
-        results_folder2, folder2_prefix + "/", "*all_epitopes.tsv"
-    )
-    if unagg_tsv1_path and unagg_tsv2_path:
-        logging.info("\nRunning the unaggregated TSV comparison tool...")
-        run_compare_unaggregated_tsv(
-            unagg_tsv1_path,
-            unagg_tsv2_path,
-            unaggregated_columns,
-            output_path,
-            class_type,
+    class_name = "I" if job["class_type"] == "1" else "II"
+    if job["name"] == "summary":
+        logging.info("\n" + "\u2500" * 55)
+        logging.info(
+            "Successfully generated MHC Class %s comparison report.", class_name
         )
-        logging.info("\u2713 Comparison completed successfully.")
-    else:
-        if unagg_tsv1_path:
-            logging.error(
-                "ERROR: Could not locate the unaggregated TSV file in results folder 2 for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        elif unagg_tsv2_path:
-            logging.error(
-                "ERROR: Could not locate the unaggregated TSV file in results folder 1 for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        else:
-            logging.error(
-                "ERROR: Could not locate the unaggregated TSV file in either results folder for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        logging.info("\u2716 Comparison skipped.")
+        logging.info("\u2500" * 55)
+        return None
 
-    refmatch_tsv1_path = find_file(
-        results_folder1, folder1_prefix + "/", "*.reference_matches"
-    )
-    refmatch_tsv2_path = find_file(
-        results_folder2, folder2_prefix + "/", "*.reference_matches"
-    )
-    if refmatch_tsv1_path and refmatch_tsv2_path:
-        logging.info("\nRunning the reference match TSV comparison tool...")
-        run_compare_reference_matches_tsv(
-            refmatch_tsv1_path,
-            refmatch_tsv2_path,
-            reference_match_columns,
-            output_path,
-            class_type,
+    newline = "" if job["first"] else "\n"
+    path1, path2 = job["paths"]
+    if job.get("reused_from"):
+        logging.info(
+            f"{newline}Reused the {job['name']} comparison of %s.",
+            job["reused_from"],
         )
+        return "reused"
+    if path1 and path2:
+        logging.info(f"{newline}Running the {job['name']} comparison tool...")
+        kwargs = job["kwargs"]
+        start = time.perf_counter()
+        if inputs_are_identical(path1, path2):
+            logging.info(
+                "\u2022 The input files are byte-identical (checked in %.2fs)",
+                time.perf_counter() - start,
+            )
+            kwargs = dict(kwargs, identical_inputs=True)
+        if prefetcher is not None and job["options"]["columns"] is not None:
+            kwargs = dict(kwargs, prefetcher=prefetcher)
+        get_runner(job["runner"])(*job["args"], **kwargs)
+        write_job_fingerprint(job)
         logging.info("\u2713 Comparison completed successfully.")
+        return "completed"
+
+    if path1:
+        location = "results folder 2"
+    elif path2:
+        location = "results folder 1"
     else:
-        if refmatch_tsv1_path:
-            logging.error(
-                "ERROR: Could not locate the reference match TSV file in results folder 2 for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        elif refmatch_tsv2_path:
-            logging.error(
-                "ERROR: Could not locate the reference match TSV file in results folder 1 for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        else:
-            logging.error(
-                "ERROR: Could not locate the reference match TSV file in either results folder for MHC Class %s.",
-                "I" if class_type == "1" else "II",
-            )
-        logging.info("\u2716 Comparison skipped.")
-    logging.info("\n" + "\u2500" * 55)
-    logging.info(
-        "Successfully generated MHC Class %s comparison report.",
-        "I" if class_type == "1" else "II",
+        location = "either results folder"
+    logging.error(
+        "ERROR: Could not locate the %s file in %s for MHC Class %s.",
+        job["name"],
+        location,
+        class_name,
     )
-    logging.info("\u2500" * 55)
+    logging.info("\u2716 Comparison skipped.")
+    return "skipped"
+
+
+def get_runner(name):
+    """
+    Purpose:    Import the runner of a comparison, with the dependencies of its comparison
+    Modifies:   Nothing
+    Returns:    The main function of the runner module
+    """
+    return importlib.import_module(f"runners.{name}").main
+
+
+def reuse_previous_results(jobs, previous_output_dirs):
+    """
+    Purpose:    Reuse the reports of earlier runs for the comparison jobs whose inputs and
+                options are unchanged, linking them into the new output folder. The most
+                recent matching report of previous_output_dirs is used. Inputs with the
+                size and modification time an earlier fingerprint recorded are taken as
+                unchanged. Other inputs are only hashed when an earlier report matches on
+                every other field and has the digests of its inputs
+    Modifies:   The jobs that are reused, and their output folders
+    Returns:    None
+    """
+    reused = []
+    for job in jobs:
+        if job["name"] not in REPORT_FILES or not all(job["paths"]):
+            continue
+        fingerprint = get_job_fingerprint(job)
+        fields = get_fingerprint_fields(fingerprint)
+        digests = None
+        class_folder = os.path.basename(job["output_path"])
+        for previous_dir in previous_output_dirs:
+            previous_path = os.path.join(previous_dir, class_folder)
+            previous = read_fingerprint(previous_path, job["report"])
+            if previous is None or get_fingerprint_fields(previous) != fields:
+                continue
+            if previous.get("input_mtimes") == fingerprint["input_mtimes"]:
+                # Keep the digests recorded for the unchanged inputs for the next runs
+                earlier_digests = previous.get("input_digests") or [None] * 2
+                recorded_digests = [
+                    known or earlier
+                    for known, earlier in zip(
+                        fingerprint["input_digests"], earlier_digests
+                    )
+                ]
+            else:
+                earlier_digests = previous.get("input_digests") or [None]
+                if None in earlier_digests:
+                    continue
+                if digests is None:
+                    digests = [get_file_digest(path) for path in job["paths"]]
+                if earlier_digests != digests:
+                    continue
+                recorded_digests = digests
+            job["fingerprint"] = dict(fingerprint, input_digests=recorded_digests)
+            link_report(previous_path, job["output_path"], job["report"])
+            write_job_fingerprint(job)
+            job["reused_from"] = previous_dir
+            reused.append(job)
+            break
+
+    if reused:
+        logging.info("Reusing %d unchanged comparisons:", len(reused))
+        for job in reused:
+            logging.info(
+                "\u2022 MHC Class %s %s from %s",
+                "I" if job["class_type"] == "1" else "II",
+                job["name"],
+                job["reused_from"],
+            )
+        logging.info("")
+
+
+def get_job_fingerprint(job):
+    """
+    Purpose:    Describe everything the report of a comparison job depends on. The inputs
+                are described by their sizes and modification times, and by the digests
+                this process already computed for them, such as when checking if they are
+                byte-identical, so writing a fingerprint never reads the inputs again
+    Modifies:   Nothing
+    Returns:    Dictionary of the fingerprint
+    """
+    stats = [os.stat(path) for path in job["paths"]]
+    return {
+        "comparison": job["name"],
+        "mhc_class": job["class_type"],
+        "input_files": list(job["paths"]),
+        "input_sizes": [stat.st_size for stat in stats],
+        "input_mtimes": [stat.st_mtime_ns for stat in stats],
+        "input_digests": [
+            get_file_digest(path, known_only=True) for path in job["paths"]
+        ],
+        "options": job["options"],
+        "tolerance": DIFFERENCE_TOLERANCE,
+        "tool_version": get_tool_version(),
+    }
+
+
+def get_fingerprint_fields(fingerprint):
+    """
+    Purpose:    Take the fields of a fingerprint that must match for its report to be
+                reused, leaving the modification times and digests of the inputs
+    Modifies:   Nothing
+    Returns:    Dictionary of the fields
+    """
+    return {
+        key: value
+        for key, value in fingerprint.items()
+        if key not in ["input_mtimes", "input_digests"]
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_tool_version():
+    """
+    Purpose:    Hash the source code that writes the reports, so reports of another version
+                of the tool are never reused
+    Modifies:   Nothing
+    Returns:    String of the hex digest
+    """
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.blake2b(digest_size=16)
+    for root, dirs, files in os.walk(package_dir):
+        dirs[:] = sorted(
+            d for d in dirs if d not in ("tests", "html_report", "__pycache__")
+        )
+        for name in sorted(files):
+            if name.endswith(".py"):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, package_dir).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def get_fingerprint_path(output_path, report):
+    return os.path.join(output_path, f"{os.path.splitext(report)[0]}.fingerprint.json")
+
+
+def read_fingerprint(output_path, report):
+    """
+    Purpose:    Read the fingerprint written next to a report
+    Modifies:   Nothing
+    Returns:    Dictionary of the fingerprint, or None when the report has none
+    """
+    path = get_fingerprint_path(output_path, report)
+    if not os.path.exists(os.path.join(output_path, report)):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_job_fingerprint(job):
+    """
+    Purpose:    Write the fingerprint of a finished comparison next to its report, kept in
+                its own small file so later runs check it without parsing the report
+    Modifies:   Nothing
+    Returns:    None
+    """
+    fingerprint = job.get("fingerprint") or get_job_fingerprint(job)
+    with open(get_fingerprint_path(job["output_path"], job["report"]), "w") as f:
+        json.dump(fingerprint, f, indent=4)
+
+
+def link_report(source_path, output_path, report):
+    """
+    Purpose:    Hard link a report and its difference shards into another output folder,
+                copying them when the folders are on different file systems
+    Modifies:   The output folder
+    Returns:    None
+    """
+    link_or_copy(os.path.join(source_path, report), os.path.join(output_path, report))
+    shard_folder = f"{os.path.splitext(report)[0]}_shards"
+    if os.path.isdir(os.path.join(source_path, shard_folder)):
+        shutil.copytree(
+            os.path.join(source_path, shard_folder),
+            os.path.join(output_path, shard_folder),
+            copy_function=link_or_copy,
+        )
+
+
+def link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
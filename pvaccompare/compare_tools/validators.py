@@ -119,3 +119,57 @@ def validate_reference_match_columns(reference_match_columns, parser):
             parser.error(
                 f"Invalid reference match column '{col}' specified.\nValid columns are: {', '.join(valid_reference_match_columns)}"
             )
+
+
+def validate_process_count(count, option, parser):
+    """
+    Purpose:    Makes sure the user inputs a usable number of processes
+    Modifies:   Nothing
+    Returns:    None
+    """
+    if count < 1:
+        parser.error(f"Invalid number of {option} '{count}', at least 1 is needed")
+
+
+def validate_max_differences(max_differences, parser):
+    """
+    Purpose:    Makes sure the user inputs a usable number of differences to keep per column
+    Modifies:   Nothing
+    Returns:    None
+    """
+    if max_differences is not None and max_differences < 1:
+        parser.error(
+            f"Invalid maximum number of differences per column '{max_differences}', at least 1 is needed"
+        )
+
+
+def validate_cache_max_size(max_size, parser):
+    """
+    Purpose:    Makes sure the user inputs a usable size for the table cache
+    Modifies:   Nothing
+    Returns:    None
+    """
+    if not max_size > 0:
+        parser.error(
+            f"Invalid table cache size '{max_size}' GB, it must be greater than 0"
+        )
+
+
+def validate_prefetch_max_size(max_size, parser):
+    """
+    Purpose:    Makes sure the user inputs a usable size for the data read ahead
+    Modifies:   Nothing
+    Returns:    None
+    """
+    if not max_size >= 0:
+        parser.error(f"Invalid prefetch size '{max_size}' GB, it must be 0 or greater")
+
+
+def validate_streaming_min_size(min_size, parser):
+    """
+    Purpose:    Makes sure the user inputs a usable size for switching to the streaming engine
+    Modifies:   Nothing
+    Returns:    None
+    """
+    if not min_size >= 0:
+        parser.error(f"Invalid streaming size '{min_size}' GB, it must be 0 or greater")
@@ -1,5 +1,18 @@
-from .compare_aggregated_tsv import CompareAggregatedTSV
-from .compare_json import CompareJSON
-from .compare_reference_matches_tsv import CompareReferenceMatchesTSV
-from .compare_unaggregated_tsv import CompareUnaggregatedTSV
-from .compare_yml import CompareYML
+import importlib
+
+# Module of each comparison class, imported on first use so that a comparison only
+# imports the dependencies it needs
+COMPARISON_MODULES = {
+    "CompareAggregatedTSV": "compare_aggregated_tsv",
+    "CompareJSON": "compare_json",
+    "CompareReferenceMatchesTSV": "compare_reference_matches_tsv",
+    "CompareUnaggregatedTSV": "compare_unaggregated_tsv",
+    "CompareYML": "compare_yml",
+}
+
+
+def __getattr__(name):
+    if name not in COMPARISON_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{COMPARISON_MODULES[name]}", __name__)
+    return getattr(module, name)
@@ -3,18 +3,39 @@ import logging
 
 
 class CompareAggregatedTSV:
-    def __init__(self, input_file1, input_file2, columns_to_compare):
+    ID_replacement_cols = ["Gene", "AA Change"]
+
+    def __init__(
+        self,
+        input_file1,
+        input_file2,
+        columns_to_compare,
+        hashed_ids=False,
+        identical_inputs=False,
+        table_cache=None,
+        prefetcher=None,
+    ):
         self.input_file1 = input_file1
         self.input_file2 = input_file2
-        self.df1, self.df2 = load_tsv_files(self.input_file1, self.input_file2)
         self.contains_id = True
         self.replaced_id = False
-        self.ID_replacement_cols = ["Gene", "AA Change"]
+        self.df1, self.df2 = load_tsv_files(
+            self.input_file1,
+            self.input_file2,
+            ["ID"] + self.ID_replacement_cols,
+            columns_to_compare,
+            identical_inputs,
+            table_cache,
+            prefetcher,
+        )
         self.columns_to_compare = columns_to_compare
+        self.hashed_ids = hashed_ids
+        self.table_cache = table_cache
 
-    def check_id(self):
+    def check_id(self, sort_keys=True):
         """
-        Purpose:    Replace ID with Gene-AA_change if needed
+        Purpose:    Replace ID with Gene-AA_change if needed, add the sort keys unless the
+                    variants are only counted, and hash the IDs in hashed ID mode
         Modifies:   self.contains_id, self.replaced_id
         Returns:    None
         """
@@ -28,6 +49,11 @@ class CompareAggregatedTSV:
                 self.combine_gene_and_AA_change()
                 logging.info("\u2022 Replaced ID with Gene and AA Change")
                 self.replaced_id = True
+        if "ID" in self.df1.columns and "ID" in self.df2.columns:
+            if sort_keys:
+                add_sort_keys(self.df1, self.df2, self.contains_id)
+            if self.hashed_ids:
+                add_id_keys(self.df1, self.df2, ["ID"])
 
     def combine_gene_and_AA_change(self):
         """
@@ -35,17 +61,17 @@ class CompareAggregatedTSV:
         Modifies:   df1 and df2
         Returns:    None
         """
-        self.df1["ID"] = (
-            self.df1[self.ID_replacement_cols[0]].astype(str)
-            + " ("
-            + self.df1[self.ID_replacement_cols[1]].astype(str)
-            + ")"
+        self.df1["ID"] = get_id_column(
+            self.df1,
+            self.ID_replacement_cols,
+            self.table_cache,
+            build_replaced_id_column,
         )
-        self.df2["ID"] = (
-            self.df2[self.ID_replacement_cols[0]].astype(str)
-            + " ("
-            + self.df2[self.ID_replacement_cols[1]].astype(str)
-            + ")"
+        self.df2["ID"] = get_id_column(
+            self.df2,
+            self.ID_replacement_cols,
+            self.table_cache,
+            build_replaced_id_column,
         )
 
         self.df1.drop(columns=self.ID_replacement_cols, inplace=True)
@@ -1,4 +1,5 @@
 import json
+from file_utils import open_input
 
 
 class CompareJSON:
@@ -14,7 +15,7 @@ class CompareJSON:
         Modifies:   Nothing
         Returns:    Two dictionaries corresponding to the two input files
         """
-        with open(self.input_file1) as f1, open(self.input_file2) as f2:
+        with open_input(self.input_file1) as f1, open_input(self.input_file2) as f2:
             json1 = json.load(f1)
             json2 = json.load(f2)
         return json1, json2
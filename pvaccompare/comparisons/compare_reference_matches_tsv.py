@@ -3,83 +3,85 @@ import logging
 
 
 class CompareReferenceMatchesTSV:
-    def __init__(self, input_file1, input_file2, columns_to_compare):
+    id_columns = [
+        "Chromosome",
+        "Start",
+        "Stop",
+        "Reference",
+        "Variant",
+        "Transcript",
+        "MT Epitope Seq",
+        "Hit ID",
+        "Match Start",
+        "Match Stop",
+    ]
+
+    def __init__(
+        self,
+        input_file1,
+        input_file2,
+        columns_to_compare,
+        hashed_ids=False,
+        identical_inputs=False,
+        table_cache=None,
+        prefetcher=None,
+    ):
         self.input_file1 = input_file1
         self.input_file2 = input_file2
-        self.df1, self.df2 = load_tsv_files(self.input_file1, self.input_file2)
+        self.df1, self.df2 = load_tsv_files(
+            self.input_file1,
+            self.input_file2,
+            self.id_columns,
+            columns_to_compare,
+            identical_inputs,
+            table_cache,
+            prefetcher,
+        )
         self.columns_to_compare = columns_to_compare
+        self.hashed_ids = hashed_ids
+        self.table_cache = table_cache
         self.run_notes = []
         self.hits_file1 = {}
         self.hits_file2 = {}
 
-    def create_id_column(self):
+    def create_id_column(self, sort_keys=True):
         """
-        Purpose:    Combines multiple columns into a singular unique ID column in both dataframes
+        Purpose:    Combines multiple columns into a singular unique ID column in both dataframes,
+                    or into hashed ID keys in hashed ID mode, and adds the sort keys unless
+                    the variants are only counted
         Modifies:   df1 and df2
         Returns:    None
         """
-        id_columns = [
-            "Chromosome",
-            "Start",
-            "Stop",
-            "Reference",
-            "Variant",
-            "Transcript",
-            "MT Epitope Seq",
-            "Hit ID",
-            "Match Start",
-            "Match Stop",
-        ]
-        self.df1["ID"] = self.df1[id_columns].apply(
-            lambda x: "-".join(map(str, x)), axis=1
-        )
-        self.df2["ID"] = self.df2[id_columns].apply(
-            lambda x: "-".join(map(str, x)), axis=1
-        )
+        if sort_keys:
+            add_sort_keys(self.df1, self.df2)
+        if self.hashed_ids and add_id_keys(self.df1, self.df2, self.id_columns):
+            return
+
+        self.df1["ID"] = get_id_column(self.df1, self.id_columns, self.table_cache)
+        self.df2["ID"] = get_id_column(self.df2, self.id_columns, self.table_cache)
 
-        self.df1.drop(columns=id_columns, inplace=True)
-        self.df2.drop(columns=id_columns, inplace=True)
+        self.df1.drop(columns=self.id_columns, inplace=True)
+        self.df2.drop(columns=self.id_columns, inplace=True)
 
-    def check_duplicate_ids(self):
+    def check_duplicate_ids(self, count_hits=True):
         """
-        Purpose:    Checks if duplicate IDs exist in either dataframe
-        Modifies:   Nothing
+        Purpose:    Checks if duplicate IDs exist in either dataframe, counting the hits of
+                    each variant when they do
+        Modifies:   self.run_notes, self.hits_file1, self.hits_file2
         Returns:    Boolean value
         """
-        self.hits_file1 = self.df1["ID"].value_counts().to_dict()
-        self.hits_file2 = self.df2["ID"].value_counts().to_dict()
-
-        max_hits_file1 = max(self.hits_file1.values(), default=0)
-        max_hits_file2 = max(self.hits_file2.values(), default=0)
+        key = get_id_key(self.df1)
+        max_hits_file1 = self.df1[key].value_counts().max() if len(self.df1) else 0
+        max_hits_file2 = self.df2[key].value_counts().max() if len(self.df2) else 0
 
         if max_hits_file1 > 1 or max_hits_file2 > 1:
-            if max_hits_file1 > 1 and max_hits_file2 > 1:
-                logging.error(
-                    "ERROR: Duplicate unique records were found in both files. Writing number of hits only."
-                )
-                self.run_notes.append(
-                    "ERROR: Duplicate unique records were found in both files. Writing number of hits only."
-                )
-            elif max_hits_file1 > 1:
-                logging.error(
-                    "ERROR: Duplicate unique records were found in file 1. Writing number of hits only."
-                )
-                self.run_notes.append(
-                    "ERROR: Duplicate unique records were found in file 1. Writing number of hits only."
-                )
-            else:
-                logging.error(
-                    "ERROR: Duplicate unique records were found in file 2. Writing number of hits only."
-                )
-                self.run_notes.append(
-                    "ERROR: Duplicate unique records were found in file 2. Writing number of hits only."
-                )
-            self.hits_file1 = dict(
-                sorted(self.hits_file1.items(), key=lambda x: extract_id_parts(x[0]))
-            )
-            self.hits_file2 = dict(
-                sorted(self.hits_file2.items(), key=lambda x: extract_id_parts(x[0]))
-            )
+            note = get_duplicate_ids_note(max_hits_file1 > 1, max_hits_file2 > 1)
+            logging.error(note)
+            self.run_notes.append(note)
+            if not count_hits:
+                return True
+            self.hits_file1 = get_id_counts(self.df1)
+            self.hits_file2 = get_id_counts(self.df2)
             return True
         else:
             return False
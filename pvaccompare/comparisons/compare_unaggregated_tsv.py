@@ -2,35 +2,58 @@ from run_utils import *
 
 
 class CompareUnaggregatedTSV:
-    def __init__(self, input_file1, input_file2, columns_to_compare):
+    id_columns = [
+        "Chromosome",
+        "Start",
+        "Stop",
+        "Reference",
+        "Variant",
+        "HLA Allele",
+        "Sub-peptide Position",
+        "MT Epitope Seq",
+        "Index",
+    ]
+
+    def __init__(
+        self,
+        input_file1,
+        input_file2,
+        columns_to_compare,
+        hashed_ids=False,
+        identical_inputs=False,
+        table_cache=None,
+        prefetcher=None,
+    ):
         self.input_file1 = input_file1
         self.input_file2 = input_file2
-        self.df1, self.df2 = load_tsv_files(self.input_file1, self.input_file2)
+        self.df1, self.df2 = load_tsv_files(
+            self.input_file1,
+            self.input_file2,
+            self.id_columns,
+            columns_to_compare,
+            identical_inputs,
+            table_cache,
+            prefetcher,
+        )
         self.columns_to_compare = columns_to_compare
+        self.hashed_ids = hashed_ids
+        self.table_cache = table_cache
 
-    def create_id_column(self):
+    def create_id_column(self, sort_keys=True):
         """
-        Purpose:    Combines multiple columns into a singular unique ID column in both dataframes
+        Purpose:    Combines multiple columns into a singular unique ID column in both dataframes,
+                    or into hashed ID keys in hashed ID mode, and adds the sort keys unless
+                    the variants are only counted
         Modifies:   df1 and df2
         Returns:    None
         """
-        id_columns = [
-            "Chromosome",
-            "Start",
-            "Stop",
-            "Reference",
-            "Variant",
-            "HLA Allele",
-            "Sub-peptide Position",
-            "MT Epitope Seq",
-            "Index",
-        ]
-        self.df1["ID"] = self.df1[id_columns].apply(
-            lambda x: "-".join(map(str, x)), axis=1
-        )
-        self.df2["ID"] = self.df2[id_columns].apply(
-            lambda x: "-".join(map(str, x)), axis=1
-        )
+        if sort_keys:
+            add_sort_keys(self.df1, self.df2)
+        if self.hashed_ids and add_id_keys(self.df1, self.df2, self.id_columns):
+            return
+
+        self.df1["ID"] = get_id_column(self.df1, self.id_columns, self.table_cache)
+        self.df2["ID"] = get_id_column(self.df2, self.id_columns, self.table_cache)
 
-        self.df1.drop(columns=id_columns, inplace=True)
-        self.df2.drop(columns=id_columns, inplace=True)
+        self.df1.drop(columns=self.id_columns, inplace=True)
+        self.df2.drop(columns=self.id_columns, inplace=True)
@@ -1,5 +1,6 @@
 import yaml
 from deepdiff import DeepDiff
+from file_utils import open_input
 import re
 
 
@@ -23,7 +24,7 @@ class CompareYML:
         Modifies:   Nothing
         Returns:    Two dictionaries corresponding to the two input files
         """
-        with open(self.input_file1, "r") as f1, open(self.input_file2, "r") as f2:
+        with open_input(self.input_file1) as f1, open_input(self.input_file2) as f2:
             data1 = yaml.safe_load(f1)
             data2 = yaml.safe_load(f2)
         return data1, data2
@@ -0,0 +1,301 @@
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import mmap
+import os
+import queue
+import threading
+
+# Bytes hashed at a time when checking if two input files are byte-identical
+FILE_DIGEST_CHUNK_SIZE = 16 * 1024**2
+
+# Digests of the files hashed by this process, by their path, size and modification
+# time, the oldest are forgotten past FILE_DIGEST_CACHE_SIZE
+FILE_DIGEST_CACHE_SIZE = 256
+file_digests = {}
+file_digests_lock = threading.Lock()
+
+# Largest change between two numeric values that are still reported as equal
+DIFFERENCE_TOLERANCE = 0.1
+
+# Compression of input files by their extension, as pandas names it
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+# Bytes decompressed at a time by the background thread of a decompressing reader
+DECOMPRESSION_CHUNK_SIZE = 4 * 1024**2
+
+# Decompressed chunks a decompressing reader holds ahead of its reader
+DECOMPRESSION_QUEUE_SIZE = 4
+
+# Default size in GB of the larger input of a TSV comparison from which it is compared
+# with the streaming engine even when that was not requested
+STREAMING_MIN_SIZE = 2
+
+# Least ratio of the decompressed to the compressed size assumed for a compressed TSV
+# whose size is not fully recorded in the file, such as a gzip file over 4 GB or one
+# written in several members by bgzip. pVACseq TSVs usually compress 10 to 20 times
+COMPRESSION_RATIO_ESTIMATE = 10
+
+
+def inputs_are_identical(input_file1, input_file2):
+    """
+    Purpose:    Check if two input files are byte-identical, by their sizes and then by
+                hashes of their contents
+    Modifies:   Nothing
+    Returns:    Boolean
+    """
+    if os.path.getsize(input_file1) != os.path.getsize(input_file2):
+        return False
+    return get_file_digest(input_file1) == get_file_digest(input_file2)
+
+
+def get_file_digest(input_file, chunk_size=FILE_DIGEST_CHUNK_SIZE, known_only=False):
+    """
+    Purpose:    Hash the contents of a file, reusing the digest of an unchanged file that
+                was already hashed by this process. With known_only, only that digest is
+                returned and the file is never read
+    Modifies:   The digests known to this process
+    Returns:    String of the hex digest, or None for a file not hashed yet with known_only
+    """
+    stat = os.stat(input_file)
+    key = (os.path.realpath(input_file), stat.st_size, stat.st_mtime_ns)
+    with file_digests_lock:
+        digest = file_digests.get(key)
+    if digest is None and not known_only:
+        digest = hash_file_contents(key[0], chunk_size)
+        with file_digests_lock:
+            file_digests[key] = digest
+            if len(file_digests) > FILE_DIGEST_CACHE_SIZE:
+                del file_digests[next(iter(file_digests))]
+    return digest
+
+
+def hash_file_contents(input_file, chunk_size):
+    """
+    Purpose:    Hash the contents of a file, memory-mapped and in chunks so large files are
+                never read into memory whole
+    Modifies:   Nothing
+    Returns:    String of the hex digest
+    """
+    digest = hashlib.blake2b()
+    with open(input_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for start in range(0, len(view), chunk_size):
+                    digest.update(view[start : start + chunk_size])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
+def read_report_summary(file_path, chunk_size=65536):
+    """
+    Purpose:    Read the summary of a report JSON without parsing the differences that are
+                written after it, decoding the top level keys in order from the start of
+                the file
+    Modifies:   Nothing
+    Returns:    Dictionary of the summary, or None when the report has none
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path) as f:
+        text = f.read(chunk_size)
+        position = text.find("{") + 1
+        while position:
+            try:
+                key, value, end = decode_report_item(decoder, text, position)
+            except (ValueError, IndexError):
+                more_text = f.read(chunk_size)
+                if not more_text:
+                    return None
+                text += more_text
+                continue
+            if key is None:
+                return None
+            if key == "summary":
+                return value
+            position = end
+    return None
+
+
+def decode_report_item(decoder, text, position):
+    """
+    Purpose:    Decode the key and value of a JSON object that start at position. A value
+                running to the end of the text may be cut short, so it is only accepted
+                with text after it
+    Modifies:   Nothing
+    Returns:    The key and value, None when the object ends, and the position after them
+    """
+    position = skip_json_separators(text, position)
+    if text[position] == "}":
+        return None, None, position
+    key, position = decoder.raw_decode(text, position)
+    position = skip_json_separators(text, position)
+    if text[position] != ":":
+        raise ValueError("Expected ':' after a report key")
+    value, position = decoder.raw_decode(text, skip_json_separators(text, position + 1))
+    position = skip_json_separators(text, position)
+    if position == len(text):
+        raise ValueError("The report value may continue after the text read")
+    return key, value, position
+
+
+def skip_json_separators(text, position):
+    while position < len(text) and text[position] in " \t\n\r,":
+        position += 1
+    return position
+
+
+def get_compression(input_file):
+    """
+    Purpose:    Find the compression of an input file from its extension
+    Modifies:   Nothing
+    Returns:    String of the compression, or None for an uncompressed file
+    """
+    return COMPRESSIONS.get(os.path.splitext(input_file)[1].lower())
+
+
+def open_input(input_file, mode="rt"):
+    """
+    Purpose:    Open an input file, decompressing it on the fly when it is compressed
+    Modifies:   Nothing
+    Returns:    File object in mode, "rt" or "rb"
+    """
+    compression = get_compression(input_file)
+    if compression == "gzip":
+        return gzip.open(input_file, mode)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                f"Reading {input_file} needs the zstandard package, install it with pip install zstandard"
+            )
+        return zstandard.open(input_file, mode)
+    return open(input_file, mode)
+
+
+def get_uncompressed_size(input_file):
+    """
+    Purpose:    Estimate the size of an input file once decompressed, from the size the
+                gzip trailer or the zstd frame header records, and no less than the
+                compressed size times COMPRESSION_RATIO_ESTIMATE, as a gzip trailer only
+                has the size modulo 4 GB of its last member and a zstd header the size
+                of its first frame, when it has one
+    Modifies:   Nothing
+    Returns:    Integer of the estimated size in bytes
+    """
+    size = os.path.getsize(input_file)
+    compression = get_compression(input_file)
+    if compression is None:
+        return size
+    recorded_size = 0
+    with open(input_file, "rb") as f:
+        if compression == "gzip" and size >= 18:
+            f.seek(-4, os.SEEK_END)
+            recorded_size = int.from_bytes(f.read(4), "little")
+        elif compression == "zstd":
+            recorded_size = read_zstd_content_size(f.read(18))
+    return max(recorded_size, size * COMPRESSION_RATIO_ESTIMATE)
+
+
+def read_zstd_content_size(header):
+    """
+    Purpose:    Read the content size from the header of the first frame of a zstd file
+    Modifies:   Nothing
+    Returns:    Integer of the size in bytes, 0 when the frame does not record it
+    """
+    if len(header) < 5 or header[:4] != b"\x28\xb5\x2f\xfd":
+        return 0
+    descriptor = header[4]
+    single_segment = descriptor >> 5 & 1
+    dictionary_id_size = [0, 1, 2, 4][descriptor & 3]
+    content_size_size = [single_segment, 2, 4, 8][descriptor >> 6]
+    start = 5 + (not single_segment) + dictionary_id_size
+    field = header[start : start + content_size_size]
+    if not content_size_size or len(field) < content_size_size:
+        return 0
+    # A 2 byte content size is stored less 256
+    return int.from_bytes(field, "little") + (256 if content_size_size == 2 else 0)
+
+
+@contextlib.contextmanager
+def open_tsv_source(input_file):
+    """
+    Purpose:    Open an input TSV for pandas, a compressed file through a reader that
+                decompresses it on a background thread while pandas parses
+    Modifies:   Nothing
+    Returns:    Context manager of the path of an uncompressed file, or of a binary file
+                object of the decompressed contents
+    """
+    if get_compression(input_file) is None:
+        yield input_file
+        return
+    with io.BufferedReader(DecompressingReader(input_file)) as reader:
+        yield reader
+
+
+# Decompresses a file in chunks on a background thread, so decompressing the next chunks
+# runs while the previous ones are parsed. zlib and zstandard release the GIL while they
+# decompress, so the two overlap on separate cores
+class DecompressingReader(io.RawIOBase):
+    def __init__(self, input_file, chunk_size=DECOMPRESSION_CHUNK_SIZE):
+        self.stream = open_input(input_file, "rb")
+        self.chunk_size = chunk_size
+        self.chunks = queue.Queue(DECOMPRESSION_QUEUE_SIZE)
+        self.buffer = memoryview(b"")
+        self.finished = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.decompress, daemon=True)
+        self.thread.start()
+
+    def decompress(self):
+        """
+        Purpose:    Queue the decompressed chunks of the file, then an empty chunk, or the
+                    error that stopped decompressing
+        Modifies:   self.chunks
+        Returns:    None
+        """
+        try:
+            while not self.stopped.is_set():
+                chunk = self.stream.read(self.chunk_size)
+                self.put(chunk)
+                if not chunk:
+                    return
+        except Exception as e:
+            self.put(e)
+
+    def put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.buffer and not self.finished:
+            chunk = self.chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            if not chunk:
+                self.finished = True
+            self.buffer = memoryview(chunk)
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.stopped.set()
+            self.thread.join()
+            self.stream.close()
+        super().close()
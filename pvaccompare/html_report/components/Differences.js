@@ -6,6 +6,16 @@ export default {
                 <div class="mt-3" v-for="(entries, section) in differences" :key="section">
                     <template v-if="entries && Object.keys(entries).length">
                         <h4 v-if="entries"><u>{{ section }}</u></h4>
+                        <p v-if="truncatedDifferences[section]" class="mx-3 mb-0">
+                            <template v-if="truncatedDifferences[section].selection === 'largest'">
+                                Showing the {{ truncatedDifferences[section].num_shown }} largest changes of
+                                {{ truncatedDifferences[section].num_differences }} differences
+                            </template>
+                            <template v-else>
+                                Showing a sample of {{ truncatedDifferences[section].num_shown }} of
+                                {{ truncatedDifferences[section].num_differences }} differences, picked by variant ID
+                            </template>
+                        </p>
                         <div v-if="tableNeeded" class="q-pa-md">
                             <q-virtual-scroll
                                 type="table"
@@ -60,6 +70,9 @@ export default {
                 </div>
             </div>
         </div>
+        <div v-else-if="summaryOnly" class="identical-msg mx-5 mt-5">
+            <h4>Only the summary was written for this comparison</h4>
+        </div>
         <div v-else-if="!hasUniqueVariants" class="identical-msg mx-5 mt-5">
             <h4>The files are identical</h4>
         </div>
@@ -81,6 +94,8 @@ export default {
             visibleEntries: {},
             loadedSections: {},
             currentSectionIndex: {},
+            loadingSections: {},
+            loadGeneration: 0,
             loadBatchSize: 1000,
             fields: ["ID", "File 1 Value", "File 2 Value", "File 1 Line", "File 2 Line"],
             idFormat: ""
@@ -92,6 +107,20 @@ export default {
             return this.getDifferences();
         },
 
+        truncatedDifferences() {
+            if (this.currentComparison === "Unavailable") {
+                return {};
+            }
+            return this[this.currentComparison.key]?.truncated_differences || {};
+        },
+
+        summaryOnly() {
+            if (this.currentComparison === "Unavailable") {
+                return false;
+            }
+            return Boolean(this[this.currentComparison.key]?.summary_only);
+        },
+
         tableNeeded() {
             if (this.currentComparison !== "Unavailable") {
                 return this.currentComparison.key !== 'inputYmlData' && this.currentComparison.key !== 'jsonInputData';
@@ -163,6 +192,8 @@ export default {
                 this.visibleEntries = {};
                 this.loadedSections = {};
                 this.currentSectionIndex = {};
+                this.loadingSections = {};
+                this.loadGeneration++;
 
                 for (const section in this[key].differences) {
                     this.visibleEntries[section] = [];
@@ -174,17 +205,62 @@ export default {
             }
         },
 
-        loadSection(section) {
+        async loadSection(section) {
             const key = this.currentComparison.key;
-            const sectionData = this[key]?.differences?.[section];
-            if (!sectionData || this.currentSectionIndex[section] > sectionData.num_sections) {
+            const data = this[key];
+            const sectionData = data?.differences?.[section];
+            const sectionIndex = this.currentSectionIndex[section];
+            if (!sectionData || sectionIndex > sectionData.num_sections || this.loadingSections[section]) {
                 return;
             }
 
-            const sectionKey = `section${this.currentSectionIndex[section]}`;
-            const newEntries = sectionData[sectionKey] || [];
+            let newEntries;
+            if (sectionData.shards) {
+                // Sharded reports keep each section in its own file, read when it is reached
+                const generation = this.loadGeneration;
+                this.loadingSections[section] = true;
+                try {
+                    newEntries = await this.readShard(data, sectionData.shards[sectionIndex - 1]);
+                } finally {
+                    if (generation === this.loadGeneration) {
+                        this.loadingSections[section] = false;
+                    }
+                }
+                if (generation !== this.loadGeneration) {
+                    return;
+                }
+            } else {
+                newEntries = sectionData[`section${sectionIndex}`] || [];
+            }
+            if (!Array.isArray(newEntries)) {
+                newEntries = this.getColumnarEntries(data, newEntries);
+            }
             this.visibleEntries[section] = [...this.visibleEntries[section], ...newEntries];
-            this.currentSectionIndex[section]++;
+            this.currentSectionIndex[section] = sectionIndex + 1;
+        },
+
+        getColumnarEntries(data, columns) {
+            // Columnar sections hold parallel arrays, with IDs as indexes into the ID table
+            const ids = data.difference_ids || [];
+            return columns["ID"].map((idIndex, i) => ({
+                "ID": ids[idIndex],
+                "File 1 Value": columns["File 1 Value"][i],
+                "File 2 Value": columns["File 2 Value"][i],
+                "File 1 Line": columns["File 1 Line"][i],
+                "File 2 Line": columns["File 2 Line"][i],
+            }));
+        },
+
+        async readShard(data, shard) {
+            const file = data.shardFiles?.[`${data.shardDirectory}/${shard}`];
+            if (!file) {
+                this.$q.notify({
+                    type: 'negative',
+                    message: `Error: Could not find the difference shard ${shard}`,
+                });
+                return [];
+            }
+            return JSON.parse(await file.text());
         },
 
         onVirtualScroll(section, e) {
@@ -68,7 +68,18 @@ export default {
                     'json_input_data.json': 'jsonInputData',
                 };
 
+                // Difference shards are only read once the report scrolls to them
+                const shardFiles = {};
+                Array.from(files).forEach((file) => {
+                    if (file.webkitRelativePath.includes('_shards/')) {
+                        shardFiles[file.webkitRelativePath] = file;
+                    }
+                });
+
                 Array.from(files).forEach((file, index) => {
+                    if (file.webkitRelativePath in shardFiles) {
+                        return;
+                    }
                     const key = fileKeyMap[file.name] || null;
                     const reader = new FileReader();
                     reader.onload = (e) => {
@@ -77,6 +88,8 @@ export default {
                             name: file.name,
                             content: e.target.result,
                             key,
+                            directory: file.webkitRelativePath.substring(0, file.webkitRelativePath.lastIndexOf('/')),
+                            shardFiles,
                         });
                     };
                     reader.readAsText(file);
@@ -0,0 +1,207 @@
+export default {
+    template: `
+        <div v-if="hasVariantIndex" class="mx-5 mt-5">
+            <h1>Variant Lookup</h1>
+            <div class="mx-4 q-pa-md">
+                <q-input
+                    v-model="query"
+                    outlined
+                    dense
+                    clearable
+                    :label="idFormat ? 'Variant ID (' + idFormat + ')' : 'Variant ID'"
+                    @keyup.enter="lookUp"
+                    @clear="results = null"
+                >
+                    <template v-slot:append>
+                        <q-icon name="search" class="cursor-pointer" @click="lookUp" />
+                    </template>
+                </q-input>
+                <div v-if="results" class="mt-3">
+                    <p v-if="!results.length">
+                        No differences found for {{ searchedId }}
+                    </p>
+                    <table v-else class="table">
+                        <thead class="text-left">
+                            <tr>
+                                <th v-for="field in fields" :key="field">{{ field }}</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            <tr class="table-item" v-for="(result, i) in results" :key="i">
+                                <td v-for="field in fields" :key="field">
+                                    {{ result[field] !== null && result[field] !== undefined ? result[field] : "NA" }}
+                                </td>
+                            </tr>
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+        </div>
+    `,
+    props: [
+        'currentPageId',
+        'currentComparison',
+        'comparisonItems',
+        'aggregatedData',
+        'unaggregatedData',
+        'inputYmlData',
+        'jsonInputData',
+        'referenceMatchesData'
+    ],
+
+    data() {
+        return {
+            query: "",
+            searchedId: "",
+            results: null,
+            lookupGeneration: 0,
+            fields: ["Column", "File 1 Value", "File 2 Value", "File 1 Line", "File 2 Line"],
+            idFormat: ""
+        };
+    },
+
+    computed: {
+        hasVariantIndex() {
+            return Boolean(this.getData()?.variant_index?.ids?.length);
+        }
+    },
+
+    created() {
+        this.initializeData();
+    },
+
+    watch: {
+        comparisonItems: function(items) {
+            if (items.length > 0) {
+                this.initializeData();
+            }
+        },
+        currentPageId(newPageId, oldPageId) {
+            if (newPageId !== oldPageId) {
+                this.initializeData();
+            }
+        }
+    },
+
+    methods: {
+        getData() {
+            if (this.currentComparison === "Unavailable") {
+                return null;
+            }
+            return this[this.currentComparison.key];
+        },
+
+        initializeData() {
+            // The lookup table and shard cache are kept off the reactive data, as they can
+            // hold hundreds of thousands of variants
+            this.lookupTable = null;
+            this.shardCache = new Map();
+            this.query = "";
+            this.searchedId = "";
+            this.results = null;
+            this.lookupGeneration++;
+            this.idFormat = this.getData()?.id_format || "";
+        },
+
+        getLookupTable(data) {
+            // Maps each variant ID to the start and number of its differences, built in
+            // one pass over the index the first time a variant is looked up
+            if (this.lookupTable) {
+                return this.lookupTable;
+            }
+            const index = data.variant_index;
+            const tableIds = data.difference_ids;
+            const lookupTable = new Map();
+            let start = 0;
+            for (let i = 0; i < index.ids.length; i++) {
+                const id = tableIds ? tableIds[index.ids[i]] : index.ids[i];
+                const count = index.num_differences[i];
+                const ranges = lookupTable.get(id);
+                if (ranges) {
+                    ranges.push([start, count]);
+                } else {
+                    lookupTable.set(id, [[start, count]]);
+                }
+                start += count;
+            }
+            this.lookupTable = lookupTable;
+            return lookupTable;
+        },
+
+        async lookUp() {
+            const data = this.getData();
+            const id = (this.query || "").trim();
+            if (!data?.variant_index || !id) {
+                this.results = null;
+                return;
+            }
+
+            const generation = ++this.lookupGeneration;
+            const index = data.variant_index;
+            const results = [];
+            for (const [start, count] of this.getLookupTable(data).get(id) || []) {
+                for (let k = start; k < start + count; k++) {
+                    const column = index.columns[index.column[k]];
+                    if (index.entry[k] < 0) {
+                        // A difference truncation left out of the report
+                        results.push({ "Column": `${column} (not kept, see the column's truncation note)` });
+                        continue;
+                    }
+                    const entry = await this.getEntry(data, column, index.entry[k], index.section_size);
+                    if (entry) {
+                        results.push({ "Column": column, ...entry });
+                    }
+                }
+            }
+            if (generation === this.lookupGeneration) {
+                this.searchedId = id;
+                this.results = results;
+            }
+        },
+
+        async getEntry(data, column, position, sectionSize) {
+            // Differences are found by their position among the differences of their column
+            const sectionData = data.differences?.[column];
+            if (!sectionData) {
+                return null;
+            }
+            const sectionIndex = Math.floor(position / sectionSize);
+            let entries;
+            if (sectionData.shards) {
+                entries = await this.readShard(data, sectionData.shards[sectionIndex]);
+            } else {
+                entries = sectionData[`section${sectionIndex + 1}`];
+            }
+            if (!entries) {
+                return null;
+            }
+
+            const i = position % sectionSize;
+            if (Array.isArray(entries)) {
+                return entries[i];
+            }
+            return {
+                "ID": data.difference_ids?.[entries["ID"][i]],
+                "File 1 Value": entries["File 1 Value"][i],
+                "File 2 Value": entries["File 2 Value"][i],
+                "File 1 Line": entries["File 1 Line"][i],
+                "File 2 Line": entries["File 2 Line"][i],
+            };
+        },
+
+        async readShard(data, shard) {
+            if (!this.shardCache.has(shard)) {
+                const file = data.shardFiles?.[`${data.shardDirectory}/${shard}`];
+                if (!file) {
+                    this.$q.notify({
+                        type: 'negative',
+                        message: `Error: Could not find the difference shard ${shard}`,
+                    });
+                    return null;
+                }
+                this.shardCache.set(shard, file.text().then(JSON.parse));
+            }
+            return this.shardCache.get(shard);
+        },
+    }
+};
@@ -0,0 +1,413 @@
+from concurrent.futures import ProcessPoolExecutor
+from streaming_utils import *
+import io
+
+# Largest byte range of an input file one worker parses at a time
+PARALLEL_PIECE_SIZE = 256 * 1024**2
+
+# Width in bases of the start position bins rows are spilled by, wider than the streaming
+# bins to keep the number of spilled row groups small
+PARALLEL_BIN_SIZE = 16000000
+
+# Partitions cut per worker, so a long chromosome does not leave the other workers idle
+PARALLEL_PARTITIONS_PER_WORKER = 4
+
+
+def use_parallel_engine(input_file1, input_file2, workers):
+    """
+    Purpose:    Decide if a TSV comparison runs on the parallel engine, which splits its
+                inputs at byte offsets and so needs uncompressed files
+    Modifies:   Nothing
+    Returns:    Boolean
+    """
+    if workers == 1:
+        return False
+    if get_compression(input_file1) or get_compression(input_file2):
+        logging.info(
+            "\u2022 Compressed inputs can not be split between workers, comparing them in one process"
+        )
+        return False
+    return True
+
+
+def parallel_compare_tsv_files(
+    file_type,
+    input_file1,
+    input_file2,
+    columns_to_compare,
+    output_path,
+    class_type,
+    filename,
+    id_format,
+    workers,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
+    summary_only=False,
+    max_differences=None,
+    piece_size=PARALLEL_PIECE_SIZE,
+):
+    """
+    Purpose:    Compare two TSV files on a pool of worker processes. The workers parse byte
+                ranges of both files and spill their rows by locus, then load, align and
+                diff partitions of whole chromosomes or chromosome bins, whose results are
+                merged in partition order
+    Modifies:   Nothing
+    Returns:    None
+    """
+    label, id_columns, projected_columns, replaced_id, id_format = get_streamed_ids(
+        file_type, input_file1, input_file2, id_format
+    )
+    key_kind = "replaced" if replaced_id else "genomic"
+
+    with tempfile.TemporaryDirectory(
+        prefix="pvaccompare-"
+    ) as spool_dir, ProcessPoolExecutor(max_workers=workers) as executor:
+        files = [
+            get_parallel_file(
+                input_file, projected_columns, columns_to_compare, workers, piece_size
+            )
+            for input_file in [input_file1, input_file2]
+        ]
+        for file_number, parallel_file in enumerate(files, start=1):
+            for col, key in parallel_file["renames"].items():
+                logging.info(
+                    "\u2022 Renamed '%s' to '%s' in file %d", col, key, file_number
+                )
+        run_notes, columns_to_compare = get_streamed_run_notes(
+            files[0]["columns"], files[1]["columns"], columns_to_compare, replaced_id
+        )
+        logging.debug(
+            "Comparing the files on %d workers in %d and %d pieces",
+            workers,
+            len(files[0]["pieces"]),
+            len(files[1]["pieces"]),
+        )
+        try:
+            load_pieces(executor, files, key_kind, spool_dir)
+        except Exception as e:
+            raise Exception(f"Error loading files: {e}")
+
+        num_rows = files[0]["num_rows"] + files[1]["num_rows"]
+        plan = get_partition_plan(
+            files[0],
+            files[1],
+            key_kind,
+            -(-num_rows // (workers * PARALLEL_PARTITIONS_PER_WORKER)),
+        )
+        tasks = get_partition_tasks(
+            files,
+            plan,
+            file_type,
+            id_columns,
+            replaced_id,
+            columns_to_compare,
+            summary_only,
+            max_differences,
+        )
+
+        results = get_empty_results(columns_to_compare, max_differences)
+        for block_results in executor.map(compare_partition, tasks):
+            add_block_results(results, block_results, spool_dir)
+        report_streamed_results(
+            label,
+            input_file1,
+            input_file2,
+            filename,
+            output_path,
+            class_type,
+            id_format,
+            run_notes,
+            finish_results(results, spool_dir),
+            spool_dir,
+            compact_json,
+            shard_differences,
+            columnar_differences,
+            summary_only,
+        )
+
+
+def get_parallel_file(input_file, id_columns, columns_to_compare, workers, piece_size):
+    """
+    Purpose:    Work out the columns to read from a TSV file and the byte ranges its rows
+                are parsed in
+    Modifies:   Nothing
+    Returns:    Dictionary describing the file
+    """
+    header = pd.read_csv(input_file, sep="\t", nrows=0).columns
+    usecols, dtypes = get_projected_columns(header, id_columns, columns_to_compare)
+    renames = {
+        col: get_canonical_column(col)
+        for col in usecols
+        if get_canonical_column(col) != col
+    }
+    num_pieces = max(workers, -(-os.path.getsize(input_file) // piece_size))
+    return {
+        "input_file": input_file,
+        "header": list(header),
+        "usecols": usecols,
+        # Categories would differ between pieces, the ID columns are read as strings
+        "read_dtypes": {col: str for col in dtypes},
+        "renames": renames,
+        "columns": [renames.get(col, col) for col in usecols],
+        "pieces": get_file_pieces(input_file, num_pieces),
+    }
+
+
+def get_file_pieces(input_file, num_pieces):
+    """
+    Purpose:    Split the rows of a TSV file into byte ranges of about the same size that
+                start and end on line boundaries
+    Modifies:   Nothing
+    Returns:    List of (start, end) byte offsets
+    """
+    size = os.path.getsize(input_file)
+    with open(input_file, "rb") as f:
+        f.readline()
+        bounds = [f.tell()]
+        for i in range(1, num_pieces):
+            target = bounds[0] + (size - bounds[0]) * i // num_pieces
+            if target <= bounds[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def load_pieces(executor, files, key_kind, spool_dir):
+    """
+    Purpose:    Parse and spill the pieces of both files on the workers, then find the
+                dtypes each column gets when the whole file is parsed, parsing again as
+                strings the pieces that read a text column as numbers
+    Modifies:   files
+    Returns:    None
+    """
+    for file_number, parallel_file in enumerate(files, start=1):
+        tasks = [
+            (
+                parallel_file,
+                piece,
+                parallel_file["read_dtypes"],
+                key_kind,
+                get_piece_path(spool_dir, file_number, i),
+            )
+            for i, piece in enumerate(parallel_file["pieces"])
+        ]
+        pieces = list(executor.map(load_piece, tasks))
+
+        kinds = {
+            col: {piece["kinds"][col] for piece in pieces}
+            for col in parallel_file["usecols"]
+            if col not in parallel_file["read_dtypes"]
+        }
+        convert_dtypes, str_columns = get_unified_dtypes(kinds)
+        read_dtypes = {
+            **parallel_file["read_dtypes"],
+            **{col: str for col in str_columns},
+        }
+        reread = [
+            i
+            for i, piece in enumerate(pieces)
+            if any(piece["kinds"][col] not in ["text", "nan"] for col in str_columns)
+        ]
+        tasks = [task[:2] + (read_dtypes,) + task[3:] for task in tasks]
+        for i, piece in zip(
+            reread, executor.map(load_piece, [tasks[i] for i in reread])
+        ):
+            pieces[i] = piece
+
+        parallel_file["convert_dtypes"] = {
+            parallel_file["renames"].get(col, col): dtype
+            for col, dtype in {
+                **convert_dtypes,
+                **{col: object for col in str_columns},
+            }.items()
+        }
+        parallel_file["loaded_pieces"] = pieces
+        parallel_file["num_rows"] = sum(piece["num_rows"] for piece in pieces)
+        parallel_file["chromosomes"] = set().union(
+            *(piece["chromosomes"] for piece in pieces)
+        )
+        parallel_file["counts"] = {}
+        for piece in pieces:
+            add_counts(parallel_file["counts"], piece["counts"])
+
+
+def get_piece_path(spool_dir, file_number, piece):
+    return os.path.join(spool_dir, f"piece{piece}_file{file_number}.pkl")
+
+
+def load_piece(task):
+    """
+    Purpose:    Parse a byte range of a TSV file on a worker and spill its rows grouped by
+                the locus bin, or the gene of replaced IDs, that partitions are cut from
+    Modifies:   The spool file of the piece
+    Returns:    Dictionary of the piece's dtypes, row counts and the spool offset of each
+                group
+    """
+    parallel_file, (start, end), read_dtypes, key_kind, path = task
+    with open(parallel_file["input_file"], "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(
+        io.BytesIO(data),
+        sep="\t",
+        header=None,
+        names=parallel_file["header"],
+        usecols=parallel_file["usecols"],
+        dtype=read_dtypes,
+        low_memory=False,
+    )
+    del data
+    piece = {
+        "kinds": {
+            col: get_dtype_kind(df[col])
+            for col in parallel_file["usecols"]
+            if col not in parallel_file["read_dtypes"]
+        },
+        "num_rows": len(df),
+        "chromosomes": set(),
+        "counts": {},
+        "offsets": {},
+        "path": path,
+    }
+    df = df.rename(columns=parallel_file["renames"])
+    # Line numbers within the piece, shifted to line numbers of the file once the rows
+    # of the pieces before it are counted
+    df["line"] = np.arange(len(df))
+
+    if key_kind == "replaced":
+        keys = [
+            split_replaced_ids(
+                build_replaced_id_column(df, CompareAggregatedTSV.ID_replacement_cols),
+                log_errors=False,
+            )[0]
+        ]
+    else:
+        chromosome, start, stop = get_locus_parts(df)
+        unmatched = pd.isna(chromosome) | np.isnan(start) | np.isnan(stop)
+        piece["chromosomes"].update(pd.unique(chromosome[~pd.isna(chromosome)]))
+        keys = [
+            np.where(unmatched, "", chromosome.astype(object)),
+            np.where(unmatched, 0, np.nan_to_num(start) // PARALLEL_BIN_SIZE).astype(
+                np.int64
+            ),
+        ]
+
+    with open(path, "wb") as f:
+        for key, rows in df.groupby(keys, sort=False):
+            if key_kind == "replaced":
+                key = key[0]
+            else:
+                key = (key[0] or None, int(key[1]))
+            piece["counts"][key] = len(rows)
+            piece["offsets"][key] = f.tell()
+            pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return piece
+
+
+def get_partition_tasks(
+    files,
+    plan,
+    file_type,
+    id_columns,
+    replaced_id,
+    columns_to_compare,
+    summary_only=False,
+    max_differences=None,
+):
+    """
+    Purpose:    Find the spilled row groups of both files that belong to each partition
+    Modifies:   Nothing
+    Returns:    List of the partition tasks in partition order
+    """
+    tasks = [
+        {
+            "file_type": file_type,
+            "id_columns": id_columns,
+            "replaced_id": replaced_id,
+            "columns_to_compare": columns_to_compare,
+            "summary_only": summary_only,
+            "max_differences": max_differences,
+            "groups": [[], []],
+            "empty": [],
+            "convert_dtypes": [],
+        }
+        for _ in range(len(plan["boundaries"]))
+    ]
+    for i, parallel_file in enumerate(files):
+        line = 2
+        for piece in parallel_file["loaded_pieces"]:
+            for key, offset in piece["offsets"].items():
+                partition = get_key_partition(key, plan)
+                tasks[partition]["groups"][i].append((piece["path"], offset, line))
+            line += piece["num_rows"]
+        empty = pd.read_csv(
+            parallel_file["input_file"],
+            sep="\t",
+            usecols=parallel_file["usecols"],
+            dtype=parallel_file["read_dtypes"],
+            nrows=0,
+        ).rename(columns=parallel_file["renames"])
+        empty["line"] = np.arange(0)
+        for task in tasks:
+            task["empty"].append(empty)
+            task["convert_dtypes"].append(parallel_file["convert_dtypes"])
+    return tasks
+
+
+def get_key_partition(key, plan):
+    """
+    Purpose:    Find the partition a spilled row group belongs to
+    Modifies:   Nothing
+    Returns:    Integer partition number
+    """
+    if plan["key_kind"] == "replaced":
+        code = key
+    else:
+        name, bin_number = key
+        rank = len(plan["ranks"]) if name is None else plan["ranks"][name]
+        code = rank * plan["num_bins"] + bin_number
+    return int(np.searchsorted(plan["boundaries"], code, side="right")) - 1
+
+
+def compare_partition(task):
+    """
+    Purpose:    Load the rows of a partition of both files on a worker and run them through
+                the in-memory pipeline
+    Modifies:   Nothing
+    Returns:    Dictionary of the partition's variants, hits and differences
+    """
+    dfs = []
+    for groups, empty, convert_dtypes in zip(
+        task["groups"], task["empty"], task["convert_dtypes"]
+    ):
+        frames = []
+        for path, offset, _ in groups:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                frames.append(pickle.load(f))
+        df = pd.concat(frames, ignore_index=True) if frames else empty.copy()
+        df["line"] += np.repeat(
+            [line for _, _, line in groups], [len(rows) for rows in frames]
+        ).astype(np.int64)
+        for col, dtype in convert_dtypes.items():
+            df[col] = df[col].astype(dtype)
+        # Rows go back in file order, which breaks ties when variants are sorted
+        dfs.append(df.sort_values("line", kind="stable", ignore_index=True))
+
+    return compare_block(
+        dfs[0],
+        dfs[1],
+        task["file_type"],
+        task["id_columns"],
+        task["replaced_id"],
+        task["columns_to_compare"],
+        summary_only=task["summary_only"],
+        max_differences=task["max_differences"],
+    )
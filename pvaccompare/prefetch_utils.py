@@ -0,0 +1,116 @@
+import os
+import threading
+
+# Default most data in GB read ahead of the comparisons and not parsed yet. Reading
+# ahead is off by default, as a file read ahead is held in memory whole while the table
+# is parsed from it, adding its size to the memory of its comparison
+PREFETCH_MAX_SIZE = 0
+
+
+# Reads input files into memory on a background thread, in the order they will be
+# parsed, so reading the next files from slow storage overlaps the parsing and the
+# comparison of the current ones. Reading waits while the files held would go over
+# max_size, and files larger than max_size are left to be read when they are parsed
+class InputPrefetcher:
+    def __init__(self, paths, max_size=PREFETCH_MAX_SIZE * 1024**3):
+        self.paths = list(dict.fromkeys(paths))
+        self.max_size = max_size
+        # State of each path: "pending", "reading", "held", "dropped", or "released"
+        # while it is being read
+        self.states = {path: "pending" for path in self.paths}
+        self.data = {}
+        self.held_size = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        if self.paths and max_size > 0:
+            threading.Thread(target=self.read_files, daemon=True).start()
+
+    def read_files(self):
+        """
+        Purpose:    Read the files one by one on the background thread
+        Modifies:   self.states, self.data and self.held_size
+        Returns:    None
+        """
+        for path in self.paths:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = self.max_size + 1
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.closed
+                    or self.states[path] != "pending"
+                    or self.held_size + size <= self.max_size
+                    or size > self.max_size
+                )
+                if self.closed:
+                    return
+                if self.states[path] != "pending" or size > self.max_size:
+                    self.states[path] = "dropped"
+                    continue
+                self.states[path] = "reading"
+                self.held_size += size
+
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                data = None
+
+            with self.condition:
+                if self.closed:
+                    return
+                if data is None or self.states[path] != "reading":
+                    self.states[path] = "dropped"
+                    self.held_size -= size
+                else:
+                    self.states[path] = "held"
+                    self.data[path] = (data, size)
+                self.condition.notify_all()
+
+    def take(self, path):
+        """
+        Purpose:    Hand over the contents of a file, waiting when it is being read. A
+                    file the background thread has not started reading is left to the
+                    caller, so a caller never waits behind other files
+        Modifies:   self.states, self.data and self.held_size
+        Returns:    Bytes of the file, or None when the caller should read it
+        """
+        with self.condition:
+            if path not in self.states:
+                return None
+            if self.states[path] == "pending":
+                self.states[path] = "dropped"
+            self.condition.wait_for(lambda: self.states[path] != "reading")
+            self.states[path] = "dropped"
+            data, size = self.data.pop(path, (None, 0))
+            self.held_size -= size
+            self.condition.notify_all()
+        return data
+
+    def release(self, paths):
+        """
+        Purpose:    Drop files that will not be parsed, such as the inputs of a comparison
+                    that finished without them
+        Modifies:   self.states, self.data and self.held_size
+        Returns:    None
+        """
+        with self.condition:
+            for path in paths:
+                if path not in self.states:
+                    continue
+                if self.states[path] == "held":
+                    self.held_size -= self.data.pop(path)[1]
+                if self.states[path] != "reading":
+                    self.states[path] = "dropped"
+                else:
+                    # The background thread drops it once the read finishes
+                    self.states[path] = "released"
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.data.clear()
+            self.held_size = 0
+            self.condition.notify_all()
@@ -1,11 +1,12 @@
 from compare_tools import *
+from cache_utils import TableCache, TABLE_CACHE_MAX_SIZE
+from prefetch_utils import PREFETCH_MAX_SIZE
+from file_utils import STREAMING_MIN_SIZE
 import argparse
 import logging
 from datetime import datetime
 import os
 
-logging.basicConfig(level=logging.DEBUG, format="%(message)s")
-
 
 def define_parser():
     """
@@ -13,6 +14,21 @@ def define_parser():
     Modifies:   Nothing
     Returns:    The parser
     """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("results_folder1", help="Path to first results input folder")
+    parser.add_argument("results_folder2", help="Path to second results input folder")
+    add_comparison_arguments(parser)
+    return parser
+
+
+def add_comparison_arguments(parser):
+    """
+    Purpose:    Define the arguments that control the comparisons of a results folder pair
+    Modifies:   parser
+    Returns:    None
+    """
     valid_aggregated_columns = [
         "Gene",
         "AA Change",
@@ -118,11 +134,6 @@ def define_parser():
     ]
     default_reference_match_columns = ["Peptide", "Match Window"]
 
-    parser = argparse.ArgumentParser(
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter
-    )
-    parser.add_argument("results_folder1", help="Path to first results input folder")
-    parser.add_argument("results_folder2", help="Path to second results input folder")
     parser.add_argument(
         "--output_dir",
         default="output",
@@ -149,50 +160,239 @@ def define_parser():
         default=default_reference_match_columns,
         help=f"Comma-separated columns to include in the reference match TSV comparison, choices: {', '.join(valid_reference_match_columns)}",
     )
+    parser.add_argument(
+        "--hashed_ids",
+        action="store_true",
+        help="Match variants on 64-bit hashes of their ID columns instead of ID strings, only building the readable IDs of reported variants",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Compare the TSV files in chunks with bounded memory, used automatically for inputs over --streaming_min_size",
+    )
+    parser.add_argument(
+        "--streaming_min_size",
+        type=float,
+        default=STREAMING_MIN_SIZE,
+        help="Size in GB of the larger input of a TSV comparison from which it is compared with the streaming engine. The streaming engine is about twice as slow and does not use --hashed_ids, the table cache or the inputs read ahead, so on machines with the memory to hold larger inputs raise it, or set it to 0 to never switch automatically",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes that compare the TSV files, partitioned by chromosome",
+    )
+    parser.add_argument(
+        "--compact_json",
+        action="store_true",
+        help="Write the report JSON files without indentation",
+    )
+    parser.add_argument(
+        "--shard_differences",
+        action="store_true",
+        help="Write the difference sections of the TSV comparisons to separate shard files that the report loads as they are scrolled to",
+    )
+    parser.add_argument(
+        "--columnar_differences",
+        action="store_true",
+        help="Store the differences of the TSV comparisons as parallel arrays of values and line numbers, with each ID stored once in a table",
+    )
+    parser.add_argument(
+        "--summary_only",
+        action="store_true",
+        help="Only count the variants and the differences of each column of the TSV comparisons, writing report JSON files with just the summary",
+    )
+    parser.add_argument(
+        "--max_differences_per_column",
+        type=int,
+        help="Keep at most this many differences of each column of the TSV comparisons, the largest numeric changes or a sample picked by variant ID, while the summary counts all of them",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        help="Directory of a cache of the parsed TSV tables and their IDs, so later runs on the same input files skip parsing them. It must not be writable by other users, as loading a cached table can run code written to it",
+    )
+    parser.add_argument(
+        "--cache_max_size",
+        type=float,
+        default=TABLE_CACHE_MAX_SIZE,
+        help="Size in GB the cache directory is kept under, evicting the least recently used tables",
+    )
+    parser.add_argument(
+        "--recompute_all",
+        action="store_true",
+        help="Rerun every comparison, instead of reusing the reports of earlier runs in the output directory whose inputs and options are unchanged",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of comparisons run at the same time, each holding its own input files in memory",
+    )
+    parser.add_argument(
+        "--prefetch_max_size",
+        type=float,
+        default=PREFETCH_MAX_SIZE,
+        help="Most data in GB read ahead of the comparisons, so the TSV inputs of the next comparisons load while the current one runs. A file read ahead is held in memory whole while it is parsed, adding up to its size to the memory of each comparison, so reading ahead is off at 0 unless set",
+    )
 
-    return parser
 
+def validate_comparison_arguments(args, parser):
+    """
+    Purpose:    Makes sure the user inputs usable comparison arguments
+    Modifies:   Nothing
+    Returns:    None
+    """
+    validate_aggregated_columns(args.aggregated_columns, parser)
+    validate_unaggregated_columns(args.unaggregated_columns, parser)
+    validate_reference_match_columns(args.reference_match_columns, parser)
+    validate_process_count(args.workers, "workers", parser)
+    validate_process_count(args.jobs, "jobs", parser)
+    validate_max_differences(args.max_differences_per_column, parser)
+    validate_cache_max_size(args.cache_max_size, parser)
+    validate_prefetch_max_size(args.prefetch_max_size, parser)
+    validate_streaming_min_size(args.streaming_min_size, parser)
+
+
+def prepare_results_folder(classes, base_output_dir, prefix="results"):
+    """
+    Purpose:    Create the output folder of a run and its MHC class folders
+    Modifies:   Nothing
+    Returns:    String of the output folder path
+    """
+    unique_output_dir = create_unique_folder(base_output_dir, prefix)
+    create_class_folders(unique_output_dir, classes)
+    return unique_output_dir
 
-def prepare_results_folder(classes, base_output_dir):
+
+def create_unique_folder(base_output_dir, prefix):
+    """
+    Purpose:    Create a folder named by the time, adding a counter when another run
+                created a folder in the same second. Creating the folder is the check, so
+                runs started together never share a folder
+    Modifies:   Nothing
+    Returns:    String of the folder path
+    """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_output_dir = f"{base_output_dir}/results_{timestamp}"
+    unique_output_dir = f"{base_output_dir}/{prefix}_{timestamp}"
+    count = 1
+    while True:
+        try:
+            os.makedirs(unique_output_dir)
+            return unique_output_dir
+        except FileExistsError:
+            count += 1
+            unique_output_dir = f"{base_output_dir}/{prefix}_{timestamp}_{count}"
 
-    os.makedirs(unique_output_dir)
 
+def create_class_folders(output_dir, classes):
     if "1" in classes:
-        os.makedirs(f"{unique_output_dir}/mhc_class_i")
+        os.makedirs(f"{output_dir}/mhc_class_i")
     if "2" in classes:
-        os.makedirs(f"{unique_output_dir}/mhc_class_ii")
-
-    return unique_output_dir
+        os.makedirs(f"{output_dir}/mhc_class_ii")
 
 
-def main():
+def find_previous_results_folders(base_output_dir, output_dir, prefix="results"):
     """
-    Purpose:    Control function for the whole tool, calls run_comparison which calls all of the comparisons
+    Purpose:    Find the results folders of earlier runs in the output directory
     Modifies:   Nothing
-    Returns:    None
+    Returns:    List of folder paths, the most recent first
     """
-    parser = define_parser()
-    args = parser.parse_args()
+    folders = [
+        entry.path
+        for entry in os.scandir(base_output_dir)
+        if entry.is_dir()
+        and entry.name.startswith(f"{prefix}_")
+        and entry.name != os.path.basename(output_dir)
+    ]
+    return sorted(folders, key=get_folder_order, reverse=True)
 
-    validate_aggregated_columns(args.aggregated_columns, parser)
-    validate_unaggregated_columns(args.unaggregated_columns, parser)
-    validate_reference_match_columns(args.reference_match_columns, parser)
 
-    classes = [args.mhc_class] if args.mhc_class else ["1", "2"]
-    output_dir = prepare_results_folder(classes, args.output_dir)
+def get_folder_order(folder):
+    # Folders created in the same second end in a counter, order them by it
+    name = os.path.basename(folder)
+    parts = name.split("_")
+    count = int(parts[-1]) if len(parts) > 3 and parts[-1].isdigit() else 1
+    return "_".join(parts[:3]), count
+
+
+def get_table_cache(args):
+    if not args.cache_dir:
+        return None
+    return TableCache(args.cache_dir, args.cache_max_size * 1024**3)
+
 
+def get_run_jobs(args, results_folder1, results_folder2, output_dir, table_cache):
+    """
+    Purpose:    Locates the files of the comparisons of a results folder pair in each
+                requested MHC class
+    Modifies:   Nothing
+    Returns:    List of the comparison jobs
+    """
+    classes = [args.mhc_class] if args.mhc_class else ["1", "2"]
+    folder_indexes = [
+        index_results_folder(results_folder1),
+        index_results_folder(results_folder2),
+    ]
+    jobs = []
     for class_type in classes:
-        run_comparison(
+        jobs += get_comparison_jobs(
             class_type,
-            args.results_folder1,
-            args.results_folder2,
+            results_folder1,
+            results_folder2,
             output_dir,
             args.aggregated_columns,
             args.unaggregated_columns,
             args.reference_match_columns,
+            args.hashed_ids,
+            args.streaming,
+            args.workers,
+            args.compact_json,
+            args.shard_differences,
+            args.columnar_differences,
+            args.summary_only,
+            args.max_differences_per_column,
+            table_cache,
+            folder_indexes,
+            args.streaming_min_size,
+        )
+    return jobs
+
+
+def run_results_pair(args, output_dir):
+    """
+    Purpose:    Runs the comparison jobs of the results folder pair of args, reusing the
+                reports of earlier runs unless every comparison is rerun
+    Modifies:   Nothing
+    Returns:    None
+    """
+    jobs = get_run_jobs(
+        args,
+        args.results_folder1,
+        args.results_folder2,
+        output_dir,
+        get_table_cache(args),
+    )
+    if not args.recompute_all:
+        reuse_previous_results(
+            jobs, find_previous_results_folders(args.output_dir, output_dir)
         )
+    run_comparison_jobs(jobs, args.jobs, False, args.prefetch_max_size * 1024**3)
+
+
+def main():
+    """
+    Purpose:    Control function for the whole tool, runs the comparison jobs of each MHC class
+    Modifies:   Nothing
+    Returns:    None
+    """
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    parser = define_parser()
+    args = parser.parse_args()
+    validate_comparison_arguments(args, parser)
+
+    classes = [args.mhc_class] if args.mhc_class else ["1", "2"]
+    output_dir = prepare_results_folder(classes, args.output_dir)
+    run_results_pair(args, output_dir)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,63 @@
 import pandas as pd
 import numpy as np
-import re
+import io
 import logging
 import json
+import os
+import time
+import types
+from file_utils import *
+
+COLUMN_MAPPINGS = {  # Fill in different names/formatting between versions
+    "Best Peptide": ["best peptide", "best_peptide"],
+    "Best Transcript": ["best transcript", "best_transcript"],
+    "Tier": ["tier"],
+    "AA Change": ["AA_change"],
+    "Num Passing Transcripts": ["Num_Transcript"],
+    "Num Passing Peptides": ["Num_Peptides"],
+}
+
+# ID columns with few distinct values are stored as categories, the rest of the
+# textual ID columns are read as plain strings so pandas skips type inference
+ID_COLUMN_DTYPES = {
+    "Chromosome": "category",
+    "Reference": "category",
+    "Variant": "category",
+    "HLA Allele": "category",
+    "Transcript": "category",
+    "MT Epitope Seq": str,
+    "Index": str,
+    "Hit ID": str,
+    "ID": str,
+    "Gene": str,
+    "AA Change": str,
+}
+
+# Column holding the 64-bit ID hashes in hashed ID mode, and the second hash key
+# used to detect two different IDs hashing to the same value
+ID_KEY_COLUMN = "ID Key"
+ID_CHECK_HASH_KEY = "pvaccompare-ids!"
+
+# Attribute of a dataframe loaded through the table cache that holds its cache key
+TABLE_CACHE_KEY_ATTR = "table_cache_key"
+
+# Integer sort key columns added when IDs are built, genomic IDs sort by chromosome,
+# start and stop and replaced IDs by Gene and AA Change
+GENOMIC_SORT_COLUMNS = ["Sort Chromosome", "Sort Start", "Sort Stop"]
+REPLACED_ID_SORT_COLUMNS = ["Sort Gene", "Sort AA Change"]
+
+# Non-numeric chromosomes that follow the autosomes, any other contig sorts after
+# these by name
+KARYOTYPE_ORDER = ["X", "Y", "M", "MT"]
+
+# Number of rows parsed with every column to estimate what projection saved
+PROJECTION_SAMPLE_ROWS = 1000
+
+# Number of differences in each section of the report
+SECTION_SIZE = 1000
+
+# Fields of each difference in the report
+DIFFERENCE_FIELDS = ["ID", "File 1 Value", "File 2 Value", "File 1 Line", "File 2 Line"]
 
 
 def add_line_numbers(df1, df2):
@@ -16,31 +71,30 @@ def check_column_formatting(df1, df2):
     Modifies:   df1 and df2
     Returns:    None
     """
-    column_mappings = {  # Fill in different names/formatting between versions
-        "Best Peptide": ["best peptide", "best_peptide"],
-        "Best Transcript": ["best transcript", "best_transcript"],
-        "Tier": ["tier"],
-        "AA Change": ["AA_change"],
-        "Num Passing Transcripts": ["Num_Transcript"],
-        "Num Passing Peptides": ["Num_Peptides"],
-    }
-
     for col in df1.columns:
-        for key, value in column_mappings.items():
-            if col == key:
-                break
-            elif col in value:
-                logging.info("\u2022 Renamed '%s' to '%s' in file 1", col, key)
-                df1.rename(columns={col: key}, inplace=True)
-                break
+        key = get_canonical_column(col)
+        if key != col:
+            logging.info("\u2022 Renamed '%s' to '%s' in file 1", col, key)
+            df1.rename(columns={col: key}, inplace=True)
     for col in df2.columns:
-        for key, value in column_mappings.items():
-            if col == key:
-                break
-            elif col in value:
-                logging.info("\u2022 Renamed '%s' to '%s' in file 2", col, key)
-                df2.rename(columns={col: key}, inplace=True)
-                break
+        key = get_canonical_column(col)
+        if key != col:
+            logging.info("\u2022 Renamed '%s' to '%s' in file 2", col, key)
+            df2.rename(columns={col: key}, inplace=True)
+
+
+def get_canonical_column(col):
+    """
+    Purpose:    Map a column name to the name used by check_column_formatting
+    Modifies:   Nothing
+    Returns:    String of the canonical column name
+    """
+    for key, value in COLUMN_MAPPINGS.items():
+        if col == key:
+            return key
+        elif col in value:
+            return key
+    return col
 
 
 def find_dropped_cols(df1, df2, original_columns):
@@ -65,29 +119,467 @@ def find_dropped_cols(df1, df2, original_columns):
     return run_notes
 
 
-def get_common_variants(df1, df2):
+def build_id_column(df, id_columns):
+    """
+    Purpose:    Join the ID columns with "-" column-wise, rendering every value the way str()
+                does in a row-wise "-".join(map(str, row))
+    Modifies:   Nothing
+    Returns:    Series of ID strings
+    """
+    id_df = df[id_columns]
+    if all(
+        pd.api.types.is_numeric_dtype(dtype) and dtype != bool for dtype in id_df.dtypes
+    ):
+        # A row of only numeric values is upcast to their common dtype
+        id_df = id_df.astype(np.result_type(*id_df.dtypes))
+
+    id_parts = [format_id_values(id_df[col]) for col in id_columns]
+    return pd.Series(
+        ["-".join(parts) for parts in zip(*id_parts)], index=df.index, dtype=object
+    )
+
+
+def format_id_values(series):
+    """
+    Purpose:    Convert the values of one ID column to strings
+    Modifies:   Nothing
+    Returns:    List of strings
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Format each category once, missing values have code -1 and map to "nan"
+        categories = [str(category) for category in series.cat.categories]
+        categories = np.array(categories + ["nan"], dtype=object)
+        return categories[series.cat.codes.to_numpy()].tolist()
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        # Positions repeat for every peptide of a variant, so format each value once
+        codes, uniques = pd.factorize(series.to_numpy(), use_na_sentinel=False)
+        uniques = np.array(list(map(str, uniques.tolist())), dtype=object)
+        return uniques[codes].tolist()
+    return list(map(str, series.tolist()))
+
+
+def get_id_column(df, id_columns, table_cache=None, build=build_id_column):
+    """
+    Purpose:    Build the ID column of a dataframe, reusing the IDs cached for a table that
+                was loaded from the table cache
+    Modifies:   Nothing
+    Returns:    Series of ID strings
+    """
+    table_key = df.attrs.get(TABLE_CACHE_KEY_ATTR)
+    if table_cache is None or table_key is None:
+        return build(df, id_columns)
+
+    key = table_cache.get_derived_key(table_key, build.__name__, id_columns)
+    ids = table_cache.load(key)
+    if ids is None:
+        ids = build(df, id_columns).to_numpy()
+        table_cache.store(key, ids)
+    return pd.Series(ids, index=df.index, dtype=object)
+
+
+def build_replaced_id_column(df, replacement_columns):
+    """
+    Purpose:    Combine Gene and AA Change into the Gene (AA Change) ID used when a file has
+                no ID column
+    Modifies:   Nothing
+    Returns:    Series of ID strings
+    """
+    return (
+        df[replacement_columns[0]].astype(str)
+        + " ("
+        + df[replacement_columns[1]].astype(str)
+        + ")"
+    )
+
+
+def add_id_keys(df1, df2, id_columns):
+    """
+    Purpose:    Hash the ID columns of both dataframes to 64-bit integer keys, keeping the ID
+                columns so readable IDs can be rebuilt for the variants that are reported
+    Modifies:   df1 and df2
+    Returns:    Boolean, False if two different IDs share a key and string IDs are needed
+    """
+    keys1, keys2 = hash_id_columns(df1, df2, id_columns)
+    checks1, checks2 = hash_id_columns(df1, df2, id_columns, ID_CHECK_HASH_KEY)
+
+    keys = pd.DataFrame(
+        {
+            "key": np.concatenate([keys1, keys2]),
+            "check": np.concatenate([checks1, checks2]),
+        }
+    )
+    if keys["key"].nunique() != len(keys.drop_duplicates()):
+        logging.warning(
+            "\u2022 Hashed IDs collided, falling back to string IDs for this comparison"
+        )
+        return False
+
+    df1[ID_KEY_COLUMN] = keys1
+    df2[ID_KEY_COLUMN] = keys2
+    df1.attrs["id_columns"] = list(id_columns)
+    df2.attrs["id_columns"] = list(id_columns)
+    return True
+
+
+def hash_id_columns(df1, df2, id_columns, hash_key=None):
+    """
+    Purpose:    Hash each row's ID columns so that rows get equal hashes exactly when their
+                ID strings would be equal
+    Modifies:   Nothing
+    Returns:    Two uint64 arrays of row hashes
+    """
+    id_df1 = df1[id_columns].copy()
+    id_df2 = df2[id_columns].copy()
+    for col in id_columns:
+        if get_id_value_kind(id_df1[col]) != get_id_value_kind(id_df2[col]):
+            # 1 and 1.0 hash differently but only the string IDs can tell if they match
+            id_df1[col] = format_id_values(id_df1[col])
+            id_df2[col] = format_id_values(id_df2[col])
+
+    hash_kwargs = {"index": False}
+    if hash_key:
+        hash_kwargs["hash_key"] = hash_key
+    return (
+        pd.util.hash_pandas_object(id_df1, **hash_kwargs).to_numpy(),
+        pd.util.hash_pandas_object(id_df2, **hash_kwargs).to_numpy(),
+    )
+
+
+def get_id_value_kind(series):
     """
-    Purpose:    Find and store IDs shared between the two given dataframes
+    Purpose:    Classify an ID column so columns of different dtypes are only hashed
+                directly when their values hash alike
     Modifies:   Nothing
-    Returns:    A set containing IDs that are common between the two dataframes
+    Returns:    String of the value kind
     """
-    return set(df1["ID"]).intersection(set(df2["ID"]))
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    if dtype == object or pd.api.types.is_string_dtype(dtype):
+        return "text"
+    return str(dtype)
+
+
+def get_id_key(df):
+    """
+    Purpose:    Get the column variants are matched on, the hashed keys when present
+    Modifies:   Nothing
+    Returns:    String of the column name
+    """
+    return ID_KEY_COLUMN if ID_KEY_COLUMN in df.columns else "ID"
+
+
+def get_variant_ids(df, rows=None):
+    """
+    Purpose:    Get the readable IDs of the given row positions, rebuilding them from the
+                ID columns in hashed ID mode
+    Modifies:   Nothing
+    Returns:    Array of ID strings
+    """
+    if "ID" in df.columns:
+        ids = df["ID"] if rows is None else df["ID"].iloc[rows]
+        return ids.to_numpy()
+    subset = df if rows is None else df.iloc[rows]
+    return build_id_column(subset, df.attrs["id_columns"]).to_numpy()
+
+
+def get_duplicate_ids_note(duplicates_file1, duplicates_file2):
+    """
+    Purpose:    Describe which files have duplicate IDs
+    Modifies:   Nothing
+    Returns:    String of the run note
+    """
+    if duplicates_file1 and duplicates_file2:
+        files = "both files"
+    elif duplicates_file1:
+        files = "file 1"
+    else:
+        files = "file 2"
+    return f"ERROR: Duplicate unique records were found in {files}. Writing number of hits only."
+
+
+def get_id_counts(df):
+    """
+    Purpose:    Count the rows of each variant, sorted by variant
+    Modifies:   Nothing
+    Returns:    Dictionary of IDs and their number of rows
+    """
+    key = get_id_key(df)
+    keys = df[key].to_numpy()
+    first_rows = np.flatnonzero(~df[key].duplicated().to_numpy())
+    counts = df[key].value_counts().reindex(keys[first_rows]).to_numpy()
+
+    sort_keys = [df[col].to_numpy()[first_rows] for col in get_sort_columns(df)]
+    order = np.lexsort([first_rows, -counts] + sort_keys[::-1])
+    rows = first_rows[order]
+    return dict(zip(get_variant_ids(df, rows).tolist(), counts[order].tolist()))
+
+
+def align_variants(df1, df2, identical_inputs=False):
+    """
+    Purpose:    Align the variants of both dataframes with a single outer join on their IDs,
+                or pair every row with itself when the inputs are byte-identical and
+                their IDs are unique
+    Modifies:   Nothing
+    Returns:    The common variants, sorted lists of the variants unique to each dataframe,
+                and a tuple of the row positions of matching rows in each dataframe
+    """
+    key = get_id_key(df1)
+    if identical_inputs and df1[key].is_unique:
+        rows = np.arange(len(df1))
+        sort_keys = [df1[col].to_numpy() for col in get_sort_columns(df1)]
+        order = np.lexsort([rows] + sort_keys[::-1])
+        return df1[key].to_numpy(), [], [], (order, order)
+
+    merged_df = pd.merge(
+        pd.DataFrame({key: df1[key].to_numpy(), "row_file1": np.arange(len(df1))}),
+        pd.DataFrame({key: df2[key].to_numpy(), "row_file2": np.arange(len(df2))}),
+        on=key,
+        how="outer",
+        indicator=True,
+    )
+    source = merged_df["_merge"].to_numpy()
+
+    common = merged_df[source == "both"]
+    common_variants = pd.unique(common[key].to_numpy())
+
+    # Matching rows sorted by variant, ties keep the order an inner merge on file 1
+    # would give them
+    rows_file1 = common["row_file1"].to_numpy(dtype=np.int64)
+    rows_file2 = common["row_file2"].to_numpy(dtype=np.int64)
+    sort_keys = [df1[col].to_numpy()[rows_file1] for col in get_sort_columns(df1)]
+    order = np.lexsort([rows_file2, rows_file1] + sort_keys[::-1])
+    aligned_rows = (rows_file1[order], rows_file2[order])
+
+    unique_variants_file1 = get_unique_ids(
+        df1, merged_df[source == "left_only"], key, "row_file1"
+    )
+    unique_variants_file2 = get_unique_ids(
+        df2, merged_df[source == "right_only"], key, "row_file2"
+    )
+    return common_variants, unique_variants_file1, unique_variants_file2, aligned_rows
 
 
-def load_tsv_files(input_file1, input_file2):
+def count_variants(df1, df2):
     """
-    Purpose:    Load the two input tsv files into dataframes
+    Purpose:    Count the common variants and the variants unique to each dataframe and
+                find the matching rows, without sorting or building any IDs
+    Modifies:   Nothing
+    Returns:    The number of common variants, the number of variants unique to each
+                dataframe, and a tuple of the row positions of matching rows in each
+                dataframe
+    """
+    key = get_id_key(df1)
+    codes, uniques = pd.factorize(
+        np.concatenate([df1[key].to_numpy(), df2[key].to_numpy()]),
+        use_na_sentinel=False,
+    )
+    codes1 = codes[: len(df1)]
+    codes2 = codes[len(df1) :]
+    in_file1 = np.bincount(codes1, minlength=len(uniques)) > 0
+    in_file2 = np.bincount(codes2, minlength=len(uniques)) > 0
+
+    merged_df = pd.merge(
+        pd.DataFrame({"code": codes1, "row_file1": np.arange(len(df1))}),
+        pd.DataFrame({"code": codes2, "row_file2": np.arange(len(df2))}),
+        on="code",
+    )
+    return (
+        int(np.count_nonzero(in_file1 & in_file2)),
+        int(np.count_nonzero(in_file1 & ~in_file2)),
+        int(np.count_nonzero(in_file2 & ~in_file1)),
+        (
+            merged_df["row_file1"].to_numpy(dtype=np.int64),
+            merged_df["row_file2"].to_numpy(dtype=np.int64),
+        ),
+    )
+
+
+def get_unique_ids(df, unique_df, key, row_column):
+    """
+    Purpose:    Get the sorted IDs of the variants only found in one dataframe
+    Modifies:   Nothing
+    Returns:    List of ID strings
+    """
+    unique_df = unique_df.drop_duplicates(subset=key)
+    rows = unique_df[row_column].to_numpy(dtype=np.int64)
+    ids = get_variant_ids(df, rows)
+    sort_keys = [df[col].to_numpy()[rows] for col in get_sort_columns(df)]
+    return ids[np.lexsort([ids] + sort_keys[::-1])].tolist()
+
+
+def load_tsv_files(
+    input_file1,
+    input_file2,
+    id_columns=None,
+    columns_to_compare=None,
+    identical_inputs=False,
+    table_cache=None,
+    prefetcher=None,
+):
+    """
+    Purpose:    Load the two input tsv files into dataframes, parsing only the ID columns and
+                the columns to compare when they are given, from memory when the
+                prefetcher of the run read them ahead. Byte-identical inputs are parsed once
     Modifies:   Nothing
     Returns:    Two dataframes corresponding to the two input files
     """
     try:
-        df1 = pd.read_csv(input_file1, sep="\t", low_memory=False)
-        df2 = pd.read_csv(input_file2, sep="\t", low_memory=False)
+        start = time.perf_counter()
+        df1 = load_tsv_file(
+            input_file1, id_columns, columns_to_compare, table_cache, prefetcher
+        )
+        if identical_inputs:
+            logging.info(
+                "\u2022 Reused the parse of file 1 for the byte-identical file 2, "
+                "saving ~%.2fs",
+                time.perf_counter() - start,
+            )
+            return df1, df1.copy()
+        df2 = load_tsv_file(
+            input_file2, id_columns, columns_to_compare, table_cache, prefetcher
+        )
     except Exception as e:
         raise Exception(f"Error loading files: {e}")
     return df1, df2
 
 
+def load_tsv_file(
+    input_file,
+    id_columns=None,
+    columns_to_compare=None,
+    table_cache=None,
+    prefetcher=None,
+):
+    """
+    Purpose:    Load a single tsv file, projecting onto the needed columns with explicit dtypes,
+                from the table cache when the same file was parsed the same way before, and
+                from memory when the prefetcher already read it. Compressed files are
+                decompressed as they are parsed
+    Modifies:   Nothing
+    Returns:    Dataframe of the needed columns
+    """
+    data = prefetcher.take(input_file) if prefetcher is not None else None
+
+    def read_tsv(**kwargs):
+        if data is not None:
+            compression = get_compression(input_file)
+            return pd.read_csv(
+                io.BytesIO(data), sep="\t", compression=compression, **kwargs
+            )
+        with open_tsv_source(input_file) as source:
+            return pd.read_csv(source, sep="\t", **kwargs)
+
+    if id_columns is None and columns_to_compare is None:
+        return read_tsv(low_memory=False)
+
+    header = read_tsv(nrows=0).columns
+    usecols, dtypes = get_projected_columns(header, id_columns, columns_to_compare)
+
+    start = time.perf_counter()
+    if table_cache is not None:
+        # Tables pickled by other versions of pandas or numpy may not load the same
+        key = table_cache.get_key(
+            input_file,
+            "table",
+            usecols,
+            sorted(map(str, dtypes.items())),
+            pd.__version__,
+            np.__version__,
+        )
+        df = table_cache.load(key)
+        if df is not None:
+            logging.info(
+                "\u2022 Loaded %s from the table cache in %.2fs",
+                os.path.basename(input_file),
+                time.perf_counter() - start,
+            )
+            df.attrs[TABLE_CACHE_KEY_ATTR] = key
+            return df
+
+    df = read_tsv(usecols=usecols, dtype=dtypes, low_memory=False)
+    elapsed = time.perf_counter() - start
+
+    if len(usecols) < len(header) and logging.getLogger().isEnabledFor(logging.DEBUG):
+        # The savings are only worth sampling the file for when they will be logged
+        log_projection_savings(
+            read_tsv, input_file, header, usecols, dtypes, df, elapsed
+        )
+    if table_cache is not None:
+        table_cache.store(key, df)
+        df.attrs[TABLE_CACHE_KEY_ATTR] = key
+    return df
+
+
+def get_projected_columns(header, id_columns=None, columns_to_compare=None):
+    """
+    Purpose:    Work out which header columns a comparison needs once names are mapped by
+                check_column_formatting, and the dtypes to parse the ID columns with
+    Modifies:   Nothing
+    Returns:    List of header columns to parse and a dictionary of their dtypes
+    """
+    id_columns = list(id_columns or [])
+    columns_to_compare = list(columns_to_compare or [])
+    needed = set(id_columns) | set(columns_to_compare)
+
+    usecols = [col for col in header if get_canonical_column(col) in needed]
+    dtypes = {}
+    for col in usecols:
+        key = get_canonical_column(col)
+        if key in ID_COLUMN_DTYPES and key not in columns_to_compare:
+            dtypes[col] = ID_COLUMN_DTYPES[key]
+        elif key in ID_COLUMN_DTYPES and ID_COLUMN_DTYPES[key] is str:
+            dtypes[col] = str
+    return usecols, dtypes
+
+
+def log_projection_savings(read_tsv, input_file, header, usecols, dtypes, df, elapsed):
+    """
+    Purpose:    Report the memory and parse time saved by column projection, extrapolated
+                from a sample of rows parsed with every column through read_tsv, the same
+                source as the main parse
+    Modifies:   Nothing
+    Returns:    None
+    """
+    start = time.perf_counter()
+    sample_full = read_tsv(nrows=PROJECTION_SAMPLE_ROWS, low_memory=False)
+    full_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    sample_projected = read_tsv(
+        nrows=PROJECTION_SAMPLE_ROWS,
+        usecols=usecols,
+        dtype=dtypes,
+        low_memory=False,
+    )
+    projected_elapsed = time.perf_counter() - start
+
+    num_rows = len(df)
+    scale = num_rows / len(sample_full) if len(sample_full) else 0
+    loaded_bytes = df.memory_usage(deep=True).sum()
+    saved_bytes = max(
+        (
+            sample_full.memory_usage(deep=True).sum()
+            - sample_projected.memory_usage(deep=True).sum()
+        )
+        * scale,
+        0,
+    )
+    saved_seconds = max((full_elapsed - projected_elapsed) * scale, 0)
+
+    logging.debug(
+        "\u2022 Loaded %d of %d columns from %s: %d rows, %.1f MB in %.2fs "
+        "(column projection saved ~%.1f MB and ~%.2fs)",
+        len(usecols),
+        len(header),
+        os.path.basename(input_file),
+        num_rows,
+        loaded_bytes / 1e6,
+        elapsed,
+        saved_bytes / 1e6,
+        saved_seconds,
+    )
+
+
 def check_columns_to_compare(df1, df2, columns_to_compare):
     """
     Purpose:    Add columns present in both dataframes to columns_to_keep
@@ -101,130 +593,385 @@ def check_columns_to_compare(df1, df2, columns_to_compare):
     return columns_to_keep
 
 
-def get_unique_variants(df1, df2, common_variants, contains_id=True):
+def add_sort_keys(df1, df2, contains_id=True):
     """
-    Purpose:    Find, store, and sort unique variants to each dataframe
+    Purpose:    Add integer sort key columns for the variant IDs, the chromosome rank, start
+                and stop of genomic IDs or the ranks of Gene and AA Change of replaced IDs
+    Modifies:   df1 and df2
+    Returns:    None
+    """
+    if not contains_id:
+        gene1, aa_change1 = split_replaced_ids(df1["ID"])
+        gene2, aa_change2 = split_replaced_ids(df2["ID"])
+        for col, values1, values2 in [
+            (REPLACED_ID_SORT_COLUMNS[0], gene1, gene2),
+            (REPLACED_ID_SORT_COLUMNS[1], aa_change1, aa_change2),
+        ]:
+            _, codes = np.unique(
+                np.concatenate([values1, values2]), return_inverse=True
+            )
+            df1[col] = codes[: len(values1)]
+            df2[col] = codes[len(values1) :]
+        return
+
+    locus1 = get_locus_parts(df1)
+    locus2 = get_locus_parts(df2)
+    ranks = get_chromosome_ranks(pd.unique(np.concatenate([locus1[0], locus2[0]])))
+    for df, locus in [(df1, locus1), (df2, locus2)]:
+        for col, values in zip(
+            GENOMIC_SORT_COLUMNS, get_genomic_sort_keys(*locus, ranks)
+        ):
+            df[col] = values
+
+
+def get_genomic_sort_keys(chromosome, start, stop, ranks):
+    """
+    Purpose:    Turn the locus parts of variants into integer sort keys
     Modifies:   Nothing
-    Returns:    Two sets containing IDs unique to the corresponding dataframes
+    Returns:    Three int64 arrays of the chromosome rank, start and stop
     """
-    return sort_unique_variants(
-        set(df1["ID"]).difference(common_variants),
-        set(df2["ID"]).difference(common_variants),
-        contains_id,
+    # IDs that do not start with chr<name>-<start>-<stop>- sort after all others
+    unmatched = pd.isna(chromosome) | np.isnan(start) | np.isnan(stop)
+    rank = pd.Series(chromosome, dtype=object).map(ranks).fillna(len(ranks)).to_numpy()
+    return (
+        np.where(unmatched, len(ranks), rank).astype(np.int64),
+        np.where(unmatched, -1, start).astype(np.int64),
+        np.where(unmatched, -1, stop).astype(np.int64),
     )
 
 
-def extract_id_parts(id_str):
+def get_locus_parts(df):
     """
-    Purpose:    Extract parts of the ID to use in sorting
+    Purpose:    Get the chromosome without its "chr" prefix, start and stop of each variant,
+                from the Chromosome, Start and Stop columns or else from the ID
     Modifies:   Nothing
-    Returns:    A tuple of the different sections for sorting
+    Returns:    An object array of chromosomes and two float arrays of the start and stop
     """
-    match = re.match(r"chr(\w+)-(\d+)-(\d+)-", id_str)
-    if match:
-        chr_part = match.group(1)
-        if chr_part.isdigit():
-            chr_part = int(chr_part)
-        else:
-            chr_part = float("inf")
-        return chr_part, int(match.group(2)), int(match.group(3))
-    return None, None, None
+    if all(col in df.columns for col in ["Chromosome", "Start", "Stop"]):
+        chromosome = df["Chromosome"].astype(object).to_numpy()
+        codes, names = pd.factorize(chromosome)
+        names = pd.Series(names, dtype=object).astype(str).str.extract(r"^chr(\w+)$")[0]
+        chromosome = np.where(codes < 0, None, names.to_numpy()[codes])
+        start = pd.to_numeric(df["Start"], errors="coerce")
+        stop = pd.to_numeric(df["Stop"], errors="coerce")
+        # Positions that do not print as plain digits do not parse from the ID either
+        start = start.where(start.isna() | (start >= 0)).to_numpy(dtype=float)
+        stop = stop.where(stop.isna() | (stop >= 0)).to_numpy(dtype=float)
+        return chromosome, start, stop
+
+    parts = df["ID"].astype(str).str.extract(r"^chr(\w+)-(\d+)-(\d+)-")
+    return (
+        parts[0].to_numpy(dtype=object),
+        pd.to_numeric(parts[1]).to_numpy(dtype=float),
+        pd.to_numeric(parts[2]).to_numpy(dtype=float),
+    )
 
 
-def split_replaced_id(id_str):
+def get_chromosome_ranks(chromosomes):
     """
-    Purpose:    Extract parts of the replaced ID (Gene-AA change) to use in sorting
+    Purpose:    Rank chromosome names in karyotype order, numbered chromosomes first, then
+                those in KARYOTYPE_ORDER, then any other contig by name
     Modifies:   Nothing
-    Returns:    Two strings corresponding to the split sections
+    Returns:    Dictionary of chromosome names and their rank
     """
-    try:
-        grp1, rest = id_str.split(" (")
-        grp2 = rest.split("-")[0].rstrip(")")
-        return grp1, grp2
-    except Exception as e:
-        logging.error(f"Error splitting replaced ID: {id_str}, {e}")
-        return "", ""
+    names = sorted(
+        (name for name in chromosomes if isinstance(name, str)), key=get_karyotype_key
+    )
+    return {name: rank for rank, name in enumerate(names)}
 
 
-def sort_unique_variants(unique_variants_file1, unique_variants_file2, contains_id):
-    if unique_variants_file1:
-        if contains_id:
-            unique_variants_file1 = sorted(unique_variants_file1, key=extract_id_parts)
-        else:
-            unique_variants_file1 = sorted(unique_variants_file1, key=split_replaced_id)
-    if unique_variants_file2:
-        if contains_id:
-            unique_variants_file2 = sorted(unique_variants_file2, key=extract_id_parts)
-        else:
-            unique_variants_file2 = sorted(unique_variants_file2, key=split_replaced_id)
-    return unique_variants_file1, unique_variants_file2
+def get_karyotype_key(name):
+    """
+    Purpose:    Get the key that orders a chromosome name in karyotype order
+    Modifies:   Nothing
+    Returns:    Tuple to sort on
+    """
+    if name.isdigit():
+        return 0, int(name), name
+    if name in KARYOTYPE_ORDER:
+        return 1, KARYOTYPE_ORDER.index(name), name
+    return 2, 0, name
+
+
+def split_replaced_ids(ids, log_errors=True):
+    """
+    Purpose:    Split replaced IDs (Gene (AA Change)) into their Gene and AA Change parts
+    Modifies:   Nothing
+    Returns:    Two object arrays corresponding to the split sections
+    """
+    parts = ids.astype(str).str.split(" (", regex=False)
+    valid = (parts.str.len() == 2).to_numpy()
+    if log_errors and not valid.all():
+        logging.error(
+            "Error splitting %d replaced IDs, e.g. %s",
+            (~valid).sum(),
+            ids[~valid].iloc[0],
+        )
+    gene = np.where(valid, parts.str[0].to_numpy(dtype=object), "")
+    aa_change = parts.str[1].str.split("-").str[0].str.rstrip(")")
+    aa_change = np.where(valid, aa_change.to_numpy(dtype=object), "")
+    return gene.astype(object), aa_change.astype(object)
+
+
+def get_sort_columns(df):
+    """
+    Purpose:    Get the sort key columns present in a dataframe
+    Modifies:   Nothing
+    Returns:    List of column names
+    """
+    return [
+        col
+        for col in GENOMIC_SORT_COLUMNS + REPLACED_ID_SORT_COLUMNS
+        if col in df.columns
+    ]
 
 
 def get_file_differences(
     df1,
     df2,
     columns_to_compare,
-    contains_id=True,
-    tolerance=0.1,
+    tolerance=DIFFERENCE_TOLERANCE,
+    aligned_rows=None,
+    max_differences=None,
 ):
     """
-    Purpose:    Find and store differences found between the two dataframes
+    Purpose:    Find and store differences found between the two dataframes, keeping at
+                most max_differences differences of each column when given
     Modifies:   Nothing
-    Returns:    Dictionary of differences and a dictionary of unique variants
+    Returns:    Dictionary of differences, the index of the differing variants with all
+                their differences, shown or not, and the truncation of each differing
+                column when max_differences is given
     """
-    df1_selected = df1[["ID", "line"] + columns_to_compare]
-    df2_selected = df2[["ID", "line"] + columns_to_compare]
+    if aligned_rows is None:
+        aligned_rows = align_variants(df1, df2)[3]
+    rows_file1, rows_file2 = aligned_rows
 
-    merged_df = pd.merge(
-        df1_selected, df2_selected, on="ID", suffixes=("_file1", "_file2")
+    mismatches = get_mismatch_matrix(
+        df1, df2, columns_to_compare, (rows_file1, rows_file2), tolerance
     )
+    truncation = None
+    shown = mismatches
+    if max_differences is not None:
+        truncation, shown = truncate_differences(
+            df1,
+            df2,
+            columns_to_compare,
+            mismatches,
+            (rows_file1, rows_file2),
+            max_differences,
+        )
+
+    # Only rows that differ in some column are read again to build the records
+    differing = np.flatnonzero(mismatches.any(axis=1))
+    mismatches = mismatches[differing]
+    shown = shown[differing]
+    rows_file1 = rows_file1[differing]
+    rows_file2 = rows_file2[differing]
+    ids = get_variant_ids(df1, rows_file1)
+    lines_file1 = df1["line"].to_numpy()[rows_file1]
+    lines_file2 = df2["line"].to_numpy()[rows_file2]
 
     differences = {}
-    for col in columns_to_compare:
-        col_file1 = f"{col}_file1"
-        col_file2 = f"{col}_file2"
+    for i, col in enumerate(columns_to_compare):
+        positions = np.flatnonzero(shown[:, i])
+        if positions.size:
+            differences[col] = get_column_records(
+                col,
+                ids[positions],
+                df1[col].to_numpy()[rows_file1[positions]],
+                df2[col].to_numpy()[rows_file2[positions]],
+                lines_file1[positions],
+                lines_file2[positions],
+            )
 
-        # Determine if columns are numeric
-        is_numeric_col1 = np.issubdtype(merged_df[col_file1].dtype, np.number)
-        is_numeric_col2 = np.issubdtype(merged_df[col_file2].dtype, np.number)
+    return (
+        differences,
+        get_variant_index(mismatches, ids, columns_to_compare, shown),
+        truncation,
+    )
 
-        if is_numeric_col1 and is_numeric_col2:
-            # Convert to numeric values to ensure uniformity and handle missing/invalid values
-            merged_df[col_file1] = pd.to_numeric(merged_df[col_file1], errors="coerce")
-            merged_df[col_file2] = pd.to_numeric(merged_df[col_file2], errors="coerce")
 
-            # Mask for numeric differences greater than tolerance
-            tolerance_mask = (
-                np.abs(merged_df[col_file1] - merged_df[col_file2]) > tolerance
-            )
+def truncate_differences(
+    df1, df2, columns_to_compare, mismatches, aligned_rows, max_differences
+):
+    """
+    Purpose:    Keep at most max_differences differences of each column, the largest
+                changes of numeric columns and a sample picked by ID hashes of the others
+    Modifies:   Nothing
+    Returns:    Dictionary of the number of differences of each differing column, how its
+                kept differences were picked and their scores, and the matrix of the
+                differences kept to be shown
+    """
+    rows_file1, rows_file2 = aligned_rows
+    shown = mismatches.copy()
+    truncation = {}
+    for i, col in enumerate(columns_to_compare):
+        positions = np.flatnonzero(mismatches[:, i])
+        if not positions.size:
+            continue
+        selection, scores = get_difference_scores(
+            df1, df2, col, rows_file1[positions], rows_file2[positions]
+        )
+        kept = select_differences(scores, max_differences)
+        shown[positions, i] = False
+        shown[positions[kept], i] = True
+        truncation[col] = {
+            "num_differences": positions.size,
+            "selection": selection,
+            "scores": scores[kept],
+        }
+    return truncation, shown
 
-            # Mask for rows where one value is NaN and the other is not
-            nan_mask = (merged_df[col_file1].isna() & ~merged_df[col_file2].isna()) | (
-                ~merged_df[col_file1].isna() & merged_df[col_file2].isna()
-            )
 
-            # Final mask includes rows with significant numeric differences or NaN-regular number comparisons
-            mask = tolerance_mask | nan_mask
-        else:
-            mask = (merged_df[col_file1] != merged_df[col_file2]) & ~(
-                merged_df[col_file1].isna() & merged_df[col_file2].isna()
-            )
+def get_difference_scores(df1, df2, col, rows_file1, rows_file2):
+    """
+    Purpose:    Score the differences of a column for truncation, numeric differences by
+                the size of the change and the others by a hash of their variant IDs
+    Modifies:   Nothing
+    Returns:    String of how the kept differences are picked and an array of scores, the
+                lowest scores being kept
+    """
+    if is_numeric_column(df1[col]) and is_numeric_column(df2[col]):
+        changes = np.abs(
+            df1[col].to_numpy(dtype=np.float64)[rows_file1]
+            - df2[col].to_numpy(dtype=np.float64)[rows_file2]
+        )
+        # A value missing on one side counts as the largest change
+        return "largest", -np.nan_to_num(changes, nan=np.inf)
+    ids = get_variant_ids(df1, rows_file1)
+    return "sample", pd.util.hash_array(np.asarray(ids, dtype=object))
 
-        diff = merged_df[mask][["ID", col_file1, col_file2, "line_file1", "line_file2"]]
-        if not diff.empty:
-            differences[col] = diff.to_dict("records")
 
-    for col in differences:
-        if contains_id:
-            differences[col] = sorted(
-                differences[col], key=lambda x: extract_id_parts(x["ID"])
-            )
-        else:
-            differences[col] = sorted(
-                differences[col], key=lambda x: split_replaced_id(x["ID"])
-            )
+def select_differences(scores, max_differences):
+    """
+    Purpose:    Pick the max_differences lowest scores with a partition instead of a sort,
+                breaking ties in favor of the earliest differences
+    Modifies:   Nothing
+    Returns:    Sorted array of the positions picked
+    """
+    if len(scores) <= max_differences:
+        return np.arange(len(scores))
+    threshold = np.partition(scores, max_differences - 1)[max_differences - 1]
+    kept = scores < threshold
+    ties = np.flatnonzero(scores == threshold)
+    kept[ties[: max_differences - np.count_nonzero(kept)]] = True
+    return np.flatnonzero(kept)
+
 
-    return differences
+def get_variant_index(mismatches, ids, columns_to_compare, shown=None):
+    """
+    Purpose:    Index the differing variants by the columns they differ in, in one pass
+                over the mismatches of the differing rows. Differences truncation left
+                out of shown are still indexed, so every differing variant is found
+    Modifies:   Nothing
+    Returns:    Dictionary of the variant IDs, the number of columns each differs in, and
+                the column and the position among that column's shown differences of
+                each difference, or -1 when it is not shown, variant by variant
+    """
+    if shown is None:
+        shown = mismatches
+    rows, columns = np.nonzero(mismatches)
+    # The differences of a column are in row order, so a running count of the shown
+    # differences down each column gives the position of a difference in its column
+    entries = np.cumsum(shown, axis=0, dtype=np.int64)[rows, columns] - 1
+    entries[~shown[rows, columns]] = -1
+    return {
+        "columns": list(columns_to_compare),
+        "ids": ids,
+        "num_differences": np.count_nonzero(mismatches, axis=1),
+        "column": columns,
+        "entry": entries,
+    }
+
+
+def count_file_differences(
+    df1, df2, columns_to_compare, aligned_rows, tolerance=DIFFERENCE_TOLERANCE
+):
+    """
+    Purpose:    Count the differences of each column from the mismatch matrix, without
+                building the difference records
+    Modifies:   Nothing
+    Returns:    Dictionary of the number of differences of each differing column
+    """
+    mismatches = get_mismatch_matrix(
+        df1, df2, columns_to_compare, aligned_rows, tolerance
+    )
+    num_differences = np.count_nonzero(mismatches, axis=0).tolist()
+    return {
+        col: count for col, count in zip(columns_to_compare, num_differences) if count
+    }
+
+
+def is_numeric_column(series):
+    """
+    Purpose:    Check if a column is compared numerically
+    Modifies:   Nothing
+    Returns:    Boolean
+    """
+    return isinstance(series.dtype, np.dtype) and np.issubdtype(series.dtype, np.number)
+
+
+def get_mismatch_matrix(
+    df1, df2, columns_to_compare, aligned_rows, tolerance=DIFFERENCE_TOLERANCE
+):
+    """
+    Purpose:    Compare every selected column of the aligned rows in one pass
+    Modifies:   Nothing
+    Returns:    Boolean array with a row per aligned row and a column per compared column,
+                True where the values differ
+    """
+    rows_file1, rows_file2 = aligned_rows
+    mismatches = np.empty((len(rows_file1), len(columns_to_compare)), dtype=bool)
+    for i, col in enumerate(columns_to_compare):
+        mismatches[:, i] = get_column_mismatches(
+            df1[col].to_numpy()[rows_file1],
+            df2[col].to_numpy()[rows_file2],
+            tolerance,
+        )
+    return mismatches
+
+
+def get_column_mismatches(values1, values2, tolerance=DIFFERENCE_TOLERANCE):
+    """
+    Purpose:    Compare the aligned values of a column, numerically within the tolerance
+                when both sides are numeric
+    Modifies:   Nothing
+    Returns:    Boolean array, True where the values differ
+    """
+    missing1 = pd.isna(values1)
+    missing2 = pd.isna(values2)
+    if np.issubdtype(values1.dtype, np.number) and np.issubdtype(
+        values2.dtype, np.number
+    ):
+        # Differences greater than the tolerance, or a number compared with a NaN
+        return (np.abs(values1 - values2) > tolerance) | (missing1 != missing2)
+    return (values1 != values2) & ~(missing1 & missing2)
+
+
+def get_column_records(col, ids, values1, values2, lines1, lines2):
+    """
+    Purpose:    Build the difference records of a column from its differing values
+    Modifies:   Nothing
+    Returns:    List of difference dictionaries
+    """
+    col_file1 = f"{col}_file1"
+    col_file2 = f"{col}_file2"
+    return [
+        {
+            "ID": id,
+            col_file1: value1,
+            col_file2: value2,
+            "line_file1": line1,
+            "line_file2": line2,
+        }
+        for id, value1, value2, line1, line2 in zip(
+            ids.tolist(),
+            values1.tolist(),
+            values2.tolist(),
+            lines1.tolist(),
+            lines2.tolist(),
+        )
+    ]
 
 
 def replace_nan_with_none(obj):
@@ -237,36 +984,51 @@ def replace_nan_with_none(obj):
     return obj
 
 
-def preprocess_differences(differences, chunk_size=1000):
-    differences = replace_nan_with_none(differences)
-    transformed_differences = {}
-
-    for section, entries in differences.items():
-        chunked_entries = [
-            entries[i : i + chunk_size] for i in range(0, len(entries), chunk_size)
-        ]
-
-        section_data = {"num_sections": len(chunked_entries)}
-
-        section_data.update(
-            {
-                f"section{idx + 1}": [
-                    {
-                        "ID": entry["ID"],
-                        "File 1 Value": entry.get(f"{section}_file1"),
-                        "File 2 Value": entry.get(f"{section}_file2"),
-                        "File 1 Line": entry.get("line_file1"),
-                        "File 2 Line": entry.get("line_file2"),
-                    }
-                    for entry in chunk
-                ]
-                for idx, chunk in enumerate(chunked_entries)
-            }
-        )
+def get_difference_sections(entries, num_entries, chunk_size=SECTION_SIZE):
+    """
+    Purpose:    Group the report entries of a column into the sections of the report
+    Modifies:   Nothing
+    Returns:    Generator of the section names and their entries, after the number of
+                sections
+    """
+    yield "num_sections", -(-num_entries // chunk_size)
+    section = []
+    num_sections = 0
+    for entry in entries:
+        section.append(entry)
+        if len(section) == chunk_size:
+            num_sections += 1
+            yield f"section{num_sections}", section
+            section = []
+    if section:
+        yield f"section{num_sections + 1}", section
+
+
+def get_section_entry(section, entry):
+    """
+    Purpose:    Convert a difference record to the entry shown in the report
+    Modifies:   Nothing
+    Returns:    Dictionary of the report entry
+    """
+    return {
+        "ID": entry["ID"],
+        "File 1 Value": get_json_value(entry.get(f"{section}_file1")),
+        "File 2 Value": get_json_value(entry.get(f"{section}_file2")),
+        "File 1 Line": entry.get("line_file1"),
+        "File 2 Line": entry.get("line_file2"),
+    }
 
-        transformed_differences[section] = section_data
 
-    return transformed_differences
+def get_section_entries(section, records):
+    for entry in records:
+        yield get_section_entry(section, entry)
+
+
+def get_json_value(value):
+    # NaN is written as null
+    if isinstance(value, float) and value != value:
+        return None
+    return value
 
 
 def export_to_json(
@@ -284,29 +1046,48 @@ def export_to_json(
     hits_file1={},
     hits_file2={},
     duplicate_ids=False,
+    variant_index=None,
+    truncation=None,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
 ):
+    """
+    Purpose:    Write the report JSON of a comparison, streaming the difference sections
+                straight from the difference records
+    Modifies:   Nothing
+    Returns:    None
+    """
     file_path = f"{output_path}/{filename}"
 
+    truncated_differences = {}
     if filename != "yml_input_data.json" and filename != "json_input_data.json":
-        summary_data = {
-            "Notes": run_notes,
-            "Variants": {
-                "Total number of variants": get_total_number_variants(
-                    common_variants, unique_variants_file1, unique_variants_file2
-                ),
-                "Number of common variants": len(common_variants),
-                "Number of variants unique to file 1": len(unique_variants_file1),
-                "Number of variants unique to file 2": len(unique_variants_file2),
-            },
-            "Section Differences": {},
-        }
         num_col_differences = get_number_column_differences(differences)
-        for col, _ in differences.items():
-            if col != "ID":
-                summary_data["Section Differences"][
-                    f"Number of differences in {col}"
-                ] = num_col_differences[col]
-        differences = preprocess_differences(differences)
+        if truncation:
+            truncated_differences = get_truncated_differences(
+                {col: truncation[col]["num_differences"] for col in differences},
+                num_col_differences,
+                {col: truncation[col]["selection"] for col in differences},
+            )
+            num_col_differences = {
+                col: truncation[col]["num_differences"] for col in differences
+            }
+        summary_data = get_summary_data(
+            run_notes,
+            get_total_number_variants(
+                common_variants, unique_variants_file1, unique_variants_file2
+            ),
+            len(common_variants),
+            len(unique_variants_file1),
+            len(unique_variants_file2),
+            num_col_differences,
+        )
+        differences = {
+            col: StreamedDict(
+                get_difference_sections(get_section_entries(col, records), len(records))
+            )
+            for col, records in differences.items()
+        }
     else:
         summary_data = {}
 
@@ -328,9 +1109,319 @@ def export_to_json(
         "differences": differences,
         "variants": variant_data,
     }
+    if truncated_differences:
+        data["truncated_differences"] = truncated_differences
+    if variant_index is not None:
+        data["variant_index"] = get_variant_index_data(
+            variant_index["columns"],
+            variant_index["ids"].tolist(),
+            variant_index["num_differences"].tolist(),
+            variant_index["column"].tolist(),
+            variant_index["entry"].tolist(),
+        )
+
+    write_report_json(
+        file_path, data, compact_json, shard_differences, columnar_differences
+    )
+
+
+def get_truncated_differences(num_differences, num_shown, selections):
+    """
+    Purpose:    Describe the columns whose differences were truncated for the report
+    Modifies:   Nothing
+    Returns:    Dictionary of the number of differences, the number shown and how they
+                were picked for each truncated column
+    """
+    return {
+        col: {
+            "num_differences": count,
+            "num_shown": num_shown[col],
+            "selection": selections[col],
+        }
+        for col, count in num_differences.items()
+        if count > num_shown[col]
+    }
+
+
+def get_variant_index_data(columns, ids, num_differences, column, entry):
+    """
+    Purpose:    Lay out the index of the differing variants for the report, which finds
+                a difference in the sections of its column by its position
+    Modifies:   Nothing
+    Returns:    Dictionary of the variant index
+    """
+    return {
+        "columns": columns,
+        "section_size": SECTION_SIZE,
+        "ids": ids,
+        "num_differences": num_differences,
+        "column": column,
+        "entry": entry,
+    }
 
+
+def export_summary_json(
+    input_file1,
+    input_file2,
+    filename,
+    output_path,
+    class_type,
+    id_format,
+    summary_data,
+    compact_json=False,
+):
+    """
+    Purpose:    Write the report JSON of a summary only comparison, with the summary and no
+                differences or variants
+    Modifies:   Nothing
+    Returns:    None
+    """
+    data = {
+        "mhc_class": class_type,
+        "input_file1": input_file1,
+        "input_file2": input_file2,
+        "id_format": id_format,
+        "summary_only": True,
+        "summary": summary_data,
+        "differences": {},
+        "variants": {},
+    }
+    write_report_json(f"{output_path}/{filename}", data, compact_json)
+
+
+def write_report_json(
+    file_path,
+    data,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
+):
+    """
+    Purpose:    Write a report JSON, with the difference sections stored as columns of
+                parallel arrays when columnar, and written to shard files next to the
+                report when sharding
+    Modifies:   Nothing
+    Returns:    None
+    """
+    if columnar_differences:
+        id_table = {}
+        data["differences"] = get_columnar_differences(data["differences"], id_table)
+        if "variant_index" in data:
+            data["variant_index"]["ids"] = get_table_indexes(
+                data["variant_index"]["ids"], id_table
+            )
+        # Filled while the differences are written, so it is written after them
+        data["difference_ids"] = get_table_ids(id_table)
+    if shard_differences:
+        data["differences"] = write_difference_shards(
+            file_path, data["differences"], compact_json
+        )
     with open(file_path, "w") as f:
-        json.dump(data, f, indent=4)
+        write_json(f, data, compact_json)
+
+
+def write_difference_shards(file_path, differences, compact_json=False):
+    """
+    Purpose:    Write each difference section of a report to its own shard file in a
+                folder named after the report
+    Modifies:   Nothing
+    Returns:    Dictionary of the shard manifest of each column, with the shard paths
+                relative to the report
+    """
+    shard_folder = f"{os.path.splitext(os.path.basename(file_path))[0]}_shards"
+    manifest = {}
+    for number, (col, sections) in enumerate(differences.items(), start=1):
+        if not isinstance(sections, StreamedDict):
+            manifest[col] = sections
+            continue
+
+        pairs = iter(sections.pairs)
+        _, num_sections = next(pairs)
+        os.makedirs(
+            os.path.join(os.path.dirname(file_path), shard_folder), exist_ok=True
+        )
+        shards = []
+        for name, entries in pairs:
+            # Column names can hold characters that do not belong in file names
+            shard = f"{shard_folder}/column{number}_{name}.json"
+            with open(os.path.join(os.path.dirname(file_path), shard), "w") as f:
+                write_json(f, entries, compact_json)
+            shards.append(shard)
+        manifest[col] = {"num_sections": num_sections, "shards": shards}
+    return manifest
+
+
+def get_columnar_differences(differences, id_table):
+    """
+    Purpose:    Store the difference sections of each column as parallel arrays, with the
+                IDs replaced by their index in the ID table
+    Modifies:   Nothing
+    Returns:    Dictionary of the columnar differences of each column
+    """
+    return {
+        col: (
+            StreamedDict(get_columnar_sections(sections.pairs, id_table))
+            if isinstance(sections, StreamedDict)
+            else sections
+        )
+        for col, sections in differences.items()
+    }
+
+
+def get_columnar_sections(pairs, id_table):
+    for name, entries in pairs:
+        if name == "num_sections":
+            yield name, entries
+        else:
+            yield name, get_columnar_section(entries, id_table)
+
+
+def get_columnar_section(entries, id_table):
+    """
+    Purpose:    Turn the report entries of a section into parallel arrays of their fields
+    Modifies:   id_table
+    Returns:    Dictionary of the field arrays
+    """
+    section = {field: [] for field in DIFFERENCE_FIELDS}
+    for entry in entries:
+        section["ID"].append(id_table.setdefault(entry["ID"], len(id_table)))
+        for field in DIFFERENCE_FIELDS[1:]:
+            section[field].append(entry[field])
+    return section
+
+
+def get_table_ids(id_table):
+    yield from id_table
+
+
+def get_table_indexes(ids, id_table):
+    # The IDs of variants whose differences truncation all left out are added after the
+    # IDs of the differences, the table is written after the variant index
+    for id in ids:
+        yield id_table.setdefault(id, len(id_table))
+
+
+class StreamedDict:
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+
+def write_json(f, value, compact=False, level=0):
+    """
+    Purpose:    Write a value as json.dump(value, f, indent=4) does, or without indentation
+                when compact, writing generators as arrays and StreamedDicts as objects
+                while their items are produced, and NaN as null
+    Modifies:   f
+    Returns:    None
+    """
+    if isinstance(value, (dict, StreamedDict)):
+        opening, closing = "{", "}"
+        items = value.items() if isinstance(value, dict) else value.pairs
+    elif isinstance(value, (list, types.GeneratorType)):
+        opening, closing = "[", "]"
+        items = ((None, item) for item in value)
+    else:
+        f.write(json.dumps(get_json_value(value)))
+        return
+
+    if not has_streamed_values(value):
+        try:
+            if compact:
+                f.write(json.dumps(value, separators=(",", ":"), allow_nan=False))
+            else:
+                text = json.dumps(value, indent=4, allow_nan=False)
+                f.write(text.replace("\n", "\n" + "    " * level))
+            return
+        except ValueError:
+            # Values holding NaN are written item by item
+            pass
+
+    indent = "" if compact else "\n" + "    " * (level + 1)
+    f.write(opening)
+    empty = True
+    for key, item in items:
+        f.write(indent if empty else "," + indent)
+        if key is not None:
+            f.write(json.dumps(key) + (":" if compact else ": "))
+        write_json(f, item, compact, level + 1)
+        empty = False
+    if empty or compact:
+        f.write(closing)
+    else:
+        f.write("\n" + "    " * level + closing)
+
+
+def has_streamed_values(value):
+    """
+    Purpose:    Check if a value is or holds a generator or StreamedDict
+    Modifies:   Nothing
+    Returns:    Boolean
+    """
+    if isinstance(value, (StreamedDict, types.GeneratorType)):
+        return True
+    if isinstance(value, dict):
+        return any(has_streamed_values(item) for item in value.values())
+    if isinstance(value, list):
+        return any(isinstance(item, (dict, list)) for item in value) and any(
+            has_streamed_values(item) for item in value
+        )
+    return False
+
+
+def get_summary_data(
+    run_notes,
+    num_variants,
+    num_common,
+    num_unique_file1,
+    num_unique_file2,
+    num_col_differences,
+):
+    """
+    Purpose:    Build the summary section of a TSV comparison report
+    Modifies:   Nothing
+    Returns:    Dictionary of the summary
+    """
+    summary_data = {
+        "Notes": run_notes,
+        "Variants": {
+            "Total number of variants": num_variants,
+            "Number of common variants": num_common,
+            "Number of variants unique to file 1": num_unique_file1,
+            "Number of variants unique to file 2": num_unique_file2,
+        },
+        "Section Differences": {},
+    }
+    for col, num_differences in num_col_differences.items():
+        summary_data["Section Differences"][
+            f"Number of differences in {col}"
+        ] = num_differences
+    return summary_data
+
+
+def get_tsv_summary(df1, df2, columns_to_compare, run_notes, compare_differences=True):
+    """
+    Purpose:    Count the variants and the differences of each column for a summary only
+                comparison
+    Modifies:   Nothing
+    Returns:    Dictionary of the summary and a Boolean, True if no variant differs
+    """
+    num_common, num_unique_file1, num_unique_file2, aligned_rows = count_variants(
+        df1, df2
+    )
+    num_differences = {}
+    if compare_differences:
+        num_differences = count_file_differences(
+            df1, df2, columns_to_compare, aligned_rows
+        )
+    summary_data = get_summary_data(
+        run_notes,
+        num_common + num_unique_file1 + num_unique_file2,
+        num_common,
+        num_unique_file1,
+        num_unique_file2,
+        num_differences,
+    )
+    return summary_data, not (num_unique_file1 or num_unique_file2 or num_differences)
 
 
 def get_total_number_variants(
@@ -1,5 +1,3 @@
-from .run_compare_aggregated_tsv import main as run_compare_aggregated_tsv
-from .run_compare_json import main as run_compare_json
-from .run_compare_reference_matches_tsv import main as run_compare_reference_matches_tsv
-from .run_compare_unaggregated_tsv import main as run_compare_unaggregated_tsv
-from .run_compare_yml import main as run_compare_yml
+# The runners are imported by name when their comparison runs, see
+# compare_tools.comparison_router.RUNNERS, so that parsing the arguments and finding
+# the files never wait for pandas, numpy or deepdiff to be imported
@@ -1,18 +1,90 @@
 from comparisons import CompareAggregatedTSV
 from run_utils import *
+from streaming_utils import stream_compare_tsv_files, use_streaming_engine
+from parallel_utils import parallel_compare_tsv_files, use_parallel_engine
 import logging
 
 
-def main(input_file1, input_file2, columns_to_compare, output_path, class_type):
+def main(
+    input_file1,
+    input_file2,
+    columns_to_compare,
+    output_path,
+    class_type,
+    hashed_ids=False,
+    streaming=False,
+    workers=1,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
+    summary_only=False,
+    max_differences=None,
+    table_cache=None,
+    identical_inputs=False,
+    prefetcher=None,
+    streaming_min_size=STREAMING_MIN_SIZE,
+):
     """
     Purpose:    Control function for the aggregated tsv file comparison
     Modifies:   Nothing
     Returns:    None
     """
-    comparer = CompareAggregatedTSV(input_file1, input_file2, columns_to_compare)
+    if not identical_inputs and use_parallel_engine(input_file1, input_file2, workers):
+        parallel_compare_tsv_files(
+            "aggregated",
+            input_file1,
+            input_file2,
+            columns_to_compare,
+            output_path,
+            class_type,
+            "aggregated_data.json",
+            "Chromosome-Start-Stop-Reference-Variant",
+            workers,
+            compact_json,
+            shard_differences,
+            columnar_differences,
+            summary_only,
+            max_differences,
+        )
+        return
+    if use_streaming_engine(
+        input_file1,
+        input_file2,
+        streaming,
+        streaming_min_size,
+        hashed_ids,
+        table_cache,
+        prefetcher,
+    ):
+        stream_compare_tsv_files(
+            "aggregated",
+            input_file1,
+            input_file2,
+            columns_to_compare,
+            output_path,
+            class_type,
+            "aggregated_data.json",
+            "Chromosome-Start-Stop-Reference-Variant",
+            compact_json,
+            shard_differences,
+            columnar_differences,
+            summary_only,
+            max_differences,
+        )
+        return
+
+    comparer = CompareAggregatedTSV(
+        input_file1,
+        input_file2,
+        columns_to_compare,
+        hashed_ids,
+        identical_inputs,
+        table_cache,
+        prefetcher,
+    )
     add_line_numbers(comparer.df1, comparer.df2)
     check_column_formatting(comparer.df1, comparer.df2)
-    comparer.check_id()
+    comparer.check_id(sort_keys=not summary_only)
 
     id_format = (
         "Chromosome-Start-Stop-Reference-Variant"
@@ -31,16 +103,37 @@ def main(input_file1, input_file2, columns_to_compare, output_path, class_type):
         comparer.df1, comparer.df2, comparer.columns_to_compare
     )
 
-    common_variants = get_common_variants(comparer.df1, comparer.df2)
-    unique_variants_file1, unique_variants_file2 = get_unique_variants(
-        comparer.df1, comparer.df2, common_variants, comparer.contains_id
-    )
+    if summary_only:
+        summary_data, identical = get_tsv_summary(
+            comparer.df1, comparer.df2, comparer.columns_to_compare, run_notes
+        )
+        if identical:
+            logging.info("The Aggregated TSV files are identical.")
+        export_summary_json(
+            comparer.input_file1,
+            comparer.input_file2,
+            "aggregated_data.json",
+            output_path,
+            class_type,
+            id_format,
+            summary_data,
+            compact_json,
+        )
+        return
+
+    (
+        common_variants,
+        unique_variants_file1,
+        unique_variants_file2,
+        aligned_rows,
+    ) = align_variants(comparer.df1, comparer.df2, identical_inputs)
 
-    differences = get_file_differences(
+    differences, variant_index, truncation = get_file_differences(
         comparer.df1,
         comparer.df2,
         comparer.columns_to_compare,
-        comparer.contains_id,
+        aligned_rows=aligned_rows,
+        max_differences=max_differences,
     )
 
     if not unique_variants_file1 and not unique_variants_file2 and not differences:
@@ -58,6 +151,11 @@ def main(input_file1, input_file2, columns_to_compare, output_path, class_type):
         common_variants,
         unique_variants_file1,
         unique_variants_file2,
+        variant_index=variant_index,
+        truncation=truncation,
+        compact_json=compact_json,
+        shard_differences=shard_differences,
+        columnar_differences=columnar_differences,
     )
 
 
@@ -3,25 +3,37 @@ from run_utils import *
 from comparisons import CompareJSON
 
 
-def main(input_file1, input_file2, output_path, class_type):
+def main(
+    input_file1,
+    input_file2,
+    output_path,
+    class_type,
+    compact_json=False,
+    identical_inputs=False,
+):
     """
     Purpose:    Control function for the metrics json file comparison
     Modifies:   Nothing
     Returns:    None
     """
-    comparer = CompareJSON(input_file1, input_file2)
-    comparer.compare_metric_data()
+    if identical_inputs:
+        differences = {}
+    else:
+        comparer = CompareJSON(input_file1, input_file2)
+        comparer.compare_metric_data()
+        differences = comparer.differences
 
-    if not comparer.differences:
+    if not differences:
         logging.info("The JSON metric inputs are identical.")
 
     export_to_json(
-        comparer.input_file1,
-        comparer.input_file2,
-        comparer.differences,
+        input_file1,
+        input_file2,
+        differences,
         "json_input_data.json",
         output_path,
         class_type,
+        compact_json=compact_json,
     )
 
 
@@ -1,9 +1,29 @@
 from run_utils import *
+from streaming_utils import stream_compare_tsv_files, use_streaming_engine
+from parallel_utils import parallel_compare_tsv_files, use_parallel_engine
 from comparisons import CompareReferenceMatchesTSV
 import logging
 
 
-def main(input_file1, input_file2, columns_to_compare, output_path, class_type):
+def main(
+    input_file1,
+    input_file2,
+    columns_to_compare,
+    output_path,
+    class_type,
+    hashed_ids=False,
+    streaming=False,
+    workers=1,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
+    summary_only=False,
+    max_differences=None,
+    table_cache=None,
+    identical_inputs=False,
+    prefetcher=None,
+    streaming_min_size=STREAMING_MIN_SIZE,
+):
     """
     Purpose:    Control function for the reference matches tsv comparison
     Modifies:   Nothing
@@ -11,11 +31,62 @@ def main(input_file1, input_file2, columns_to_compare, output_path, class_type):
     """
     id_format = "Chromosome-Start-Stop-Reference-Variant-Transcript-MT_Epitope_Seq-Hit_ID-Match_Start-Match_Stop"
     duplicate_ids = False
+    if not identical_inputs and use_parallel_engine(input_file1, input_file2, workers):
+        parallel_compare_tsv_files(
+            "reference_matches",
+            input_file1,
+            input_file2,
+            columns_to_compare,
+            output_path,
+            class_type,
+            "reference_matches_data.json",
+            id_format,
+            workers,
+            compact_json,
+            shard_differences,
+            columnar_differences,
+            summary_only,
+            max_differences,
+        )
+        return
+    if use_streaming_engine(
+        input_file1,
+        input_file2,
+        streaming,
+        streaming_min_size,
+        hashed_ids,
+        table_cache,
+        prefetcher,
+    ):
+        stream_compare_tsv_files(
+            "reference_matches",
+            input_file1,
+            input_file2,
+            columns_to_compare,
+            output_path,
+            class_type,
+            "reference_matches_data.json",
+            id_format,
+            compact_json,
+            shard_differences,
+            columnar_differences,
+            summary_only,
+            max_differences,
+        )
+        return
 
-    comparer = CompareReferenceMatchesTSV(input_file1, input_file2, columns_to_compare)
+    comparer = CompareReferenceMatchesTSV(
+        input_file1,
+        input_file2,
+        columns_to_compare,
+        hashed_ids,
+        identical_inputs,
+        table_cache,
+        prefetcher,
+    )
     add_line_numbers(comparer.df1, comparer.df2)
     check_column_formatting(comparer.df1, comparer.df2)
-    comparer.create_id_column()
+    comparer.create_id_column(sort_keys=not summary_only)
 
     comparer.run_notes = find_dropped_cols(
         comparer.df1, comparer.df2, comparer.columns_to_compare
@@ -25,17 +96,48 @@ def main(input_file1, input_file2, columns_to_compare, output_path, class_type):
         comparer.df1, comparer.df2, comparer.columns_to_compare
     )
 
-    common_variants = get_common_variants(comparer.df1, comparer.df2)
-    unique_variants_file1, unique_variants_file2 = get_unique_variants(
-        comparer.df1, comparer.df2, common_variants
-    )
+    if summary_only:
+        duplicate_ids = comparer.check_duplicate_ids(count_hits=False)
+        summary_data, identical = get_tsv_summary(
+            comparer.df1,
+            comparer.df2,
+            comparer.columns_to_compare,
+            comparer.run_notes,
+            not duplicate_ids,
+        )
+        if identical and not duplicate_ids:
+            logging.info("The Reference Matches TSV files are identical.")
+        export_summary_json(
+            comparer.input_file1,
+            comparer.input_file2,
+            "reference_matches_data.json",
+            output_path,
+            class_type,
+            id_format,
+            summary_data,
+            compact_json,
+        )
+        return
+
+    (
+        common_variants,
+        unique_variants_file1,
+        unique_variants_file2,
+        aligned_rows,
+    ) = align_variants(comparer.df1, comparer.df2, identical_inputs)
 
     if comparer.check_duplicate_ids():
         duplicate_ids = True
         differences = {}
+        variant_index = None
+        truncation = None
     else:
-        differences = get_file_differences(
-            comparer.df1, comparer.df2, comparer.columns_to_compare
+        differences, variant_index, truncation = get_file_differences(
+            comparer.df1,
+            comparer.df2,
+            comparer.columns_to_compare,
+            aligned_rows=aligned_rows,
+            max_differences=max_differences,
         )
 
     if (
@@ -61,6 +163,11 @@ def main(input_file1, input_file2, columns_to_compare, output_path, class_type):
         comparer.hits_file1,
         comparer.hits_file2,
         duplicate_ids,
+        variant_index=variant_index,
+        truncation=truncation,
+        compact_json=compact_json,
+        shard_differences=shard_differences,
+        columnar_differences=columnar_differences,
     )
 
 
@@ -1,20 +1,91 @@
 from run_utils import *
+from streaming_utils import stream_compare_tsv_files, use_streaming_engine
+from parallel_utils import parallel_compare_tsv_files, use_parallel_engine
 from comparisons import CompareUnaggregatedTSV
 import logging
 
 
-def main(input_file1, input_file2, columns_to_compare, output_path, class_type):
+def main(
+    input_file1,
+    input_file2,
+    columns_to_compare,
+    output_path,
+    class_type,
+    hashed_ids=False,
+    streaming=False,
+    workers=1,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
+    summary_only=False,
+    max_differences=None,
+    table_cache=None,
+    identical_inputs=False,
+    prefetcher=None,
+    streaming_min_size=STREAMING_MIN_SIZE,
+):
     """
     Purpose:    Control function for the unaggregated tsv file comparison
     Modifies:   Nothing
     Returns:    None
     """
     id_format = "Chromosome-Start-Stop-Reference-Variant-HLA_Allele-Sub_peptide_Position-Mt_Epitope_Seq-Index"
+    if not identical_inputs and use_parallel_engine(input_file1, input_file2, workers):
+        parallel_compare_tsv_files(
+            "unaggregated",
+            input_file1,
+            input_file2,
+            columns_to_compare,
+            output_path,
+            class_type,
+            "unaggregated_data.json",
+            id_format,
+            workers,
+            compact_json,
+            shard_differences,
+            columnar_differences,
+            summary_only,
+            max_differences,
+        )
+        return
+    if use_streaming_engine(
+        input_file1,
+        input_file2,
+        streaming,
+        streaming_min_size,
+        hashed_ids,
+        table_cache,
+        prefetcher,
+    ):
+        stream_compare_tsv_files(
+            "unaggregated",
+            input_file1,
+            input_file2,
+            columns_to_compare,
+            output_path,
+            class_type,
+            "unaggregated_data.json",
+            id_format,
+            compact_json,
+            shard_differences,
+            columnar_differences,
+            summary_only,
+            max_differences,
+        )
+        return
 
-    comparer = CompareUnaggregatedTSV(input_file1, input_file2, columns_to_compare)
+    comparer = CompareUnaggregatedTSV(
+        input_file1,
+        input_file2,
+        columns_to_compare,
+        hashed_ids,
+        identical_inputs,
+        table_cache,
+        prefetcher,
+    )
     add_line_numbers(comparer.df1, comparer.df2)
     check_column_formatting(comparer.df1, comparer.df2)
-    comparer.create_id_column()
+    comparer.create_id_column(sort_keys=not summary_only)
 
     run_notes = find_dropped_cols(
         comparer.df1, comparer.df2, comparer.columns_to_compare
@@ -24,13 +95,37 @@ def main(input_file1, input_file2, columns_to_compare, output_path, class_type):
         comparer.df1, comparer.df2, comparer.columns_to_compare
     )
 
-    common_variants = get_common_variants(comparer.df1, comparer.df2)
-    unique_variants_file1, unique_variants_file2 = get_unique_variants(
-        comparer.df1, comparer.df2, common_variants
-    )
+    if summary_only:
+        summary_data, identical = get_tsv_summary(
+            comparer.df1, comparer.df2, comparer.columns_to_compare, run_notes
+        )
+        if identical:
+            logging.info("The Unaggregated TSV files are identical.")
+        export_summary_json(
+            comparer.input_file1,
+            comparer.input_file2,
+            "unaggregated_data.json",
+            output_path,
+            class_type,
+            id_format,
+            summary_data,
+            compact_json,
+        )
+        return
 
-    differences = get_file_differences(
-        comparer.df1, comparer.df2, comparer.columns_to_compare
+    (
+        common_variants,
+        unique_variants_file1,
+        unique_variants_file2,
+        aligned_rows,
+    ) = align_variants(comparer.df1, comparer.df2, identical_inputs)
+
+    differences, variant_index, truncation = get_file_differences(
+        comparer.df1,
+        comparer.df2,
+        comparer.columns_to_compare,
+        aligned_rows=aligned_rows,
+        max_differences=max_differences,
     )
 
     if not unique_variants_file1 and not unique_variants_file2 and not differences:
@@ -48,6 +143,11 @@ def main(input_file1, input_file2, columns_to_compare, output_path, class_type):
         common_variants,
         unique_variants_file1,
         unique_variants_file2,
+        variant_index=variant_index,
+        truncation=truncation,
+        compact_json=compact_json,
+        shard_differences=shard_differences,
+        columnar_differences=columnar_differences,
     )
 
 
@@ -3,29 +3,42 @@ from run_utils import *
 from comparisons import CompareYML
 
 
-def main(input_file1, input_file2, output_path, class_type):
+def main(
+    input_file1,
+    input_file2,
+    output_path,
+    class_type,
+    compact_json=False,
+    identical_inputs=False,
+):
     """
     Purpose:    Control function for the inputs.yml file comparison
     Modifies:   Nothing
     Returns:    None
     """
-    logging.basicConfig(level=logging.INFO)
-    comparer = CompareYML(input_file1, input_file2)
+    if identical_inputs:
+        differences = {}
+        logging.info("The YAML input files are identical.")
+    else:
+        comparer = CompareYML(input_file1, input_file2)
 
-    try:
-        differences = comparer.convert_diff_to_dict()
-        if not differences:
-            logging.info("The YAML input files are identical.")
-    except Exception as e:
-        logging.error(f"Error occurred while generating input comparison report: {e}")
+        try:
+            differences = comparer.convert_diff_to_dict()
+            if not differences:
+                logging.info("The YAML input files are identical.")
+        except Exception as e:
+            logging.error(
+                f"Error occurred while generating input comparison report: {e}"
+            )
 
     export_to_json(
-        comparer.input_file1,
-        comparer.input_file2,
+        input_file1,
+        input_file2,
         differences,
         "yml_input_data.json",
         output_path,
         class_type,
+        compact_json=compact_json,
     )
 
 
@@ -1,27 +1,404 @@
-from http.server import SimpleHTTPRequestHandler, HTTPServer
+from concurrent.futures import ProcessPoolExecutor
+from http.server import SimpleHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+import argparse
+import json
+import logging
+import os
 import sys
+import threading
+import time
+import uuid
+
+# Seconds between checks of the log of a job whose status is streamed
+JOB_LOG_POLL_INTERVAL = 0.2
+
+# Name of the log file written to the output folder of each daemon job
+JOB_LOG_FILE = "pvaccompare.log"
 
 
 class CORSRequestHandler(SimpleHTTPRequestHandler):
     def end_headers(self):
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
-        self.send_header(
-            "Access-Control-Allow-Headers", "x-requested-with, content-type"
-        )
+        if self.allows_cross_origin():
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Allow-Methods", "GET")
+            self.send_header(
+                "Access-Control-Allow-Headers", "x-requested-with, content-type"
+            )
         self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
         self.send_header("Pragma", "no-cache")
         self.send_header("Expires", "0")
         super().end_headers()
 
+    def allows_cross_origin(self):
+        return True
+
+
+class DaemonRequestHandler(CORSRequestHandler):
+    """
+    Serves the reports like CORSRequestHandler, and takes comparison jobs:
+        POST /api/jobs                  queue a job, the body has the results_folder1
+                                        and results_folder2 and any other run.py options
+        GET  /api/jobs                  list the jobs
+        GET  /api/jobs/<id>             status of a job
+        GET  /api/jobs/<id>/events      stream the log lines and status of a job as JSON
+                                        lines until it finishes
+    Only the reports may be read from other origins. The jobs read any path the user can,
+    so the job endpoints send no CORS headers, only take JSON bodies, which a browser
+    sends from another origin only after a preflight that is refused, and only answer
+    requests addressed to localhost, so a page rebinding its own host name to this
+    server is refused too
+    """
+
+    daemon = None
+
+    def allows_cross_origin(self):
+        return not self.path.startswith("/api/")
+
+    def is_local_request(self):
+        """
+        Purpose:    Check that a request is addressed to this server on localhost
+        Modifies:   Nothing
+        Returns:    Boolean
+        """
+        port = self.server.server_address[1]
+        host = self.headers.get("Host", "")
+        return host in [f"{name}:{port}" for name in ["localhost", "127.0.0.1"]] or (
+            port == 80 and host in ["localhost", "127.0.0.1"]
+        )
+
+    def do_POST(self):
+        if not self.is_local_request():
+            self.send_json({"error": "Jobs are only taken on localhost"}, 403)
+            return
+        if self.path.rstrip("/") != "/api/jobs":
+            self.send_json({"error": f"Unknown endpoint {self.path}"}, 404)
+            return
+        if self.headers.get_content_type() != "application/json":
+            self.send_json({"error": "The job must be sent as application/json"}, 415)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = self.daemon.submit(request)
+        except ValueError as e:
+            self.send_json({"error": str(e)}, 400)
+            return
+        self.send_json(self.daemon.get_status(job), 202)
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts[:2] != ["api", "jobs"]:
+            super().do_GET()
+            return
+        if not self.is_local_request():
+            self.send_json({"error": "Jobs are only listed on localhost"}, 403)
+            return
+        if len(parts) == 2:
+            self.send_json(
+                [self.daemon.get_status(job) for job in self.daemon.get_jobs()]
+            )
+            return
+
+        job = self.daemon.get_job(parts[2])
+        if job is None:
+            self.send_json({"error": f"Unknown job {parts[2]}"}, 404)
+        elif len(parts) == 3:
+            self.send_json(self.daemon.get_status(job))
+        elif parts[3:] == ["events"]:
+            self.stream_events(job)
+        else:
+            self.send_json({"error": f"Unknown endpoint {self.path}"}, 404)
+
+    def send_json(self, data, code=200):
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self, job):
+        """
+        Purpose:    Stream the log lines of a job as they are written, then its final
+                    status, one JSON object per line
+        Modifies:   Nothing
+        Returns:    None
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        position = 0
+        while True:
+            # Read the status first, so every line written before the job finished is sent
+            status = self.daemon.get_status(job)
+            lines, position = read_new_lines(job["log_path"], position)
+            for line in lines:
+                self.write_event({"log": line})
+            if status["status"] in ("completed", "failed"):
+                self.write_event(status)
+                return
+            time.sleep(JOB_LOG_POLL_INTERVAL)
+
+    def write_event(self, event):
+        self.wfile.write(json.dumps(event).encode() + b"\n")
+        self.wfile.flush()
+
+
+class ComparisonDaemon:
+    """
+    Runs the comparison jobs sent to the server on a pool of worker processes that import
+    the comparison modules once, when they start. The jobs write inside output_dir and
+    share the table cache of cache_dir, both set when the server starts
+    """
+
+    def __init__(self, num_workers, output_dir="output", cache_dir=None):
+        self.output_dir = os.path.realpath(output_dir)
+        self.cache_dir = cache_dir
+        self.executor = ProcessPoolExecutor(
+            max_workers=num_workers, initializer=warm_up_worker
+        )
+        self.jobs = {}
+        self.lock = threading.Lock()
+        # Start every worker now, so the first jobs do not wait for their imports
+        for future in [self.executor.submit(time.sleep, 0) for _ in range(num_workers)]:
+            future.result()
+
+    def submit(self, request):
+        """
+        Purpose:    Check the options of a job and queue it, writing its log to its output
+                    folder
+        Modifies:   self.jobs
+        Returns:    Dictionary of the job
+        """
+        from run import prepare_results_folder
+
+        args = parse_job_request(request)
+        args.output_dir = get_job_output_dir(self.output_dir, request.get("output_dir"))
+        args.cache_dir = self.cache_dir
+        classes = [args.mhc_class] if args.mhc_class else ["1", "2"]
+        output_dir = prepare_results_folder(classes, args.output_dir)
+        log_path = os.path.join(output_dir, JOB_LOG_FILE)
+        open(log_path, "w").close()
+
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "request": request,
+            "output_dir": output_dir,
+            "log_path": log_path,
+            "submitted": time.time(),
+        }
+        with self.lock:
+            self.jobs[job["id"]] = job
+        job["future"] = self.executor.submit(run_daemon_job, args, output_dir, log_path)
+        return job
+
+    def get_job(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def get_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def get_status(self, job):
+        """
+        Purpose:    Describe the state of a job
+        Modifies:   Nothing
+        Returns:    Dictionary of the job status
+        """
+        future = job.get("future")
+        error = None
+        if future is None or not future.done():
+            status = "running" if future is not None and future.running() else "queued"
+        elif future.exception() is not None:
+            status = "failed"
+            error = str(future.exception())
+        else:
+            status = "completed"
+        return {
+            "id": job["id"],
+            "status": status,
+            "error": error,
+            "output_dir": job["output_dir"],
+            "request": job["request"],
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+def warm_up_worker():
+    # The comparisons are imported lazily, import them all with pandas, numpy, yaml and
+    # deepdiff before the first job
+    from compare_tools.comparison_router import RUNNERS, get_runner
+
+    for name in RUNNERS.values():
+        get_runner(name)
+
+
+def parse_job_request(request):
+    """
+    Purpose:    Turn the JSON body of a job into the arguments run.py would parse, so a job
+                runs with the same defaults and checks as the command line
+    Modifies:   Nothing
+    Returns:    The parsed arguments
+    """
+    from run import define_parser, validate_comparison_arguments
+
+    if not isinstance(request, dict):
+        raise ValueError("The job must be a JSON object of run.py options")
+    parser = define_parser()
+    # Only the options of run.py by their full name, so a key like "help" never exits and
+    # a key like "work" never stands for "workers". The table cache is set when the
+    # server starts, as loading a cached table can run code written to it
+    parser.allow_abbrev = False
+    options = {
+        action.dest
+        for action in parser._actions
+        if action.option_strings and action.dest not in ["help", "cache_dir"]
+    }
+    unknown = set(request) - options - {"results_folder1", "results_folder2"}
+    if unknown:
+        raise ValueError(f"Unknown job options: {', '.join(sorted(unknown))}")
+    if request.get("output_dir") is not None and not isinstance(
+        request["output_dir"], str
+    ):
+        raise ValueError("The output_dir of a job must be a path")
+
+    argv = []
+    for key in ["results_folder1", "results_folder2"]:
+        if not isinstance(request.get(key), str):
+            raise ValueError(f"The job needs the {key} path")
+        argv.append(request[key])
+    for key, value in request.items():
+        if (
+            key in ["results_folder1", "results_folder2"]
+            or value is None
+            or value is False
+        ):
+            continue
+        if value is True:
+            argv.append(f"--{key}")
+        elif isinstance(value, list):
+            argv += [f"--{key}", ",".join(map(str, value))]
+        else:
+            argv += [f"--{key}", str(value)]
+
+    def raise_error(message):
+        raise ValueError(message)
+
+    parser.error = raise_error
+    try:
+        args = parser.parse_args(argv)
+        validate_comparison_arguments(args, parser)
+    except SystemExit:
+        raise ValueError("The job options could not be parsed")
+    return args
+
+
+def get_job_output_dir(base_dir, output_dir):
+    """
+    Purpose:    Resolve the output folder of a job inside the output folder of the server
+    Modifies:   Nothing
+    Returns:    String of the output folder path
+    """
+    if not output_dir:
+        return base_dir
+    path = os.path.realpath(os.path.join(base_dir, output_dir))
+    if os.path.commonpath([base_dir, path]) != base_dir:
+        raise ValueError(f"The output_dir of a job must be inside {base_dir}")
+    return path
+
+
+def run_daemon_job(args, output_dir, log_path):
+    """
+    Purpose:    Run a job in a worker process exactly as run.py would, logging to the log
+                file of the job. Each worker runs one job at a time, so the logging set up
+                for a job never mixes with another job
+    Modifies:   Nothing
+    Returns:    None
+    """
+    from run import run_results_pair
+
+    root = logging.getLogger()
+    handlers = root.handlers
+    level = root.level
+    handler = logging.FileHandler(log_path)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    root.handlers = [handler]
+    root.setLevel(logging.DEBUG)
+    try:
+        run_results_pair(args, output_dir)
+    except Exception:
+        logging.exception("ERROR: The comparison job failed")
+        raise
+    finally:
+        handler.close()
+        root.handlers = handlers
+        root.setLevel(level)
+
+
+def read_new_lines(path, position):
+    """
+    Purpose:    Read the complete lines added to a file since position
+    Modifies:   Nothing
+    Returns:    List of the lines and the position after them
+    """
+    with open(path, "rb") as f:
+        f.seek(position)
+        text = f.read()
+    end = text.rfind(b"\n") + 1
+    lines = text[:end].decode(errors="replace").splitlines()
+    return lines, position + end
+
+
+def define_parser():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--port", type=int, default=8080, help="Port to serve on")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Also take comparison jobs at /api/jobs and run them on a pool of worker processes that stay warm between jobs",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Number of worker processes of the daemon, each running one job at a time",
+    )
+    parser.add_argument(
+        "--output_dir",
+        default="output",
+        help="Folder the daemon jobs write their results in, the output_dir of a job is a folder inside it",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        help="Directory of the table cache shared by the daemon jobs, it must not be writable by other users",
+    )
+    return parser
+
 
 if __name__ == "__main__":
-    PORT = 8080
-    server = HTTPServer(("localhost", PORT), CORSRequestHandler)
-    print(f"View reports at http://localhost:{PORT}/html_report/main.html")
+    args = define_parser().parse_args()
+    daemon = None
+    if args.daemon:
+        daemon = ComparisonDaemon(args.workers, args.output_dir, args.cache_dir)
+        DaemonRequestHandler.daemon = daemon
+        server = ThreadingHTTPServer(("localhost", args.port), DaemonRequestHandler)
+        print(f"Queue comparison jobs at http://localhost:{args.port}/api/jobs")
+    else:
+        server = HTTPServer(("localhost", args.port), CORSRequestHandler)
+    print(f"View reports at http://localhost:{args.port}/html_report/main.html")
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print("\nShutting down server.")
         server.server_close()
+        if daemon:
+            daemon.shutdown()
         sys.exit(0)
@@ -0,0 +1,1117 @@
+from comparisons import CompareAggregatedTSV, CompareReferenceMatchesTSV
+from comparisons import CompareUnaggregatedTSV
+from run_utils import *
+import pickle
+import tempfile
+
+# Rows parsed per chunk, and the number of rows each spilled partition aims for
+STREAMING_CHUNK_ROWS = 200000
+STREAMING_PARTITION_ROWS = 2000000
+
+# Width in bases of the start position bins that partitions are cut from
+STREAMING_BIN_SIZE = 1000000
+
+# Report label and ID columns of each TSV comparison, the aggregated IDs are read as is
+STREAMING_FILE_TYPES = {
+    "unaggregated": ("Unaggregated", CompareUnaggregatedTSV.id_columns),
+    "aggregated": ("Aggregated", None),
+    "reference_matches": ("Reference Matches", CompareReferenceMatchesTSV.id_columns),
+}
+
+
+def use_streaming_engine(
+    input_file1,
+    input_file2,
+    streaming=False,
+    min_size=STREAMING_MIN_SIZE,
+    hashed_ids=False,
+    table_cache=None,
+    prefetcher=None,
+):
+    """
+    Purpose:    Decide if a TSV comparison runs on the streaming engine, when requested or
+                when an input is at least min_size GB, judging compressed inputs by their
+                estimated size once decompressed. A min_size of 0 never switches engines.
+                Logs the switch and the options of the run the streaming engine ignores
+    Modifies:   Nothing
+    Returns:    Boolean
+    """
+    if not streaming:
+        if not min_size or max(
+            get_uncompressed_size(input_file1), get_uncompressed_size(input_file2)
+        ) < (min_size * 1024**3):
+            return False
+        logging.info(
+            "\u2022 Inputs are over %g GB, comparing them with the streaming engine, "
+            "set --streaming_min_size to change the size or 0 to keep them in memory",
+            min_size,
+        )
+
+    ignored = []
+    if hashed_ids:
+        ignored.append("--hashed_ids")
+    if table_cache is not None:
+        ignored.append("the table cache")
+    if prefetcher is not None and prefetcher.max_size > 0:
+        ignored.append("the inputs read ahead")
+    if ignored:
+        logging.info("\u2022 The streaming engine does not use %s", ", ".join(ignored))
+    return True
+
+
+def stream_compare_tsv_files(
+    file_type,
+    input_file1,
+    input_file2,
+    columns_to_compare,
+    output_path,
+    class_type,
+    filename,
+    id_format,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
+    summary_only=False,
+    max_differences=None,
+    chunk_rows=STREAMING_CHUNK_ROWS,
+    partition_rows=STREAMING_PARTITION_ROWS,
+):
+    """
+    Purpose:    Compare two TSV files in chunks with bounded memory. Both files are cut
+                into blocks of whole loci in sort order, straight from the files when they
+                are already sorted and from spilled partitions otherwise, and each block
+                goes through the in-memory pipeline with its results spooled to disk
+    Modifies:   Nothing
+    Returns:    None
+    """
+    label, id_columns, projected_columns, replaced_id, id_format = get_streamed_ids(
+        file_type, input_file1, input_file2, id_format
+    )
+    key_kind = "replaced" if replaced_id else "genomic"
+    scan1 = scan_tsv_file(
+        input_file1, projected_columns, columns_to_compare, key_kind, chunk_rows, 1
+    )
+    scan2 = scan_tsv_file(
+        input_file2, projected_columns, columns_to_compare, key_kind, chunk_rows, 2
+    )
+    run_notes, columns_to_compare = get_streamed_run_notes(
+        scan1["columns"], scan2["columns"], columns_to_compare, replaced_id
+    )
+
+    with tempfile.TemporaryDirectory(prefix="pvaccompare-") as spool_dir:
+        chunks1 = read_tsv_chunks(input_file1, scan1, chunk_rows)
+        chunks2 = read_tsv_chunks(input_file2, scan2, chunk_rows)
+        if key_kind == "genomic" and scan1["sorted"] and scan2["sorted"]:
+            logging.debug("Both files are sorted, merging them without spilling")
+            ranks = get_chromosome_ranks(scan1["chromosomes"] | scan2["chromosomes"])
+            blocks = get_sorted_blocks(
+                add_chunk_sort_keys(chunks1, ranks),
+                add_chunk_sort_keys(chunks2, ranks),
+                get_empty_chunk(input_file1, scan1),
+                get_empty_chunk(input_file2, scan2),
+            )
+        else:
+            blocks = get_partition_blocks(
+                chunks1,
+                chunks2,
+                get_empty_chunk(input_file1, scan1),
+                get_empty_chunk(input_file2, scan2),
+                get_partition_plan(scan1, scan2, key_kind, partition_rows),
+                spool_dir,
+            )
+
+        results = compare_blocks(
+            blocks,
+            file_type,
+            id_columns,
+            replaced_id,
+            columns_to_compare,
+            spool_dir,
+            summary_only,
+            max_differences,
+        )
+        report_streamed_results(
+            label,
+            input_file1,
+            input_file2,
+            filename,
+            output_path,
+            class_type,
+            id_format,
+            run_notes,
+            results,
+            spool_dir,
+            compact_json,
+            shard_differences,
+            columnar_differences,
+            summary_only,
+        )
+
+
+def get_streamed_ids(file_type, input_file1, input_file2, id_format):
+    """
+    Purpose:    Work out how the variants of a chunked comparison are identified, replacing
+                missing aggregated IDs with Gene and AA Change like CompareAggregatedTSV
+    Modifies:   Nothing
+    Returns:    The report label, the ID columns, the columns to read them from, whether
+                the IDs are replaced, and the ID format
+    """
+    label, id_columns = STREAMING_FILE_TYPES[file_type]
+    if file_type != "aggregated":
+        return label, id_columns, id_columns, False, id_format
+
+    replacement_columns = CompareAggregatedTSV.ID_replacement_cols
+    headers = [get_canonical_header(input_file1), get_canonical_header(input_file2)]
+    if all("ID" in header for header in headers):
+        return label, id_columns, ["ID"] + replacement_columns, False, id_format
+    if not all(col in header for header in headers for col in replacement_columns):
+        raise Exception(
+            "Error comparing files: no ID or Gene and AA Change columns to "
+            "identify variants by"
+        )
+    return label, id_columns, ["ID"] + replacement_columns, True, "Gene (AA_Change)"
+
+
+def get_streamed_run_notes(columns1, columns2, columns_to_compare, replaced_id):
+    """
+    Purpose:    Find the run notes and the columns to compare from the columns read from
+                each file
+    Modifies:   Nothing
+    Returns:    List of run notes and the list of columns to compare
+    """
+    columns1 = list(columns1)
+    columns2 = list(columns2)
+    if replaced_id:
+        logging.info("\u2022 Replaced ID with Gene and AA Change")
+        replacement_columns = CompareAggregatedTSV.ID_replacement_cols
+        columns1 = [col for col in columns1 if col not in replacement_columns]
+        columns2 = [col for col in columns2 if col not in replacement_columns]
+    df1 = pd.DataFrame(columns=columns1)
+    df2 = pd.DataFrame(columns=columns2)
+    run_notes = find_dropped_cols(df1, df2, columns_to_compare)
+    if replaced_id:
+        run_notes.append("Replaced ID with Gene and AA Change")
+    return run_notes, check_columns_to_compare(df1, df2, columns_to_compare)
+
+
+def report_streamed_results(
+    label,
+    input_file1,
+    input_file2,
+    filename,
+    output_path,
+    class_type,
+    id_format,
+    run_notes,
+    results,
+    spool_dir,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
+    summary_only=False,
+):
+    """
+    Purpose:    Log the outcome of a chunked comparison and write its report JSON
+    Modifies:   run_notes
+    Returns:    None
+    """
+    if (
+        not results["num_unique"][0]
+        and not results["num_unique"][1]
+        and not results["duplicate_ids"]
+        and not results["num_differences"]
+    ):
+        logging.info("The %s TSV files are identical.", label)
+    if results["duplicate_ids"]:
+        note = get_duplicate_ids_note(
+            results["max_hits"][0] > 1, results["max_hits"][1] > 1
+        )
+        logging.error(note)
+        run_notes.append(note)
+
+    if summary_only:
+        num_unique_file1, num_unique_file2 = results["num_unique"]
+        export_summary_json(
+            input_file1,
+            input_file2,
+            filename,
+            output_path,
+            class_type,
+            id_format,
+            get_summary_data(
+                run_notes,
+                results["num_common"] + num_unique_file1 + num_unique_file2,
+                results["num_common"],
+                num_unique_file1,
+                num_unique_file2,
+                results["num_differences"],
+            ),
+            compact_json,
+        )
+        return
+
+    export_streamed_json(
+        input_file1,
+        input_file2,
+        filename,
+        output_path,
+        class_type,
+        id_format,
+        run_notes,
+        results,
+        spool_dir,
+        compact_json,
+        shard_differences,
+        columnar_differences,
+    )
+
+
+def get_canonical_header(input_file):
+    """
+    Purpose:    Read the column names of a TSV file as check_column_formatting names them
+    Modifies:   Nothing
+    Returns:    List of column names
+    """
+    header = pd.read_csv(input_file, sep="\t", nrows=0).columns
+    return [get_canonical_column(col) for col in header]
+
+
+def scan_tsv_file(
+    input_file, id_columns, columns_to_compare, key_kind, chunk_rows, file_number
+):
+    """
+    Purpose:    Read a TSV file once in chunks to find the dtypes its columns get when the
+                whole file is parsed, whether its rows are sorted, and how its rows spread
+                over the loci or genes that partitions are cut from
+    Modifies:   Nothing
+    Returns:    Dictionary of the scan results
+    """
+    header = pd.read_csv(input_file, sep="\t", nrows=0).columns
+    usecols, dtypes = get_projected_columns(header, id_columns, columns_to_compare)
+    # Categories would differ between chunks, the ID columns are read as strings
+    dtypes = {col: str for col in dtypes}
+    renames = {}
+    for col in usecols:
+        key = get_canonical_column(col)
+        if key != col:
+            logging.info(
+                "\u2022 Renamed '%s' to '%s' in file %d", col, key, file_number
+            )
+            renames[col] = key
+
+    kinds = {col: set() for col in usecols if col not in dtypes}
+    scan = {
+        "usecols": usecols,
+        "columns": [renames.get(col, col) for col in usecols],
+        "renames": renames,
+        "sorted": True,
+        "chromosomes": set(),
+        "counts": {},
+        "num_rows": 0,
+    }
+    last_key = None
+    for chunk in read_csv_chunks(
+        input_file,
+        usecols=usecols,
+        dtype=dtypes,
+        chunksize=chunk_rows,
+        low_memory=False,
+    ):
+        for col in kinds:
+            kinds[col].add(get_dtype_kind(chunk[col]))
+        chunk = chunk.rename(columns=renames)
+        scan["num_rows"] += len(chunk)
+
+        if key_kind == "replaced":
+            genes = split_replaced_ids(
+                build_replaced_id_column(
+                    chunk, CompareAggregatedTSV.ID_replacement_cols
+                ),
+                log_errors=False,
+            )[0]
+            add_counts(scan["counts"], pd.Series(genes).value_counts())
+            continue
+
+        chromosome, start, stop = get_locus_parts(chunk)
+        names = pd.unique(chromosome[~pd.isna(chromosome)])
+        scan["chromosomes"].update(names)
+        unmatched = pd.isna(chromosome) | np.isnan(start) | np.isnan(stop)
+        loci = pd.DataFrame(
+            {
+                "chromosome": chromosome[~unmatched],
+                "bin": start[~unmatched].astype(np.int64) // STREAMING_BIN_SIZE,
+            }
+        )
+        add_counts(scan["counts"], loci.value_counts())
+        if unmatched.any():
+            add_counts(scan["counts"], {(None, 0): int(unmatched.sum())})
+
+        if scan["sorted"] and len(chunk):
+            keys = get_genomic_sort_keys(
+                chromosome, start, stop, get_chromosome_ranks(names)
+            )
+            first_key = get_locus_order(chromosome, keys, 0)
+            scan["sorted"] = is_sorted(*keys) and (
+                last_key is None or last_key <= first_key
+            )
+            last_key = get_locus_order(chromosome, keys, -1)
+
+    scan["convert_dtypes"], str_columns = get_unified_dtypes(kinds)
+    scan["read_dtypes"] = {**dtypes, **{col: str for col in str_columns}}
+    return scan
+
+
+def read_csv_chunks(input_file, **kwargs):
+    """
+    Purpose:    Read a TSV file in chunks, decompressing a compressed file on a background
+                thread while its chunks are parsed
+    Modifies:   Nothing
+    Returns:    Generator of dataframes
+    """
+    with open_tsv_source(input_file) as source:
+        yield from pd.read_csv(source, sep="\t", **kwargs)
+
+
+def get_dtype_kind(series):
+    """
+    Purpose:    Classify the dtype pandas inferred for a column of one chunk
+    Modifies:   Nothing
+    Returns:    String of the dtype kind
+    """
+    if series.dtype == np.int64:
+        return "int"
+    if series.dtype == np.float64:
+        return "nan" if series.isna().all() else "float"
+    if series.dtype == bool:
+        return "bool"
+    if series.dtype == object:
+        if series.isna().all():
+            return "nan"
+        if pd.api.types.infer_dtype(series, skipna=True) == "boolean":
+            return "objbool"
+    return "text"
+
+
+def get_unified_dtypes(kinds):
+    """
+    Purpose:    Work out the dtype each column gets when the whole file is parsed at once
+                from the dtypes of its chunks
+    Modifies:   Nothing
+    Returns:    Dictionary of the dtypes to convert chunks to, and a list of the columns
+                that have to be read as strings
+    """
+    convert_dtypes = {}
+    str_columns = []
+    for col, col_kinds in kinds.items():
+        values = col_kinds - {"nan"}
+        if values == {"int"} and "nan" not in col_kinds:
+            convert_dtypes[col] = np.int64
+        elif values <= {"int", "float"}:
+            # Integers with missing values, and columns of only missing values, are floats
+            convert_dtypes[col] = np.float64
+        elif values == {"bool"} and "nan" not in col_kinds:
+            convert_dtypes[col] = bool
+        elif values <= {"bool", "objbool"}:
+            convert_dtypes[col] = object
+        else:
+            # Numbers next to text stay as they were written
+            str_columns.append(col)
+    return convert_dtypes, str_columns
+
+
+def add_counts(counts, new_counts):
+    """
+    Purpose:    Add the row counts of a chunk to the counts of the file
+    Modifies:   counts
+    Returns:    None
+    """
+    for key, count in new_counts.items():
+        counts[key] = counts.get(key, 0) + int(count)
+
+
+def get_locus_order(chromosome, keys, row):
+    """
+    Purpose:    Get a key that orders a row's locus against loci of other chunks
+    Modifies:   Nothing
+    Returns:    Tuple to compare on
+    """
+    _, start, stop = (int(key[row]) for key in keys)
+    if start < 0:
+        return (3,), start, stop
+    return get_karyotype_key(chromosome[row]), start, stop
+
+
+def is_sorted(rank, start, stop):
+    """
+    Purpose:    Check if integer sort keys never decrease
+    Modifies:   Nothing
+    Returns:    Boolean
+    """
+    rank_step = np.diff(rank)
+    start_step = np.diff(start)
+    stop_step = np.diff(stop)
+    return bool(
+        (
+            (rank_step > 0)
+            | (
+                (rank_step == 0)
+                & ((start_step > 0) | ((start_step == 0) & (stop_step >= 0)))
+            )
+        ).all()
+    )
+
+
+def read_tsv_chunks(input_file, scan, chunk_rows):
+    """
+    Purpose:    Read a TSV file in chunks with the dtypes found by the scan and with line
+                numbers matching add_line_numbers
+    Modifies:   Nothing
+    Returns:    Generator of dataframes
+    """
+    line = 2
+    for chunk in read_csv_chunks(
+        input_file,
+        usecols=scan["usecols"],
+        dtype=scan["read_dtypes"],
+        chunksize=chunk_rows,
+        low_memory=False,
+    ):
+        for col, dtype in scan["convert_dtypes"].items():
+            chunk[col] = chunk[col].astype(dtype)
+        chunk = chunk.rename(columns=scan["renames"])
+        chunk["line"] = np.arange(line, line + len(chunk))
+        line += len(chunk)
+        yield chunk
+
+
+def get_empty_chunk(input_file, scan):
+    """
+    Purpose:    Get a chunk without rows with the columns and dtypes of a file's chunks
+    Modifies:   Nothing
+    Returns:    Dataframe
+    """
+    chunk = pd.read_csv(
+        input_file,
+        sep="\t",
+        usecols=scan["usecols"],
+        dtype=scan["read_dtypes"],
+        nrows=0,
+    )
+    for col, dtype in scan["convert_dtypes"].items():
+        chunk[col] = chunk[col].astype(dtype)
+    chunk = chunk.rename(columns=scan["renames"])
+    chunk["line"] = np.arange(0)
+    return chunk
+
+
+def add_chunk_sort_keys(chunks, ranks):
+    """
+    Purpose:    Add the genomic sort keys to each chunk, ranking chromosomes over both files
+    Modifies:   The chunks
+    Returns:    Generator of dataframes
+    """
+    for chunk in chunks:
+        keys = get_genomic_sort_keys(*get_locus_parts(chunk), ranks)
+        for col, values in zip(GENOMIC_SORT_COLUMNS, keys):
+            chunk[col] = values
+        yield chunk
+
+
+def get_sorted_blocks(chunks1, chunks2, empty1, empty2):
+    """
+    Purpose:    Merge two streams of sorted chunks into blocks holding whole loci of both
+                files, cutting each block before the last locus read from either stream
+    Modifies:   Nothing
+    Returns:    Generator of dataframe pairs
+    """
+    streams = [chunks1, chunks2]
+    buffers = [empty1, empty2]
+    done = [False, False]
+
+    def read_next(i):
+        chunk = next(streams[i], None)
+        if chunk is None:
+            done[i] = True
+        elif len(buffers[i]):
+            buffers[i] = pd.concat([buffers[i], chunk], ignore_index=True)
+        else:
+            buffers[i] = chunk
+
+    def last_key(i):
+        return tuple(buffers[i][GENOMIC_SORT_COLUMNS].iloc[-1])
+
+    while True:
+        for i in range(2):
+            while not done[i] and not len(buffers[i]):
+                read_next(i)
+        if all(done):
+            break
+
+        # Rows before the smallest last key are complete in both buffers
+        cut_key = min(last_key(i) for i in range(2) if not done[i])
+        blocks = []
+        for i in range(2):
+            num_rows = int(count_keys_before(buffers[i], cut_key))
+            blocks.append(buffers[i].iloc[:num_rows].reset_index(drop=True))
+            buffers[i] = buffers[i].iloc[num_rows:].reset_index(drop=True)
+        if len(blocks[0]) or len(blocks[1]):
+            yield blocks
+        for i in range(2):
+            if not done[i] and last_key(i) == cut_key:
+                read_next(i)
+
+    if len(buffers[0]) or len(buffers[1]):
+        yield buffers
+
+
+def count_keys_before(df, key):
+    """
+    Purpose:    Count the rows of a sorted dataframe whose sort keys come before a key
+    Modifies:   Nothing
+    Returns:    Integer
+    """
+    rank, start, stop = (df[col].to_numpy() for col in GENOMIC_SORT_COLUMNS)
+    return (
+        (rank < key[0])
+        | (
+            (rank == key[0])
+            & ((start < key[1]) | ((start == key[1]) & (stop < key[2])))
+        )
+    ).sum()
+
+
+def get_partition_plan(scan1, scan2, key_kind, partition_rows):
+    """
+    Purpose:    Cut the loci, or the genes of replaced IDs, into ranges in sort order that
+                hold about partition_rows rows of both files together
+    Modifies:   Nothing
+    Returns:    Dictionary of the partition boundaries and how to key rows against them
+    """
+    counts = dict(scan1["counts"])
+    add_counts(counts, scan2["counts"])
+
+    if key_kind == "replaced":
+        keys = sorted(counts)
+        codes = keys
+        ranks = None
+        num_bins = None
+    else:
+        ranks = get_chromosome_ranks(scan1["chromosomes"] | scan2["chromosomes"])
+        num_bins = max([bin_number for _, bin_number in counts] + [0]) + 1
+        keys = list(counts)
+        codes = [
+            (len(ranks) if name is None else ranks[name]) * num_bins + bin_number
+            for name, bin_number in keys
+        ]
+        keys = [key for _, key in sorted(zip(codes, keys))]
+        codes = sorted(codes)
+
+    boundaries = []
+    rows = 0
+    for code, key in zip(codes, keys):
+        if not boundaries or (rows and rows + counts[key] > partition_rows):
+            boundaries.append(code)
+            rows = 0
+        rows += counts[key]
+    logging.debug("Spilling both files to %d partitions", len(boundaries))
+
+    return {
+        "key_kind": key_kind,
+        "boundaries": np.array(boundaries, dtype=object if ranks is None else np.int64),
+        "ranks": ranks,
+        "num_bins": num_bins,
+    }
+
+
+def get_partitions(chunk, plan):
+    """
+    Purpose:    Find the partition of each row of a chunk
+    Modifies:   Nothing
+    Returns:    Integer array of partition numbers
+    """
+    if plan["key_kind"] == "replaced":
+        codes = split_replaced_ids(
+            build_replaced_id_column(chunk, CompareAggregatedTSV.ID_replacement_cols),
+            log_errors=False,
+        )[0]
+    else:
+        chromosome, start, stop = get_locus_parts(chunk)
+        rank, start, _ = get_genomic_sort_keys(chromosome, start, stop, plan["ranks"])
+        unmatched = start < 0
+        codes = np.where(
+            unmatched,
+            len(plan["ranks"]) * plan["num_bins"],
+            rank * plan["num_bins"] + np.maximum(start, 0) // STREAMING_BIN_SIZE,
+        )
+    return np.searchsorted(plan["boundaries"], codes, side="right") - 1
+
+
+def get_partition_blocks(chunks1, chunks2, empty1, empty2, plan, spool_dir):
+    """
+    Purpose:    Spill the chunks of both files to partition files, then load the partitions
+                in order as blocks
+    Modifies:   Nothing
+    Returns:    Generator of dataframe pairs
+    """
+    for file_number, chunks in [(1, chunks1), (2, chunks2)]:
+        for chunk in chunks:
+            for partition, rows in chunk.groupby(get_partitions(chunk, plan)):
+                append_to_spool(
+                    get_partition_path(spool_dir, partition, file_number), rows
+                )
+
+    for partition in range(len(plan["boundaries"])):
+        blocks = []
+        for file_number, empty in [(1, empty1), (2, empty2)]:
+            path = get_partition_path(spool_dir, partition, file_number)
+            frames = list(read_spool(path))
+            blocks.append(
+                pd.concat(frames, ignore_index=True) if frames else empty.copy()
+            )
+            if frames:
+                os.remove(path)
+        yield blocks
+
+
+def get_partition_path(spool_dir, partition, file_number):
+    return os.path.join(spool_dir, f"partition{partition}_file{file_number}.pkl")
+
+
+def append_to_spool(path, values):
+    """
+    Purpose:    Append a pickled value to a spool file
+    Modifies:   The spool file
+    Returns:    None
+    """
+    with open(path, "ab") as f:
+        pickle.dump(values, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_spool(path):
+    """
+    Purpose:    Read back the values appended to a spool file
+    Modifies:   Nothing
+    Returns:    Generator of the values in the order they were appended
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def compare_blocks(
+    blocks,
+    file_type,
+    id_columns,
+    replaced_id,
+    columns_to_compare,
+    spool_dir,
+    summary_only=False,
+    max_differences=None,
+):
+    """
+    Purpose:    Run each block through the in-memory pipeline, spooling the unique
+                variants, hits and differences in order, or only counting them when
+                summary only
+    Modifies:   Nothing
+    Returns:    Dictionary of the counts found, with the spool files in spool_dir
+    """
+    results = get_empty_results(columns_to_compare, max_differences)
+    for df1, df2 in blocks:
+        add_block_results(
+            results,
+            compare_block(
+                df1,
+                df2,
+                file_type,
+                id_columns,
+                replaced_id,
+                columns_to_compare,
+                not results["duplicate_ids"],
+                summary_only,
+                max_differences,
+            ),
+            spool_dir,
+        )
+    return finish_results(results, spool_dir)
+
+
+def compare_block(
+    df1,
+    df2,
+    file_type,
+    id_columns,
+    replaced_id,
+    columns_to_compare,
+    compare_differences=True,
+    summary_only=False,
+    max_differences=None,
+):
+    """
+    Purpose:    Run one block of whole loci of both files through the in-memory pipeline,
+                only counting the variants and differences when summary only
+    Modifies:   df1 and df2
+    Returns:    Dictionary of the block's variants, hits and differences
+    """
+    create_block_ids(df1, df2, file_type, id_columns, replaced_id, not summary_only)
+
+    block_results = {
+        "num_common": 0,
+        "num_unique": [0, 0],
+        "unique": [[], []],
+        "max_hits": [0, 0],
+        "hits": [[], []],
+        "num_differences": {},
+        "differences": {},
+        "variant_index": None,
+        "truncation": None,
+    }
+    if summary_only:
+        (
+            block_results["num_common"],
+            block_results["num_unique"][0],
+            block_results["num_unique"][1],
+            aligned_rows,
+        ) = count_variants(df1, df2)
+    else:
+        (
+            common_variants,
+            unique_variants_file1,
+            unique_variants_file2,
+            aligned_rows,
+        ) = align_variants(df1, df2)
+        block_results["num_common"] = len(common_variants)
+        block_results["num_unique"] = [
+            len(unique_variants_file1),
+            len(unique_variants_file2),
+        ]
+        block_results["unique"] = [unique_variants_file1, unique_variants_file2]
+
+    if file_type == "reference_matches":
+        for i, df in enumerate([df1, df2]):
+            if len(df):
+                block_results["max_hits"][i] = int(df["ID"].value_counts().max())
+                if not summary_only:
+                    block_results["hits"][i] = list(get_id_counts(df).items())
+        if max(block_results["max_hits"]) > 1:
+            compare_differences = False
+
+    if compare_differences and summary_only:
+        block_results["num_differences"] = count_file_differences(
+            df1, df2, columns_to_compare, aligned_rows
+        )
+    elif compare_differences:
+        (
+            differences,
+            block_results["variant_index"],
+            block_results["truncation"],
+        ) = get_file_differences(
+            df1,
+            df2,
+            columns_to_compare,
+            aligned_rows=aligned_rows,
+            max_differences=max_differences,
+        )
+        block_results["differences"] = {
+            col: [get_section_entry(col, entry) for entry in records]
+            for col, records in differences.items()
+        }
+        block_results["num_differences"] = {
+            col: (
+                block_results["truncation"][col]["num_differences"]
+                if block_results["truncation"]
+                else len(records)
+            )
+            for col, records in differences.items()
+        }
+    return block_results
+
+
+def get_empty_results(columns_to_compare, max_differences=None):
+    return {
+        "num_common": 0,
+        "num_unique": [0, 0],
+        "num_differences": {},
+        "num_spooled": {},
+        "selections": {},
+        "max_differences": max_differences,
+        "max_hits": [0, 0],
+        "duplicate_ids": False,
+        "columns_to_compare": columns_to_compare,
+    }
+
+
+def add_block_results(results, block_results, spool_dir):
+    """
+    Purpose:    Add the counts of a block to the results and spool its unique variants,
+                hits and differences after those of the blocks before it
+    Modifies:   results and the spool files in spool_dir
+    Returns:    None
+    """
+    results["num_common"] += block_results["num_common"]
+    for i, unique_variants in enumerate(block_results["unique"]):
+        results["num_unique"][i] += block_results["num_unique"][i]
+        if unique_variants:
+            append_to_spool(
+                os.path.join(spool_dir, f"unique_file{i + 1}.pkl"), unique_variants
+            )
+    for i, hits in enumerate(block_results["hits"]):
+        results["max_hits"][i] = max(
+            results["max_hits"][i], block_results["max_hits"][i]
+        )
+        if hits:
+            append_to_spool(os.path.join(spool_dir, f"hits_file{i + 1}.pkl"), hits)
+    results["duplicate_ids"] = max(results["max_hits"]) > 1
+    if results["duplicate_ids"]:
+        return
+
+    columns_to_compare = results["columns_to_compare"]
+    variant_index = block_results["variant_index"]
+    if variant_index is not None and len(variant_index["ids"]):
+        # Positions in the block's differences move after the differences of the blocks
+        # before it
+        offsets = np.array(
+            [results["num_spooled"].get(col, 0) for col in columns_to_compare],
+            dtype=np.int64,
+        )
+        entry = variant_index["entry"]
+        append_to_spool(
+            os.path.join(spool_dir, "variant_index.pkl"),
+            {
+                "ids": variant_index["ids"],
+                "num_differences": variant_index["num_differences"],
+                "column": variant_index["column"],
+                # Differences the block did not keep stay at -1
+                "entry": np.where(
+                    entry < 0, entry, entry + offsets[variant_index["column"]]
+                ),
+            },
+        )
+    for col, num_differences in block_results["num_differences"].items():
+        results["num_differences"][col] = (
+            results["num_differences"].get(col, 0) + num_differences
+        )
+    for col, entries in block_results["differences"].items():
+        results["num_spooled"][col] = results["num_spooled"].get(col, 0) + len(entries)
+        append_to_spool(
+            get_differences_path(spool_dir, columns_to_compare, col), entries
+        )
+    for col, truncation in (block_results["truncation"] or {}).items():
+        results["selections"][col] = truncation["selection"]
+        append_to_spool(
+            get_scores_path(spool_dir, columns_to_compare, col), truncation["scores"]
+        )
+
+
+def finish_results(results, spool_dir):
+    """
+    Purpose:    Put the difference counts in the order the columns were compared, and drop
+                them when the files have duplicate IDs. The differences of a column kept
+                by the blocks are truncated again to the ones kept over the whole file
+    Modifies:   results
+    Returns:    The results
+    """
+    results["num_differences"] = {
+        col: results["num_differences"][col]
+        for col in results["columns_to_compare"]
+        if col in results["num_differences"]
+    }
+    if results["duplicate_ids"]:
+        results["num_differences"] = {}
+
+    # Each block keeps at least the differences the whole file keeps, in file order,
+    # so picking from the differences the blocks kept gives the same differences
+    results["kept"] = {}
+    results["kept_positions"] = {}
+    results["num_shown"] = {}
+    max_differences = results["max_differences"]
+    for col in results["num_differences"]:
+        num_spooled = results["num_spooled"].get(col, 0)
+        results["num_shown"][col] = num_spooled
+        if max_differences is None or num_spooled <= max_differences:
+            continue
+        scores = np.concatenate(
+            list(
+                read_spool(
+                    get_scores_path(spool_dir, results["columns_to_compare"], col)
+                )
+            )
+        )
+        kept = np.zeros(num_spooled, dtype=bool)
+        kept[select_differences(scores, max_differences)] = True
+        results["kept"][col] = kept
+        results["kept_positions"][col] = np.cumsum(kept) - 1
+        results["num_shown"][col] = max_differences
+    return results
+
+
+def create_block_ids(df1, df2, file_type, id_columns, replaced_id, sort_keys=True):
+    """
+    Purpose:    Build the IDs and sort keys of a block the way the comparison classes do
+    Modifies:   df1 and df2
+    Returns:    None
+    """
+    if file_type == "aggregated":
+        if replaced_id:
+            replacement_columns = CompareAggregatedTSV.ID_replacement_cols
+            for df in [df1, df2]:
+                df["ID"] = build_replaced_id_column(df, replacement_columns)
+                df.drop(columns=replacement_columns, inplace=True)
+        if sort_keys:
+            add_sort_keys(df1, df2, not replaced_id)
+        return
+
+    if sort_keys:
+        add_sort_keys(df1, df2)
+    for df in [df1, df2]:
+        df["ID"] = build_id_column(df, id_columns)
+        df.drop(columns=id_columns, inplace=True)
+
+
+def get_differences_path(spool_dir, columns_to_compare, col):
+    # Column names can hold characters that do not belong in file names
+    return os.path.join(spool_dir, f"differences{columns_to_compare.index(col)}.pkl")
+
+
+def get_scores_path(spool_dir, columns_to_compare, col):
+    return os.path.join(spool_dir, f"scores{columns_to_compare.index(col)}.pkl")
+
+
+def get_spooled_differences(spool_dir, results, col):
+    kept = results["kept"].get(col)
+    position = 0
+    for entries in read_spool(
+        get_differences_path(spool_dir, results["columns_to_compare"], col)
+    ):
+        if kept is None:
+            yield from entries
+        else:
+            for i in np.flatnonzero(kept[position : position + len(entries)]):
+                yield entries[i]
+        position += len(entries)
+
+
+def get_spooled_index_values(spool_dir, results, field):
+    for block_index in read_spool(os.path.join(spool_dir, "variant_index.pkl")):
+        if results["kept"]:
+            block_index = get_kept_index(block_index, results)
+        yield from block_index[field].tolist()
+
+
+def get_kept_index(block_index, results):
+    """
+    Purpose:    Point the differences of a block's variant index at their positions among
+                the differences kept over the whole file, marking the ones truncation
+                left out with -1
+    Modifies:   Nothing
+    Returns:    Dictionary of the block's variant index
+    """
+    column = block_index["column"]
+    entry = block_index["entry"].copy()
+    for i, col in enumerate(results["columns_to_compare"]):
+        if col in results["kept"]:
+            in_column = np.flatnonzero((column == i) & (entry >= 0))
+            spooled = entry[in_column]
+            entry[in_column] = np.where(
+                results["kept"][col][spooled],
+                results["kept_positions"][col][spooled],
+                -1,
+            )
+    return dict(block_index, entry=entry)
+
+
+def export_streamed_json(
+    input_file1,
+    input_file2,
+    filename,
+    output_path,
+    class_type,
+    id_format,
+    run_notes,
+    results,
+    spool_dir,
+    compact_json=False,
+    shard_differences=False,
+    columnar_differences=False,
+):
+    """
+    Purpose:    Write the report JSON of a streamed comparison from its spool files, in the
+                same layout export_to_json writes
+    Modifies:   Nothing
+    Returns:    None
+    """
+    num_unique_file1, num_unique_file2 = results["num_unique"]
+    summary_data = get_summary_data(
+        run_notes,
+        results["num_common"] + num_unique_file1 + num_unique_file2,
+        results["num_common"],
+        num_unique_file1,
+        num_unique_file2,
+        results["num_differences"],
+    )
+
+    differences = {
+        col: StreamedDict(
+            get_difference_sections(
+                get_spooled_differences(spool_dir, results, col),
+                results["num_shown"][col],
+            )
+        )
+        for col in results["num_differences"]
+    }
+
+    if results["duplicate_ids"]:
+        variant_data = {
+            f"Hits in File {i}": StreamedDict(
+                pair
+                for pairs in read_spool(os.path.join(spool_dir, f"hits_file{i}.pkl"))
+                for pair in pairs
+            )
+            for i in [1, 2]
+        }
+    else:
+        variant_data = {
+            f"Variants Unique to File {i}": (
+                variant
+                for variants in read_spool(
+                    os.path.join(spool_dir, f"unique_file{i}.pkl")
+                )
+                for variant in variants
+            )
+            for i in [1, 2]
+        }
+
+    data = {
+        "mhc_class": class_type,
+        "input_file1": input_file1,
+        "input_file2": input_file2,
+        "id_format": id_format,
+        "summary": summary_data,
+        "differences": differences,
+        "variants": variant_data,
+    }
+    truncated_differences = get_truncated_differences(
+        results["num_differences"], results["num_shown"], results["selections"]
+    )
+    if truncated_differences:
+        data["truncated_differences"] = truncated_differences
+    if not results["duplicate_ids"]:
+        data["variant_index"] = get_variant_index_data(
+            results["columns_to_compare"],
+            *(
+                get_spooled_index_values(spool_dir, results, field)
+                for field in ["ids", "num_differences", "column", "entry"]
+            ),
+        )
+
+    write_report_json(
+        f"{output_path}/{filename}",
+        data,
+        compact_json,
+        shard_differences,
+        columnar_differences,
+    )
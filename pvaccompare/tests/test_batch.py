@@ -0,0 +1,111 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+from batch import *
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_batch.py
+# python -m unittest discover -s tests
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for i in [1, 2]:
+            folder = os.path.join(self.temp_dir.name, f"results{i}", "MHC_Class_I")
+            os.makedirs(os.path.join(folder, "log"))
+            for source, target in [
+                (f"yml_input{i}.yml", "log/inputs.yml"),
+                (f"aggregated_input{i}.tsv", "sample.all_epitopes.aggregated.tsv"),
+                (f"unaggregated_input{i}.tsv", "sample.all_epitopes.tsv"),
+            ]:
+                shutil.copy(f"tests/test_data/{source}", os.path.join(folder, target))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_manifest(self, name, text):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_load_manifest(self):
+        tsv = self.write_manifest(
+            "manifest.tsv",
+            "sample\tresults_folder1\tresults_folder2\nS1\tresults1\tresults2\n",
+        )
+        yml = self.write_manifest(
+            "manifest.yml",
+            "- {sample: S1, results_folder1: results1, results_folder2: results2}\n",
+        )
+        expected = [
+            {
+                "sample": "S1",
+                "results_folder1": os.path.join(self.temp_dir.name, "results1"),
+                "results_folder2": os.path.join(self.temp_dir.name, "results2"),
+            }
+        ]
+        self.assertEqual(load_manifest(tsv), expected)
+        self.assertEqual(load_manifest(yml), expected)
+
+        for text in [
+            "- {sample: S1, results_folder1: results1}\n",
+            "- {sample: ../S1, results_folder1: a, results_folder2: b}\n",
+            "- {sample: S1, results_folder1: a, results_folder2: b}\n" * 2,
+        ]:
+            with self.assertRaises(ValueError):
+                load_manifest(self.write_manifest("invalid.yml", text))
+
+    def test_unique_folders_of_runs_started_together(self):
+        with mock.patch("run.datetime") as clock:
+            clock.now.return_value.strftime.return_value = "20240101_120000"
+            folders = [
+                create_unique_folder(self.temp_dir.name, "cohort") for _ in "abc"
+            ]
+        self.assertEqual(
+            [os.path.basename(folder) for folder in folders],
+            [
+                "cohort_20240101_120000",
+                "cohort_20240101_120000_2",
+                "cohort_20240101_120000_3",
+            ],
+        )
+        self.assertEqual(
+            find_previous_results_folders(self.temp_dir.name, folders[0], "cohort"),
+            folders[:0:-1],
+        )
+
+    def test_cohort_index(self):
+        manifest = self.write_manifest(
+            "manifest.tsv",
+            "sample\tresults_folder1\tresults_folder2\n"
+            "S1\tresults1\tresults2\n"
+            "S2\tresults1\tmissing\n",
+        )
+        args = define_batch_parser().parse_args(
+            [manifest, "--output_dir", self.temp_dir.name, "--mhc_class", "1"]
+        )
+        samples = load_manifest(manifest)
+        cohort_dir = create_unique_folder(self.temp_dir.name, "cohort")
+        with self.assertLogs(level="INFO"):
+            jobs, errors = get_cohort_jobs(args, samples, cohort_dir, None)
+            statuses = run_comparison_jobs(jobs, 1, True)
+            counts = write_cohort_index(cohort_dir, samples, jobs, statuses, errors)
+        self.assertEqual(counts, {"completed": 3, "skipped": 2})
+        self.assertEqual(list(errors), ["S2"])
+
+        with open(os.path.join(cohort_dir, "cohort_index.json")) as f:
+            index = json.load(f)
+        sample = index["samples"][0]
+        self.assertEqual(
+            [c["status"] for c in sample["comparisons"]],
+            ["completed", "skipped", "completed", "completed", "skipped"],
+        )
+        comparison = sample["comparisons"][3]
+        self.assertEqual(comparison["report"], "S1/mhc_class_i/unaggregated_data.json")
+        with open(os.path.join(cohort_dir, comparison["report"])) as f:
+            self.assertEqual(comparison["summary"], json.load(f)["summary"])
+        self.assertEqual(index["samples"][1]["comparisons"], [])
@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+import pandas as pd
+from run_utils import build_id_column, load_tsv_files
+from comparisons import CompareReferenceMatchesTSV, CompareUnaggregatedTSV
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_build_id_column.py
+# python -m unittest discover -s tests
+class TestBuildIDColumn(unittest.TestCase):
+    def apply_ids(self, df, id_columns):
+        return df[id_columns].apply(lambda x: "-".join(map(str, x)), axis=1)
+
+    def assert_matches_apply(self, input_file1, input_file2, id_columns):
+        for projected in (None, id_columns):
+            df1, df2 = load_tsv_files(input_file1, input_file2, projected)
+            for df in (df1, df2):
+                self.assertEqual(
+                    build_id_column(df, id_columns).tolist(),
+                    self.apply_ids(df, id_columns).tolist(),
+                )
+
+    def test_unaggregated_fixtures(self):
+        for input_file in ["unaggregated_input2.tsv", "unaggregated_input3.tsv"]:
+            self.assert_matches_apply(
+                "tests/test_data/unaggregated_input1.tsv",
+                f"tests/test_data/{input_file}",
+                CompareUnaggregatedTSV.id_columns,
+            )
+
+    def test_reference_matches_fixtures(self):
+        for input_file in [
+            "reference_matches_input2.tsv",
+            "reference_matches_input3.tsv",
+        ]:
+            self.assert_matches_apply(
+                "tests/test_data/reference_matches_input1.tsv",
+                f"tests/test_data/{input_file}",
+                CompareReferenceMatchesTSV.id_columns,
+            )
+
+    def test_floats_and_missing_values(self):
+        df = pd.DataFrame(
+            {
+                "Chromosome": pd.Series(["chr1", np.nan, "chrX"], dtype="category"),
+                "Start": [1.0, 0.1 + 0.2, np.nan],
+                "Stop": [2, 3, 4],
+                "Seq": ["AAA", np.nan, "CCC"],
+                "Flag": [True, False, True],
+            }
+        )
+        id_columns = ["Chromosome", "Start", "Stop", "Seq", "Flag"]
+        self.assertEqual(
+            build_id_column(df, id_columns).tolist(),
+            self.apply_ids(df, id_columns).tolist(),
+        )
+
+    def test_numeric_only_columns(self):
+        df = pd.DataFrame({"Start": [1, 2], "Score": [1.5, np.nan]})
+        self.assertEqual(
+            build_id_column(df, ["Start", "Score"]).tolist(),
+            self.apply_ids(df, ["Start", "Score"]).tolist(),
+        )
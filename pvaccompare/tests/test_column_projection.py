@@ -0,0 +1,46 @@
+import unittest
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+from unittest import mock
+from run_utils import load_tsv_file
+from comparisons import CompareUnaggregatedTSV
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_column_projection.py
+# python -m unittest discover -s tests
+class TestColumnProjection(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_file = os.path.join(self.temp_dir.name, "input.tsv.gz")
+        with open("tests/test_data/unaggregated_input1.tsv", "rb") as src:
+            with gzip.open(self.input_file, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        self.id_columns = CompareUnaggregatedTSV.id_columns
+        self.columns = ["Biotype", "Median MT IC50 Score"]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_savings_are_not_sampled_without_debug_logging(self):
+        root = logging.getLogger()
+        level = root.level
+        root.setLevel(logging.INFO)
+        try:
+            with mock.patch("run_utils.log_projection_savings") as log_savings:
+                load_tsv_file(self.input_file, self.id_columns, self.columns)
+        finally:
+            root.setLevel(level)
+        log_savings.assert_not_called()
+
+    def test_savings_are_sampled_from_the_parsed_source(self):
+        # Compressed inputs can only be sampled through the same source as the main parse
+        with self.assertLogs(level="DEBUG") as log:
+            df = load_tsv_file(self.input_file, self.id_columns, self.columns)
+        self.assertTrue(
+            any("column projection saved" in line for line in log.output), log.output
+        )
+        self.assertIn("Biotype", df.columns)
@@ -125,3 +125,38 @@ class TestRunCompareAggregatedTSV(unittest.TestCase):
         expected_output.pop("input_file2", None)
 
         self.assertEqual(output_json_data, expected_output)
+
+    def test_hashed_ids(self):
+        expected_output_path = "tests/test_data/aggregated_id_change_output.json"
+
+        with open("tests/test_data/aggregated_input1.tsv", "r") as f:
+            content1 = f.read()
+        with open("tests/test_data/aggregated_input3.tsv", "r") as f:
+            content2 = f.read()
+
+        self.input_file1.write(content1.encode())
+        self.input_file2.write(content2.encode())
+        self.input_file1.close()
+        self.input_file2.close()
+
+        main(
+            self.input_file1.name,
+            self.input_file2.name,
+            self.columns_to_compare,
+            self.output_path,
+            self.class_type,
+            hashed_ids=True,
+        )
+
+        with open(f"{self.output_path}/{self.file_name}") as f1, open(
+            expected_output_path
+        ) as f2:
+            output_json_data = json.load(f1)
+            expected_output = json.load(f2)
+
+        output_json_data.pop("input_file1", None)
+        output_json_data.pop("input_file2", None)
+        expected_output.pop("input_file1", None)
+        expected_output.pop("input_file2", None)
+
+        self.assertEqual(output_json_data, expected_output)
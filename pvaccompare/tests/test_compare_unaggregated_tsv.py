@@ -138,3 +138,78 @@ class TestRunCompareUnaggregatedTSV(unittest.TestCase):
         expected_output.pop("input_file2", None)
 
         self.assertEqual(output_json_data, expected_output)
+
+    def test_hashed_ids(self):
+        expected_output_path = "tests/test_data/unaggregated_expected_output.json"
+
+        with open("tests/test_data/unaggregated_input1.tsv", "r") as f:
+            content1 = f.read()
+        with open("tests/test_data/unaggregated_input2.tsv", "r") as f:
+            content2 = f.read()
+
+        self.input_file1.write(content1.encode())
+        self.input_file2.write(content2.encode())
+        self.input_file1.close()
+        self.input_file2.close()
+
+        main(
+            self.input_file1.name,
+            self.input_file2.name,
+            self.columns_to_compare
+            + ["Extra Column"]
+            + ["modified_asparagine_proline_bond_count"],
+            self.output_path,
+            self.class_type,
+            hashed_ids=True,
+        )
+
+        with open(f"{self.output_path}/{self.file_name}") as f1, open(
+            expected_output_path
+        ) as f2:
+            output_json_data = json.load(f1)
+            expected_output = json.load(f2)
+
+        output_json_data.pop("input_file1", None)
+        output_json_data.pop("input_file2", None)
+        expected_output.pop("input_file1", None)
+        expected_output.pop("input_file2", None)
+
+        self.assertEqual(output_json_data, expected_output)
+
+    def test_summary_only(self):
+        expected_output_path = "tests/test_data/unaggregated_expected_output.json"
+
+        with open("tests/test_data/unaggregated_input1.tsv", "r") as f:
+            content1 = f.read()
+        with open("tests/test_data/unaggregated_input2.tsv", "r") as f:
+            content2 = f.read()
+
+        self.input_file1.write(content1.encode())
+        self.input_file2.write(content2.encode())
+        self.input_file1.close()
+        self.input_file2.close()
+
+        for streaming in [False, True]:
+            with self.assertLogs(level="INFO"):
+                main(
+                    self.input_file1.name,
+                    self.input_file2.name,
+                    self.columns_to_compare
+                    + ["Extra Column"]
+                    + ["modified_asparagine_proline_bond_count"],
+                    self.output_path,
+                    self.class_type,
+                    streaming=streaming,
+                    summary_only=True,
+                )
+
+            with open(f"{self.output_path}/{self.file_name}") as f1, open(
+                expected_output_path
+            ) as f2:
+                output_json_data = json.load(f1)
+                expected_output = json.load(f2)
+
+            self.assertTrue(output_json_data["summary_only"])
+            self.assertEqual(output_json_data["summary"], expected_output["summary"])
+            self.assertEqual(output_json_data["differences"], {})
+            self.assertEqual(output_json_data["variants"], {})
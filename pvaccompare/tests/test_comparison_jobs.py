@@ -0,0 +1,246 @@
+import unittest
+import gzip
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
+from file_utils import file_digests
+from compare_tools import (
+    get_comparison_jobs,
+    index_results_folder,
+    reuse_previous_results,
+    run_comparison_jobs,
+)
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_comparison_jobs.py
+# python -m unittest discover -s tests
+class TestComparisonJobs(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.results_folders = []
+        for i in [1, 2]:
+            folder = os.path.join(self.temp_dir.name, f"results{i}")
+            os.makedirs(os.path.join(folder, "MHC_Class_I", "log"))
+            for source, target in [
+                (f"yml_input{i}.yml", "log/inputs.yml"),
+                (f"json_input{i}.json", "sample.all_epitopes.aggregated.metrics.json"),
+                (f"aggregated_input{i}.tsv", "sample.all_epitopes.aggregated.tsv"),
+                (f"unaggregated_input{i}.tsv", "sample.all_epitopes.tsv"),
+            ]:
+                shutil.copy(
+                    f"tests/test_data/{source}",
+                    os.path.join(folder, "MHC_Class_I", target),
+                )
+            self.results_folders.append(folder)
+        # Only the first folder has reference matches, so that comparison is skipped
+        shutil.copy(
+            "tests/test_data/reference_matches_input1.tsv",
+            os.path.join(
+                self.results_folders[0], "MHC_Class_I", "sample.reference_matches"
+            ),
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_jobs(
+        self,
+        num_jobs,
+        results_folders=None,
+        previous_output_dirs=None,
+        prefetch_max_size=0,
+    ):
+        results_folders = results_folders or self.results_folders
+        output_dir = tempfile.mkdtemp(dir=self.temp_dir.name)
+        self.output_dir = output_dir
+        os.makedirs(os.path.join(output_dir, "mhc_class_i"))
+        os.makedirs(os.path.join(output_dir, "mhc_class_ii"))
+        jobs = []
+        for class_type in ["1", "2"]:
+            jobs += get_comparison_jobs(
+                class_type,
+                *results_folders,
+                output_dir,
+                ["Best Peptide", "Tier"],
+                ["Biotype", "Median MT IC50 Score"],
+                ["Peptide", "Match Window"],
+            )
+        with self.assertLogs(level="INFO") as log:
+            if previous_output_dirs:
+                reuse_previous_results(jobs, previous_output_dirs)
+            run_comparison_jobs(jobs, num_jobs, prefetch_max_size=prefetch_max_size)
+        # Load timings vary between runs
+        messages = [
+            record.getMessage()
+            for record in log.records
+            if not record.getMessage().startswith("• Loaded")
+        ]
+        outputs = {}
+        for class_folder in ["mhc_class_i", "mhc_class_ii"]:
+            for name in sorted(os.listdir(os.path.join(output_dir, class_folder))):
+                with open(os.path.join(output_dir, class_folder, name)) as f:
+                    outputs[f"{class_folder}/{name}"] = f.read()
+        return messages, outputs
+
+    def test_concurrent_jobs_match_sequential_jobs(self):
+        messages, outputs = self.run_jobs(1)
+        self.assertIn(
+            "ERROR: Could not locate the reference match TSV file in results folder 2 for MHC Class I.",
+            messages,
+        )
+        self.assertEqual(messages[-1], "─" * 55)
+        # Each report has its fingerprint next to it
+        self.assertEqual(len(outputs), 8)
+        self.assertEqual(self.run_jobs(3), (messages, outputs))
+        self.assertEqual(
+            self.run_jobs(1, prefetch_max_size=1024**2), (messages, outputs)
+        )
+
+    def test_identical_inputs_match_full_comparisons(self):
+        copy = os.path.join(self.temp_dir.name, "results1_copy")
+        shutil.copytree(self.results_folders[0], copy)
+        messages, outputs = self.run_jobs(1, [self.results_folders[0], copy])
+        self.assertEqual(
+            sum(m.startswith("• The input files are byte-identical") for m in messages),
+            5,
+        )
+        self.assertEqual(len(outputs), 10)
+
+        with mock.patch(
+            "compare_tools.comparison_router.inputs_are_identical", return_value=False
+        ):
+            full_messages, full_outputs = self.run_jobs(
+                1, [self.results_folders[0], copy]
+            )
+        self.assertEqual(outputs, full_outputs)
+        self.assertFalse(any(m.startswith("• Reused") for m in full_messages))
+
+    def test_unchanged_comparisons_are_reused(self):
+        _, outputs = self.run_jobs(1)
+        first_output_dir = self.output_dir
+
+        messages, reused_outputs = self.run_jobs(1, None, [first_output_dir])
+        self.assertEqual(reused_outputs, outputs)
+        self.assertIn("Reusing 4 unchanged comparisons:", messages)
+        self.assertFalse(any("Running the" in m for m in messages))
+
+        tsv = os.path.join(
+            self.results_folders[1], "MHC_Class_I", "sample.all_epitopes.tsv"
+        )
+        with open("tests/test_data/unaggregated_input3.tsv") as source, open(
+            tsv, "w"
+        ) as f:
+            f.write(source.read())
+        messages, _ = self.run_jobs(1, None, [self.output_dir, first_output_dir])
+        self.assertIn("Reusing 3 unchanged comparisons:", messages)
+        self.assertEqual(
+            [m for m in messages if "Running the" in m],
+            ["\nRunning the unaggregated TSV comparison tool..."],
+        )
+
+        # Inputs are only hashed for reports whose other fingerprint fields match, here
+        # none of the TSV comparisons with other columns
+        jobs = get_comparison_jobs(
+            "1", *self.results_folders, self.output_dir, ["Tier"], ["Biotype"], []
+        )
+        jobs = [job for job in jobs if job.get("options", {}).get("columns")]
+        self.assertEqual(len(jobs), 2)
+        file_digests.clear()
+        with mock.patch("file_utils.hash_file_contents") as digest:
+            reuse_previous_results(jobs, [self.output_dir, first_output_dir])
+        digest.assert_not_called()
+
+    def test_older_results_are_reused_past_a_changed_run(self):
+        copy = os.path.join(self.temp_dir.name, "results1_copy")
+        shutil.copytree(self.results_folders[0], copy)
+        folders = [self.results_folders[0], copy]
+        self.run_jobs(1, folders)
+        first_output_dir = self.output_dir
+
+        # The newest run compared an edited input of the same size
+        tsv = os.path.join(copy, "MHC_Class_I", "sample.all_epitopes.tsv")
+        with open(tsv, "rb") as f:
+            original = f.read()
+        edited = bytearray(original)
+        position = original.rindex(b"\t") + 1
+        edited[position : position + 1] = b"X"
+        with open(tsv, "wb") as f:
+            f.write(edited)
+        self.run_jobs(1, folders, [first_output_dir])
+        edited_output_dir = self.output_dir
+
+        with open(tsv, "wb") as f:
+            f.write(original)
+        file_digests.clear()
+        messages, _ = self.run_jobs(1, folders, [edited_output_dir, first_output_dir])
+        self.assertIn("Reusing 5 unchanged comparisons:", messages)
+        self.assertIn(
+            f"\nReused the unaggregated TSV comparison of {first_output_dir}.",
+            messages,
+        )
+
+    def test_results_folder_index(self):
+        folder = os.path.join(self.temp_dir.name, "results3")
+        os.makedirs(os.path.join(folder, "pVACseq", "mhc_ii", "log"))
+        for name in ["b.all_epitopes.tsv", "a.all_epitopes.tsv", ".c.all_epitopes.tsv"]:
+            open(os.path.join(folder, "pVACseq", "mhc_ii", name), "w").close()
+        index = index_results_folder(folder)
+        self.assertEqual(index["1"]["unaggregated TSV"], [])
+        self.assertEqual(
+            index["2"]["unaggregated TSV"],
+            [
+                os.path.join(folder, "pVACseq/mhc_ii/", name)
+                for name in ["a.all_epitopes.tsv", "b.all_epitopes.tsv"]
+            ],
+        )
+        with self.assertLogs(level="WARNING"):
+            jobs = get_comparison_jobs(
+                "2", folder, folder, self.temp_dir.name, [], [], []
+            )
+        self.assertEqual(jobs[3]["paths"], [index["2"]["unaggregated TSV"][0]] * 2)
+
+        with self.assertRaises(FileNotFoundError):
+            index_results_folder(os.path.join(self.temp_dir.name, "missing"))
+
+    def test_compressed_inputs_match_uncompressed(self):
+        _, outputs = self.run_jobs(1)
+        compressed_folders = []
+        for i, folder in enumerate(self.results_folders):
+            compressed = os.path.join(self.temp_dir.name, f"compressed{i}")
+            shutil.copytree(folder, compressed)
+            for root, _, names in os.walk(compressed):
+                for name in names:
+                    path = os.path.join(root, name)
+                    with open(path, "rb") as f, gzip.open(f"{path}.gz", "wb") as g:
+                        shutil.copyfileobj(f, g)
+                    os.remove(path)
+            compressed_folders.append(compressed)
+
+        for num_jobs in [1, 3]:
+            messages, compressed_outputs = self.run_jobs(num_jobs, compressed_folders)
+            self.assertEqual(
+                self.get_reports(compressed_outputs), self.get_reports(outputs)
+            )
+            self.assertIn(
+                "ERROR: Could not locate the reference match TSV file in results folder 2 for MHC Class I.",
+                messages,
+            )
+
+        copy = os.path.join(self.temp_dir.name, "compressed0_copy")
+        shutil.copytree(compressed_folders[0], copy)
+        messages, _ = self.run_jobs(1, [compressed_folders[0], copy])
+        self.assertEqual(
+            sum(m.startswith("• The input files are byte-identical") for m in messages),
+            5,
+        )
+
+    def get_reports(self, outputs):
+        # The reports name their input files, which end in .gz when compressed
+        return {
+            name: re.sub(r'("input_file\d": ")[^"]*"', r'\1"', output)
+            for name, output in outputs.items()
+            if not name.endswith(".fingerprint.json")
+        }
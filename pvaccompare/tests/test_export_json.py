@@ -0,0 +1,145 @@
+import unittest
+import io
+import json
+import os
+import tempfile
+from run_utils import StreamedDict, export_to_json, write_json
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_export_json.py
+# python -m unittest discover -s tests
+class TestExportJSON(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.differences = {
+            "Score": [
+                {
+                    "ID": f"v{i}",
+                    "Score_file1": float("nan") if i % 2 else float(i),
+                    "Score_file2": float(i) + 0.5,
+                    "line_file1": i + 2,
+                    "line_file2": i + 2,
+                }
+                for i in range(2500)
+            ]
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def export(self, compact_json, shard_differences=False, columnar_differences=False):
+        export_to_json(
+            "file1.tsv",
+            "file2.tsv",
+            self.differences,
+            "unaggregated_data.json",
+            self.temp_dir.name,
+            "1",
+            common_variants=[f"v{i}" for i in range(2500)],
+            compact_json=compact_json,
+            shard_differences=shard_differences,
+            columnar_differences=columnar_differences,
+        )
+        with open(os.path.join(self.temp_dir.name, "unaggregated_data.json")) as f:
+            return f.read()
+
+    def test_sections_are_written_with_nan_as_null(self):
+        output = self.export(False)
+        data = json.loads(output)
+        self.assertEqual(output, json.dumps(data, indent=4))
+        sections = data["differences"]["Score"]
+        self.assertEqual(sections["num_sections"], 3)
+        self.assertEqual(len(sections["section3"]), 500)
+        self.assertEqual(
+            sections["section1"][1],
+            {
+                "ID": "v1",
+                "File 1 Value": None,
+                "File 2 Value": 1.5,
+                "File 1 Line": 3,
+                "File 2 Line": 3,
+            },
+        )
+        self.assertEqual(
+            data["summary"]["Section Differences"],
+            {"Number of differences in Score": 2500},
+        )
+
+    def test_compact_output(self):
+        output = self.export(True)
+        self.assertNotIn("\n", output)
+        self.assertEqual(json.loads(output), json.loads(self.export(False)))
+
+    def test_sharded_output(self):
+        sections = json.loads(self.export(False))["differences"]["Score"]
+        data = json.loads(self.export(False, shard_differences=True))
+        manifest = data["differences"]["Score"]
+        self.assertEqual(
+            manifest,
+            {
+                "num_sections": 3,
+                "shards": [
+                    f"unaggregated_data_shards/column1_section{i}.json"
+                    for i in [1, 2, 3]
+                ],
+            },
+        )
+        for i, shard in enumerate(manifest["shards"], start=1):
+            with open(os.path.join(self.temp_dir.name, shard)) as f:
+                self.assertEqual(json.load(f), sections[f"section{i}"])
+        self.assertEqual(
+            data["summary"]["Section Differences"],
+            {"Number of differences in Score": 2500},
+        )
+
+    def test_columnar_output(self):
+        self.differences["Name"] = [
+            {
+                "ID": f"v{i}",
+                "Name_file1": "a",
+                "Name_file2": None,
+                "line_file1": i + 2,
+                "line_file2": i + 2,
+            }
+            for i in range(2000, 3000)
+        ]
+        expected = json.loads(self.export(False))
+        data = json.loads(self.export(True, columnar_differences=True))
+        self.assertEqual(data["difference_ids"], [f"v{i}" for i in range(3000)])
+        for col, sections in expected["differences"].items():
+            columnar_sections = data["differences"][col]
+            self.assertEqual(
+                columnar_sections["num_sections"], sections["num_sections"]
+            )
+            for i in range(1, sections["num_sections"] + 1):
+                columns = columnar_sections[f"section{i}"]
+                entries = [
+                    dict(zip(columns, values)) for values in zip(*columns.values())
+                ]
+                for entry in entries:
+                    entry["ID"] = data["difference_ids"][entry["ID"]]
+                self.assertEqual(entries, sections[f"section{i}"])
+
+    def test_streamed_values(self):
+        for compact in [False, True]:
+            f = io.StringIO()
+            write_json(
+                f,
+                {
+                    "empty": StreamedDict(iter([])),
+                    "pairs": StreamedDict((key, [key]) for key in "ab"),
+                    "list": (value for value in [1, float("nan")]),
+                    "nested": {"values": [float("nan"), {"a": float("nan")}]},
+                },
+                compact,
+            )
+            self.assertEqual(
+                json.loads(f.getvalue()),
+                {
+                    "empty": {},
+                    "pairs": {"a": ["a"], "b": ["b"]},
+                    "list": [1, None],
+                    "nested": {"values": [None, {"a": None}]},
+                },
+            )
@@ -0,0 +1,164 @@
+import unittest
+import numpy as np
+import pandas as pd
+from run_utils import (
+    get_column_mismatches,
+    get_file_differences,
+    replace_nan_with_none,
+    select_differences,
+)
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_file_differences.py
+# python -m unittest discover -s tests
+class TestFileDifferences(unittest.TestCase):
+    def test_column_mismatches(self):
+        numeric1 = np.array([1.0, 1.0, np.nan, np.nan, 5.0])
+        numeric2 = np.array([1.05, 1.5, np.nan, 2.0, np.nan])
+        self.assertEqual(
+            get_column_mismatches(numeric1, numeric2, 0.1).tolist(),
+            [False, True, False, True, True],
+        )
+
+        text1 = np.array(["a", "a", None, np.nan, None], dtype=object)
+        text2 = np.array(["a", "b", None, None, "c"], dtype=object)
+        self.assertEqual(
+            get_column_mismatches(text1, text2).tolist(),
+            [False, True, False, False, True],
+        )
+
+    def test_records_match_per_column_frames(self):
+        df1 = pd.DataFrame(
+            {
+                "ID": ["v1", "v2", "v3"],
+                "Score": [1.0, 2.0, np.nan],
+                "Name": ["x", "y", "z"],
+                "line": [2, 3, 4],
+            }
+        )
+        df2 = pd.DataFrame(
+            {
+                "ID": ["v3", "v2", "v1"],
+                "Score": [3.0, 2.05, 1.5],
+                "Name": ["z", "w", "x"],
+                "line": [2, 3, 4],
+            }
+        )
+        aligned_rows = (np.array([0, 1, 2]), np.array([2, 1, 0]))
+        differences, _, _ = get_file_differences(
+            df1, df2, ["Score", "Name"], aligned_rows=aligned_rows
+        )
+        self.assertEqual(
+            replace_nan_with_none(differences),
+            {
+                "Score": [
+                    {
+                        "ID": "v1",
+                        "Score_file1": 1.0,
+                        "Score_file2": 1.5,
+                        "line_file1": 2,
+                        "line_file2": 4,
+                    },
+                    {
+                        "ID": "v3",
+                        "Score_file1": None,
+                        "Score_file2": 3.0,
+                        "line_file1": 4,
+                        "line_file2": 2,
+                    },
+                ],
+                "Name": [
+                    {
+                        "ID": "v2",
+                        "Name_file1": "y",
+                        "Name_file2": "w",
+                        "line_file1": 3,
+                        "line_file2": 3,
+                    }
+                ],
+            },
+        )
+
+    def test_variant_index_points_at_the_column_records(self):
+        df1 = pd.DataFrame(
+            {
+                "ID": ["v1", "v2", "v3", "v4"],
+                "Score": [1.0, 2.0, 3.0, 4.0],
+                "Name": ["a", "b", "c", "d"],
+                "line": [2, 3, 4, 5],
+            }
+        )
+        df2 = pd.DataFrame(
+            {
+                "ID": ["v1", "v2", "v3", "v4"],
+                "Score": [1.0, 2.5, 3.5, 4.0],
+                "Name": ["a", "x", "c", "y"],
+                "line": [2, 3, 4, 5],
+            }
+        )
+        rows = np.arange(len(df1))
+        differences, variant_index, _ = get_file_differences(
+            df1, df2, ["Score", "Name"], aligned_rows=(rows, rows)
+        )
+        self.assertEqual(variant_index["columns"], ["Score", "Name"])
+        self.assertEqual(variant_index["ids"].tolist(), ["v2", "v3", "v4"])
+        self.assertEqual(variant_index["num_differences"].tolist(), [2, 1, 1])
+        self.assertEqual(variant_index["column"].tolist(), [0, 1, 0, 1])
+        self.assertEqual(variant_index["entry"].tolist(), [0, 0, 1, 1])
+
+        start = 0
+        for id, count in zip(variant_index["ids"], variant_index["num_differences"]):
+            for k in range(start, start + count):
+                col = variant_index["columns"][variant_index["column"][k]]
+                self.assertEqual(differences[col][variant_index["entry"][k]]["ID"], id)
+            start += count
+
+    def test_truncation_keeps_exact_counts(self):
+        df1 = pd.DataFrame(
+            {
+                "ID": [f"v{i}" for i in range(6)],
+                "Score": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+                "Name": ["a", "b", "c", "d", "e", "f"],
+                "line": np.arange(2, 8),
+            }
+        )
+        df2 = pd.DataFrame(
+            {
+                "ID": [f"v{i}" for i in range(6)],
+                "Score": [1.5, 2.0, 13.0, np.nan, 7.0, 6.0],
+                "Name": ["x", "y", "z", "d", "e", "f"],
+                "line": np.arange(2, 8),
+            }
+        )
+        rows = np.arange(len(df1))
+        differences, variant_index, truncation = get_file_differences(
+            df1, df2, ["Score", "Name"], aligned_rows=(rows, rows), max_differences=2
+        )
+        # A value missing on one side is the largest change
+        self.assertEqual([entry["ID"] for entry in differences["Score"]], ["v2", "v3"])
+        self.assertEqual(truncation["Score"]["num_differences"], 4)
+        self.assertEqual(truncation["Score"]["selection"], "largest")
+        self.assertEqual(len(differences["Name"]), 2)
+        self.assertEqual(truncation["Name"]["num_differences"], 3)
+        self.assertEqual(truncation["Name"]["selection"], "sample")
+        # Every difference is indexed, the ones not shown point nowhere
+        self.assertEqual(variant_index["ids"].tolist(), [f"v{i}" for i in range(5)])
+        self.assertEqual(variant_index["num_differences"].tolist(), [2, 1, 2, 1, 1])
+        start = 0
+        for id, count in zip(variant_index["ids"], variant_index["num_differences"]):
+            for k in range(start, start + count):
+                col = variant_index["columns"][variant_index["column"][k]]
+                entry = variant_index["entry"][k]
+                if entry >= 0:
+                    self.assertEqual(differences[col][entry]["ID"], id)
+            start += count
+        self.assertEqual(
+            np.count_nonzero(variant_index["entry"] >= 0),
+            len(differences["Score"]) + len(differences["Name"]),
+        )
+
+    def test_select_differences_breaks_ties_by_position(self):
+        scores = np.array([3.0, 1.0, 2.0, 1.0, 2.0, 2.0])
+        self.assertEqual(select_differences(scores, 3).tolist(), [1, 2, 3])
+        self.assertEqual(select_differences(scores, 6).tolist(), list(range(6)))
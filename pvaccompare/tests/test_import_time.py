@@ -0,0 +1,97 @@
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Modules the command line must not import before a comparison runs
+HEAVY_MODULES = ["pandas", "numpy", "deepdiff", "yaml"]
+
+# Most time the imports of the command line may take, as a share of the time importing
+# the heavy modules takes on the same machine. They take ~15% without the heavy modules
+IMPORT_TIME_SHARE = 0.5
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_import_time.py
+# python -m unittest discover -s tests
+class TestImportTime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Measured on each run, so slow machines and file systems raise the budget too
+        _, heavy_time, _ = cls.get_imports(["-c", f"import {', '.join(HEAVY_MODULES)}"])
+        cls.import_time_budget = heavy_time * IMPORT_TIME_SHARE
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.results_folders = []
+        for i in [1, 2]:
+            folder = os.path.join(self.temp_dir.name, f"results{i}")
+            os.makedirs(os.path.join(folder, "MHC_Class_I", "log"))
+            shutil.copy(
+                f"tests/test_data/aggregated_input{i}.tsv",
+                os.path.join(
+                    folder, "MHC_Class_I", "sample.all_epitopes.aggregated.tsv"
+                ),
+            )
+            self.results_folders.append(folder)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def get_imports(args):
+        """
+        Purpose:    Run python with -X importtime
+        Modifies:   Nothing
+        Returns:    Set of the imported modules, total seconds of the imports and the
+                    finished process
+        """
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime"] + args,
+            capture_output=True,
+            text=True,
+        )
+        modules = set()
+        total = 0
+        for line in process.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line.split("|")
+            modules.add(name.strip().split(".")[0])
+            # Only the top level imports, the cumulative time includes the nested ones
+            if not name.startswith("  "):
+                total += int(cumulative) / 1e6
+        return modules, total, process
+
+    def check_imports(self, args):
+        modules, total, process = self.get_imports(args)
+        self.assertEqual(modules & set(HEAVY_MODULES), set())
+        self.assertLess(total, self.import_time_budget)
+        return process
+
+    def test_help_and_validation(self):
+        self.assertEqual(self.check_imports(["run.py", "-h"]).returncode, 0)
+        self.assertEqual(self.check_imports(["batch.py", "-h"]).returncode, 0)
+
+        process = self.check_imports(
+            ["run.py"]
+            + self.results_folders
+            + ["--aggregated_columns", "Unknown Column"]
+        )
+        self.assertEqual(process.returncode, 2)
+        self.assertIn("Unknown Column", process.stderr)
+
+    def test_file_discovery(self):
+        script = (
+            "import run, sys\n"
+            "args = run.define_parser().parse_args(sys.argv[1:])\n"
+            "jobs = run.get_run_jobs(args, *sys.argv[1:3], 'output', None)\n"
+            "print(sum(all(job.get('paths', [None])) for job in jobs))\n"
+        )
+        process = self.check_imports(
+            ["-c", script] + self.results_folders + ["--mhc_class", "1"]
+        )
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.strip(), "1")
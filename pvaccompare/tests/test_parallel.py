@@ -0,0 +1,85 @@
+import unittest
+import os
+import tempfile
+from runners.run_compare_aggregated_tsv import main as run_aggregated
+from runners.run_compare_reference_matches_tsv import main as run_reference_matches
+from runners.run_compare_unaggregated_tsv import main as run_unaggregated
+from parallel_utils import get_file_pieces
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_parallel.py
+# python -m unittest discover -s tests
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.class_type = "1"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assert_same_output(self, run, input1, input2, columns, file_name):
+        input_file1 = f"tests/test_data/{input1}"
+        input_file2 = f"tests/test_data/{input2}"
+        outputs = []
+        for workers in [1, 3]:
+            output_path = os.path.join(self.temp_dir.name, f"workers_{workers}")
+            os.makedirs(output_path)
+            with self.assertLogs(level="INFO"):
+                run(
+                    input_file1,
+                    input_file2,
+                    list(columns),
+                    output_path,
+                    self.class_type,
+                    workers=workers,
+                )
+            with open(f"{output_path}/{file_name}") as f:
+                outputs.append(f.read())
+        self.assertEqual(outputs[1], outputs[0])
+
+    def test_file_pieces_cover_rows(self):
+        input_file = "tests/test_data/unaggregated_input1.tsv"
+        with open(input_file, "rb") as f:
+            header_size = len(f.readline())
+            lines = f.read()
+        pieces = get_file_pieces(input_file, 5)
+        self.assertEqual(len(pieces), 5)
+        self.assertEqual(pieces[0][0], header_size)
+        self.assertEqual(pieces[-1][1], os.path.getsize(input_file))
+        for (_, end), (start, _) in zip(pieces, pieces[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(lines[end - header_size - 1 : end - header_size], b"\n")
+
+    def test_unaggregated(self):
+        self.assert_same_output(
+            run_unaggregated,
+            "unaggregated_input1.tsv",
+            "unaggregated_input2.tsv",
+            [
+                "Biotype",
+                "Median MT IC50 Score",
+                "Median WT Percentile",
+                "Tumor RNA Depth",
+                "modified_asparagine_proline_bond_count",
+            ],
+            "unaggregated_data.json",
+        )
+
+    def test_aggregated_replaced_id(self):
+        self.assert_same_output(
+            run_aggregated,
+            "aggregated_input1.tsv",
+            "aggregated_input3.tsv",
+            ["Best Peptide", "Num Passing Peptides", "Tier", "Gene"],
+            "aggregated_data.json",
+        )
+
+    def test_reference_matches_duplicates(self):
+        self.assert_same_output(
+            run_reference_matches,
+            "reference_matches_input1.tsv",
+            "reference_matches_input3.tsv",
+            ["Peptide", "Match Window"],
+            "reference_matches_data.json",
+        )
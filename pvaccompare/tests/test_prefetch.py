@@ -0,0 +1,53 @@
+import unittest
+import os
+import tempfile
+import time
+from prefetch_utils import InputPrefetcher
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_prefetch.py
+# python -m unittest discover -s tests
+class TestPrefetch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name, size in [("a", 100), ("b", 200), ("c", 300), ("d", 1000)]:
+            path = os.path.join(self.temp_dir.name, name)
+            with open(path, "wb") as f:
+                f.write(name.encode() * size)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def wait_for_states(self, prefetcher, states):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            with prefetcher.condition:
+                if [prefetcher.states[path] for path in self.paths] == states:
+                    return
+            time.sleep(0.01)
+        self.fail(f"The prefetcher states are {prefetcher.states}")
+
+    def test_files_are_read_ahead_within_the_size_cap(self):
+        prefetcher = InputPrefetcher(self.paths, 500)
+        self.wait_for_states(prefetcher, ["held", "held", "pending", "pending"])
+        self.assertEqual(prefetcher.held_size, 300)
+
+        self.assertEqual(prefetcher.take(self.paths[0]), b"a" * 100)
+        self.wait_for_states(prefetcher, ["dropped", "held", "held", "dropped"])
+        self.assertEqual(prefetcher.held_size, 500)
+
+        prefetcher.release(self.paths[1:])
+        self.assertEqual(prefetcher.held_size, 0)
+        for path in self.paths:
+            self.assertIsNone(prefetcher.take(path))
+        prefetcher.close()
+
+    def test_files_not_read_yet_are_left_to_the_caller(self):
+        prefetcher = InputPrefetcher(self.paths, 0)
+        self.assertIsNone(prefetcher.take(self.paths[0]))
+        self.assertEqual(prefetcher.states[self.paths[1]], "pending")
+        self.assertIsNone(prefetcher.take("unknown"))
+        prefetcher.close()
@@ -0,0 +1,135 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from run import define_parser as define_run_parser, prepare_results_folder
+from run import run_results_pair
+from server import *
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_server.py
+# python -m unittest discover -s tests
+class QuietRequestHandler(DaemonRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.base_dir = tempfile.TemporaryDirectory()
+        cls.daemon = ComparisonDaemon(1, cls.base_dir.name)
+        QuietRequestHandler.daemon = cls.daemon
+        cls.server = ThreadingHTTPServer(("localhost", 0), QuietRequestHandler)
+        cls.url = f"http://localhost:{cls.server.server_address[1]}/api/jobs"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.daemon.shutdown()
+        cls.base_dir.cleanup()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for i in [1, 2]:
+            folder = os.path.join(self.temp_dir.name, f"results{i}", "MHC_Class_I")
+            os.makedirs(os.path.join(folder, "log"))
+            for source, target in [
+                (f"yml_input{i}.yml", "log/inputs.yml"),
+                (f"aggregated_input{i}.tsv", "sample.all_epitopes.aggregated.tsv"),
+                (f"unaggregated_input{i}.tsv", "sample.all_epitopes.tsv"),
+            ]:
+                shutil.copy(f"tests/test_data/{source}", os.path.join(folder, target))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def post_job(self, request, content_type="application/json", host=None):
+        headers = {"Content-Type": content_type}
+        if host:
+            headers["Host"] = host
+        post = urllib.request.Request(
+            self.url, data=json.dumps(request).encode(), headers=headers
+        )
+        with urllib.request.urlopen(post) as response:
+            return json.load(response)
+
+    def read_reports(self, output_dir):
+        reports = {}
+        folder = os.path.join(output_dir, "mhc_class_i")
+        for name in sorted(os.listdir(folder)):
+            with open(os.path.join(folder, name)) as f:
+                reports[name] = f.read()
+        return reports
+
+    def test_daemon_jobs_match_run(self):
+        request = {
+            "results_folder1": os.path.join(self.temp_dir.name, "results1"),
+            "results_folder2": os.path.join(self.temp_dir.name, "results2"),
+            "output_dir": "daemon",
+            "mhc_class": "1",
+            "unaggregated_columns": ["Biotype", "WT Epitope Seq"],
+            "recompute_all": True,
+        }
+        job = self.post_job(request)
+        self.assertIn(job["status"], ["queued", "running"])
+        self.assertEqual(
+            os.path.dirname(job["output_dir"]),
+            os.path.join(os.path.realpath(self.base_dir.name), "daemon"),
+        )
+
+        with urllib.request.urlopen(f"{self.url}/{job['id']}/events") as response:
+            events = [json.loads(line) for line in response]
+        self.assertEqual(events[-1]["status"], "completed")
+        self.assertTrue(any("Running the" in e.get("log", "") for e in events))
+
+        argv = [request["results_folder1"], request["results_folder2"]]
+        argv += ["--mhc_class", "1", "--recompute_all"]
+        argv += ["--unaggregated_columns", "Biotype,WT Epitope Seq"]
+        args = define_run_parser().parse_args(argv)
+        output_dir = prepare_results_folder(["1"], self.temp_dir.name)
+        with self.assertLogs(level="INFO"):
+            run_results_pair(args, output_dir)
+        self.assertEqual(
+            self.read_reports(job["output_dir"]), self.read_reports(output_dir)
+        )
+
+    def test_invalid_jobs_are_rejected(self):
+        for request in [
+            {"results_folder1": "a"},
+            {"results_folder1": "a", "results_folder2": "b", "jobs": 0},
+            {"results_folder1": "a", "results_folder2": "b", "mhc_class": "3"},
+            {"results_folder1": "a", "results_folder2": "b", "help": True},
+            {"results_folder1": "a", "results_folder2": "b", "work": 2},
+            {"results_folder1": "a", "results_folder2": "b", "cache_dir": "c"},
+            {"results_folder1": "a", "results_folder2": "b", "output_dir": "../c"},
+            {"results_folder1": "a", "results_folder2": "b", "output_dir": "/tmp"},
+        ]:
+            with self.assertRaises(urllib.error.HTTPError) as error:
+                self.post_job(request)
+            self.assertEqual(error.exception.code, 400)
+
+    def test_jobs_are_not_shared_across_origins(self):
+        request = {"results_folder1": "a", "results_folder2": "b"}
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            self.post_job(request, "text/plain")
+        self.assertEqual(error.exception.code, 415)
+        # A page whose host name was rebound to this server
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            self.post_job(request, host="attacker.example:8080")
+        self.assertEqual(error.exception.code, 403)
+
+        with urllib.request.urlopen(self.url) as response:
+            self.assertIsNone(response.headers.get("Access-Control-Allow-Origin"))
+        options = urllib.request.Request(self.url, method="OPTIONS")
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(options)
+        self.assertIsNone(error.exception.headers.get("Access-Control-Allow-Origin"))
@@ -0,0 +1,71 @@
+import unittest
+import pandas as pd
+from run_utils import add_sort_keys, align_variants
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_sort_keys.py
+# python -m unittest discover -s tests
+class TestSortKeys(unittest.TestCase):
+    def test_karyotype_order(self):
+        ids = [
+            "chrM-5-6-A-T",
+            "chrY-1-2-A-T",
+            "chr10-1-2-A-T",
+            "chrX-9-10-A-T",
+            "chr2-30-31-A-T",
+            "chr2-4-5-A-T",
+            "chrUn_KI270742v1-1-2-A-T",
+            "chrX-1-2-A-T",
+            "unplaced-variant",
+        ]
+        df1 = pd.DataFrame({"ID": ids, "line": range(2, len(ids) + 2)})
+        df2 = pd.DataFrame({"ID": ["chr1-1-2-A-T"], "line": [2]})
+        add_sort_keys(df1, df2)
+
+        _, unique_variants_file1, _, _ = align_variants(df1, df2)
+        self.assertEqual(
+            unique_variants_file1,
+            [
+                "chr2-4-5-A-T",
+                "chr2-30-31-A-T",
+                "chr10-1-2-A-T",
+                "chrX-1-2-A-T",
+                "chrX-9-10-A-T",
+                "chrY-1-2-A-T",
+                "chrM-5-6-A-T",
+                "chrUn_KI270742v1-1-2-A-T",
+                "unplaced-variant",
+            ],
+        )
+
+    def test_columns_match_ids(self):
+        df1 = pd.DataFrame(
+            {
+                "Chromosome": pd.Series(["chrX", "chr3", "chr3"], dtype="category"),
+                "Start": [7, 20, 3],
+                "Stop": [8, 21, 4],
+            }
+        )
+        df2 = pd.DataFrame({"Chromosome": ["chr1"], "Start": [5], "Stop": [6]})
+        add_sort_keys(df1, df2)
+
+        id_df1 = pd.DataFrame({"ID": ["chrX-7-8-", "chr3-20-21-", "chr3-3-4-"]})
+        id_df2 = pd.DataFrame({"ID": ["chr1-5-6-"]})
+        add_sort_keys(id_df1, id_df2)
+
+        sort_columns = ["Sort Chromosome", "Sort Start", "Sort Stop"]
+        self.assertEqual(
+            df1[sort_columns].values.tolist(), id_df1[sort_columns].values.tolist()
+        )
+        self.assertEqual(
+            df1[sort_columns].values.tolist(), [[2, 7, 8], [1, 20, 21], [1, 3, 4]]
+        )
+
+    def test_replaced_ids(self):
+        df1 = pd.DataFrame({"ID": ["TP53 (R175H)", "KRAS (G12D)", "KRAS (A59T-A60T)"]})
+        df2 = pd.DataFrame({"ID": ["BRAF (V600E)"]})
+        add_sort_keys(df1, df2, contains_id=False)
+
+        order = df1.sort_values(["Sort Gene", "Sort AA Change"])["ID"].tolist()
+        self.assertEqual(order, ["KRAS (A59T-A60T)", "KRAS (G12D)", "TP53 (R175H)"])
@@ -0,0 +1,162 @@
+import unittest
+import gzip
+import os
+import json
+import tempfile
+from runners.run_compare_aggregated_tsv import main as run_aggregated
+from runners.run_compare_reference_matches_tsv import main as run_reference_matches
+from runners.run_compare_unaggregated_tsv import main as run_unaggregated
+from streaming_utils import stream_compare_tsv_files, use_streaming_engine
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_streaming.py
+# python -m unittest discover -s tests
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.class_type = "1"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assert_same_output(
+        self, file_type, run, input1, input2, columns, file_name, **kwargs
+    ):
+        # Chunks and partitions small enough to split loci between them
+        input_file1 = f"tests/test_data/{input1}"
+        input_file2 = f"tests/test_data/{input2}"
+        expected_path = os.path.join(self.temp_dir.name, "expected")
+        os.makedirs(expected_path)
+        with self.assertLogs(level="INFO"):
+            run(input_file1, input_file2, list(columns), expected_path, "1", **kwargs)
+        with open(f"{expected_path}/{file_name}") as f:
+            expected = f.read()
+
+        for chunk_rows, partition_rows in [(1, 1), (3, 4), (100, 100)]:
+            output_path = os.path.join(
+                self.temp_dir.name, f"streamed_{chunk_rows}_{partition_rows}"
+            )
+            os.makedirs(output_path)
+            with self.assertLogs(level="INFO"):
+                stream_compare_tsv_files(
+                    file_type,
+                    input_file1,
+                    input_file2,
+                    list(columns),
+                    output_path,
+                    self.class_type,
+                    file_name,
+                    json.loads(expected)["id_format"],
+                    chunk_rows=chunk_rows,
+                    partition_rows=partition_rows,
+                    **kwargs,
+                )
+            with open(f"{output_path}/{file_name}") as f:
+                self.assertEqual(f.read(), expected)
+
+    def test_unaggregated(self):
+        self.assert_same_output(
+            "unaggregated",
+            run_unaggregated,
+            "unaggregated_input1.tsv",
+            "unaggregated_input2.tsv",
+            [
+                "Biotype",
+                "Median MT IC50 Score",
+                "Median WT Percentile",
+                "Tumor RNA Depth",
+                "modified_asparagine_proline_bond_count",
+            ],
+            "unaggregated_data.json",
+        )
+
+    def test_unaggregated_truncated(self):
+        self.assert_same_output(
+            "unaggregated",
+            run_unaggregated,
+            "unaggregated_input1.tsv",
+            "unaggregated_input2.tsv",
+            [
+                "Biotype",
+                "Median WT Percentile",
+                "Tumor RNA Depth",
+                "modified_asparagine_proline_bond_count",
+            ],
+            "unaggregated_data.json",
+            max_differences=1,
+        )
+
+    def test_unaggregated_truncated_columnar(self):
+        # Variants whose differences were all truncated are still in the variant index
+        self.assert_same_output(
+            "unaggregated",
+            run_unaggregated,
+            "unaggregated_input1.tsv",
+            "unaggregated_input2.tsv",
+            [
+                "Biotype",
+                "Median WT Percentile",
+                "Tumor RNA Depth",
+                "modified_asparagine_proline_bond_count",
+            ],
+            "unaggregated_data.json",
+            max_differences=1,
+            columnar_differences=True,
+        )
+
+    def test_aggregated_replaced_id(self):
+        self.assert_same_output(
+            "aggregated",
+            run_aggregated,
+            "aggregated_input1.tsv",
+            "aggregated_input3.tsv",
+            ["Best Peptide", "Num Passing Peptides", "Tier", "Gene"],
+            "aggregated_data.json",
+        )
+
+    def test_reference_matches_duplicates(self):
+        self.assert_same_output(
+            "reference_matches",
+            run_reference_matches,
+            "reference_matches_input1.tsv",
+            "reference_matches_input3.tsv",
+            ["Peptide", "Match Window"],
+            "reference_matches_data.json",
+        )
+
+    def test_compressed_inputs_are_judged_by_their_decompressed_size(self):
+        # Repeated rows compress far more than the estimated ratio, so only the size in
+        # the gzip trailer puts the pair over the threshold
+        input_file = os.path.join(self.temp_dir.name, "input.tsv.gz")
+        with gzip.open(input_file, "wb") as f:
+            f.write(b"chr1\t100\tA\tT\n" * 100000)
+        self.assertLess(os.path.getsize(input_file) * 10, 1000000)
+        with self.assertLogs(level="INFO"):
+            self.assertTrue(
+                use_streaming_engine(input_file, input_file, min_size=1000000 / 1024**3)
+            )
+        self.assertFalse(
+            use_streaming_engine(input_file, input_file, min_size=2000000 / 1024**3)
+        )
+
+        # A zstd frame header recording a content size of 1.5 MB
+        input_file = os.path.join(self.temp_dir.name, "input.tsv.zst")
+        with open(input_file, "wb") as f:
+            f.write(b"\x28\xb5\x2f\xfd\xa0" + (1500000).to_bytes(4, "little"))
+        with self.assertLogs(level="INFO"):
+            self.assertTrue(
+                use_streaming_engine(input_file, input_file, min_size=1000000 / 1024**3)
+            )
+
+    def test_automatic_switch_logs_the_options_it_ignores(self):
+        input_file = "tests/test_data/unaggregated_input1.tsv"
+        self.assertFalse(use_streaming_engine(input_file, input_file, min_size=0))
+        with self.assertLogs(level="INFO") as log:
+            self.assertTrue(
+                use_streaming_engine(
+                    input_file, input_file, min_size=1 / 1024**3, hashed_ids=True
+                )
+            )
+        self.assertIn("streaming engine", log.output[0])
+        self.assertIn("does not use --hashed_ids", log.output[1])
@@ -0,0 +1,80 @@
+import unittest
+import os
+import tempfile
+from runners.run_compare_aggregated_tsv import main as run_aggregated
+from runners.run_compare_unaggregated_tsv import main as run_unaggregated
+from cache_utils import TableCache
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_table_cache.py
+# python -m unittest discover -s tests
+class TestTableCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = TableCache(os.path.join(self.temp_dir.name, "cache"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_cached(self, run, input1, input2, columns, file_name, table_cache):
+        output_path = tempfile.mkdtemp(dir=self.temp_dir.name)
+        with self.assertLogs(level="INFO") as log:
+            run(
+                f"tests/test_data/{input1}",
+                f"tests/test_data/{input2}",
+                list(columns),
+                output_path,
+                "1",
+                table_cache=table_cache,
+            )
+        with open(f"{output_path}/{file_name}") as f:
+            return f.read(), [record.getMessage() for record in log.records]
+
+    def test_cache_hits_match_parsed_tables(self):
+        for run, name, columns, file_name in [
+            (
+                run_unaggregated,
+                "unaggregated",
+                ["Biotype", "Median MT IC50 Score", "WT Epitope Seq"],
+                "unaggregated_data.json",
+            ),
+            (
+                run_aggregated,
+                "aggregated",
+                ["Best Peptide", "Tier"],
+                "aggregated_data.json",
+            ),
+        ]:
+            args = (run, f"{name}_input1.tsv", f"{name}_input3.tsv", columns)
+            expected, _ = self.run_cached(*args, file_name, None)
+            output, messages = self.run_cached(*args, file_name, self.cache)
+            self.assertEqual(output, expected)
+            self.assertFalse(any("from the table cache" in m for m in messages))
+
+            output, messages = self.run_cached(*args, file_name, self.cache)
+            self.assertEqual(output, expected)
+            self.assertEqual(
+                sum(m.startswith("• Loaded") and "table cache" in m for m in messages),
+                2,
+            )
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for key in ["a", "b", "c"]:
+            self.cache.store(key, bytes(1000))
+            os.utime(self.cache.get_path(key), ns=(0, {"a": 1, "b": 2, "c": 3}[key]))
+        self.cache.load("a")
+
+        self.cache.max_size = 2500
+        self.cache.store("d", bytes(100))
+        self.assertIsNone(self.cache.load("b"))
+        for key in ["a", "c", "d"]:
+            self.assertIsNotNone(self.cache.load(key))
+
+    def test_entries_of_other_versions_are_misses(self):
+        # A pickle of a class that no longer exists, like one written by another pandas
+        with open(self.cache.get_path("a"), "wb") as f:
+            f.write(b"cmissing_module\nTable\n.")
+        with self.assertLogs(level="WARNING"):
+            self.assertIsNone(self.cache.load("a"))
+        self.assertFalse(os.path.exists(self.cache.get_path("a")))